@@ -30,26 +30,63 @@
 ####
 #
 
+import fcntl
+import fnmatch
+import hashlib
+import heapq
+import json
 import os
+import re
+import shutil
+import stat
+import subprocess
+import tempfile
+import time
+import zlib
 import pygit2
 
 def normalize_path(path: str) -> str:
     return os.path.abspath(os.path.expanduser(path))
 
 
-def open_repository(path: str) -> pygit2.Repository:
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ansible_pygit")
+
+
+def _ceiling_dirs(ceiling_dirs):
+    if ceiling_dirs is None:
+        ceiling_dirs = os.environ.get("GIT_CEILING_DIRECTORIES", "").split(os.pathsep)
+    return [normalize_path(d) for d in ceiling_dirs if d]
+
+
+def discover_repository(path: str, ceiling_dirs=None):
+    """
+    the git dir of the repository containing path, or None. discovery stops
+    below any of ceiling_dirs (default $GIT_CEILING_DIRECTORIES)
+    """
+    path = normalize_path(path)
+    ceilings = _ceiling_dirs(ceiling_dirs)
     try:
-        return pygit2.Repository(path)
-    except Exception:
-        pass
+        if ceilings:
+            return pygit2.discover_repository(path, False, os.pathsep.join(ceilings))
+        return pygit2.discover_repository(path)
+    except pygit2.GitError:
+        return None
 
+
+def open_repository(path: str, ceiling_dirs=None) -> pygit2.Repository:
+    # path is usually the top of a worktree or a bare repository, which needs no discovery
     try:
-        discovered = pygit2.discover_repository(path)
-        if discovered:
-            return pygit2.Repository(discovered)
-    except Exception:
+        return pygit2.Repository(path, pygit2.enums.RepositoryOpenFlag.NO_SEARCH)
+    except pygit2.GitError:
         pass
 
+    git_dir = discover_repository(path, ceiling_dirs)
+    if git_dir:
+        try:
+            return pygit2.Repository(git_dir)
+        except pygit2.GitError:
+            pass
+
     raise pygit2.GitError(f"failed to get repo at {path}")
 
 
@@ -120,7 +157,11 @@ def staged_changes(repo, branch):
     return staged_files
 
 
-def get_credentials(username, pubkey, privkey, passphrase):
+def get_credentials(username, pubkey, privkey, passphrase, agent=False):
+
+    if agent:
+        # keys stay in the ssh-agent, nothing to read or decrypt here
+        return pygit2.KeypairFromAgent(username or "git")
 
     if pubkey:
         return pygit2.Keypair(username, pubkey, privkey, passphrase)
@@ -131,6 +172,326 @@ def get_credentials(username, pubkey, privkey, passphrase):
     return None
 
 
+class ReportingCallbacks(pygit2.RemoteCallbacks):
+    """
+    remote callbacks that keep the refs the remote rejected during a push,
+    which pygit2 otherwise drops silently. one instance (and so one set of
+    credentials) can serve a fetch and a push
+    """
+
+    def __init__(self, credentials=None):
+        super().__init__(credentials=credentials)
+        self.rejected = {}
+
+    def push_update_reference(self, refname, message):
+        if message is not None:
+            self.rejected[refname] = message
+
+
+LS_REMOTE_CACHE_DIR = os.path.join(CACHE_DIR, "ls_remote")
+
+
+def _ls_remote_cache_path(url, username):
+    key = hashlib.sha1(f"{username or ''}\0{url}".encode()).hexdigest()
+    return os.path.join(LS_REMOTE_CACHE_DIR, f"{key}.json")
+
+
+def ls_remote(url, credentials=None, cache_ttl=0, repo=None, username=None):
+    """
+    the refs advertised by the remote at url, or by the remote of that name
+    in repo, without fetching anything. returns ({ref: id}, {symref: target},
+    whether it came from the cache). with cache_ttl the answer is kept on
+    this host for that many seconds, so repeated checks skip the network
+    """
+    remote = None
+    if repo is not None and url in repo.remotes.names():
+        remote = repo.remotes[url]
+        url = remote.url
+
+    cache_path = _ls_remote_cache_path(url, username)
+    if cache_ttl > 0:
+        try:
+            if time.time() - os.stat(cache_path).st_mtime < cache_ttl:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                return cached['refs'], cached['symrefs'], True
+        except (OSError, ValueError, KeyError):
+            pass
+
+    callbacks = pygit2.RemoteCallbacks(credentials=credentials)
+    if remote is not None:
+        heads = remote.list_heads(callbacks=callbacks)
+    elif repo is not None:
+        heads = repo.remotes.create_anonymous(url).list_heads(callbacks=callbacks)
+    else:
+        # a remote needs a repository, even just to list refs
+        with tempfile.TemporaryDirectory(prefix="ansible_pygit_ls_remote") as scratch:
+            heads = pygit2.init_repository(scratch, bare=True).remotes.create_anonymous(url) \
+                .list_heads(callbacks=callbacks)
+
+    refs = {}
+    symrefs = {}
+    for head in heads:
+        refs[head.name] = str(head.oid)
+        if head.symref_target:
+            symrefs[head.name] = head.symref_target
+
+    if cache_ttl > 0:
+        try:
+            os.makedirs(LS_REMOTE_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=LS_REMOTE_CACHE_DIR)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"url": url, "refs": refs, "symrefs": symrefs}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # the cache is only an optimisation
+            pass
+    return refs, symrefs, False
+
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+JOB_PROGRESS_INTERVAL = 0.5
+JOB_RUNNING = ['starting', 'running']
+
+# the options shared by the modules that can run a transfer as a job
+JOB_ARGS = {
+    "detach": {"type": 'bool', "required": False, "default": False},
+    "status_file": {"type": 'path', "required": False},
+}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStatus:
+    """
+    a machine-readable progress file for a long clone, fetch or push, which
+    git_job_status polls. creating <path>.cancel asks the job to stop at its
+    next progress update.
+    percent and eta count received objects and resolved deltas together,
+    rate is bytes per second since the job started
+    """
+
+    def __init__(self, path, operation, target):
+        self.path = path
+        self.cancel_path = f"{path}.cancel"
+        self._written = 0.0
+        self.fields = {
+            "operation": operation,
+            "target": target,
+            "pid": os.getpid(),
+            "state": "starting",
+            "phase": "",
+            "started": time.time(),
+            "updated": time.time(),
+            "objects": 0,
+            "total_objects": 0,
+            "deltas": 0,
+            "total_deltas": 0,
+            "bytes": 0,
+            "rate": 0.0,
+            "percent": 0.0,
+            "eta": None,
+            "remote": "",
+            "error": None,
+            "result": None,
+        }
+
+    def write(self):
+        self.fields['updated'] = time.time()
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ansible_pygit_job")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.fields, f)
+        # pollers only ever see a whole snapshot
+        os.replace(tmp_path, self.path)
+        self._written = time.monotonic()
+
+    def start(self):
+        # a cancel left over from an earlier job isn't meant for this one
+        try:
+            os.unlink(self.cancel_path)
+        except FileNotFoundError:
+            pass
+        self.fields['state'] = "running"
+        self.write()
+
+    def update(self, phase, objects, total_objects, nbytes, deltas=0, total_deltas=0):
+        self.fields.update(phase=phase, objects=objects, total_objects=total_objects, bytes=nbytes,
+                           deltas=deltas, total_deltas=total_deltas)
+        if time.monotonic() - self._written < JOB_PROGRESS_INTERVAL:
+            return
+        elapsed = max(time.time() - self.fields['started'], 0.001)
+        done = objects + deltas
+        total = total_objects + total_deltas
+        fraction = done / total if total else 0.0
+        self.fields['rate'] = round(nbytes / elapsed, 1)
+        self.fields['percent'] = round(100 * fraction, 1)
+        self.fields['eta'] = round(elapsed * (1 - fraction) / fraction, 1) if fraction else None
+        self._checkpoint()
+
+    def remote_message(self, message):
+        # e.g. "Counting objects", while the remote prepares the pack
+        self.fields['remote'] = message.strip()
+        if time.monotonic() - self._written >= JOB_PROGRESS_INTERVAL:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self.write()
+        # only checked as often as the file is written, so polling stays cheap
+        if os.path.exists(self.cancel_path):
+            raise JobCancelled(f"{self.fields['operation']} of {self.fields['target']} cancelled")
+
+    def finish(self, state, error=None, result=None):
+        self.fields.update(state=state, error=error, result=result)
+        if state == "done":
+            self.fields.update(percent=100.0, eta=0)
+        try:
+            os.unlink(self.cancel_path)
+        except FileNotFoundError:
+            pass
+        self.write()
+
+
+class ProgressCallbacks(ReportingCallbacks):
+    """
+    reporting callbacks that also record transfer progress in a JobStatus,
+    and abort the transfer (raising JobCancelled) when the job is cancelled
+    """
+
+    def __init__(self, credentials=None, status=None):
+        super().__init__(credentials)
+        self.status = status
+
+    def transfer_progress(self, stats):
+        if self.status is not None:
+            receiving = stats.received_objects < stats.total_objects
+            self.status.update("receiving" if receiving else "resolving", stats.received_objects,
+                               stats.total_objects, stats.received_bytes, stats.indexed_deltas, stats.total_deltas)
+
+    def push_transfer_progress(self, objects_pushed, total_objects, bytes_pushed):
+        if self.status is not None:
+            self.status.update("pushing", objects_pushed, total_objects, bytes_pushed)
+
+    def sideband_progress(self, string):
+        if self.status is not None:
+            self.status.remote_message(string)
+
+
+def job_status_path(params, operation, target):
+    """
+    the status file of the job for the JOB_ARGS in params, status_file or
+    else one named after the operation and target
+    """
+    path = params.get('status_file')
+    if path is None:
+        key = hashlib.sha1(target.encode()).hexdigest()[:16]
+        path = os.path.join(JOBS_DIR, f"{operation}-{key}.json")
+    return path
+
+
+def job_status(params, operation, target):
+    """
+    the JobStatus for the JOB_ARGS in params, None if there's no need for one
+    """
+    if params.get('status_file') is None and not params.get('detach'):
+        return None
+    return JobStatus(job_status_path(params, operation, target), operation, target)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_job_status(path):
+    """
+    the last snapshot written to the status file at path, None if there
+    isn't one. a job whose process has gone without finishing is 'lost'
+    """
+    try:
+        with open(path) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if status.get('state') in JOB_RUNNING and not _pid_alive(status.get('pid', 0)):
+        status['state'] = "lost"
+    return status
+
+
+def run_job(status, func):
+    """
+    call func, recording how it ended (and what it returned) in status.
+    exceptions are re-raised for the caller to report
+    """
+    if status is None:
+        return func()
+    try:
+        value = func()
+    except JobCancelled:
+        status.finish("cancelled")
+        raise
+    except Exception as e:
+        status.finish("failed", error=str(e))
+        raise
+    status.finish("done", result=value)
+    return value
+
+
+def start_job(status, func):
+    """
+    run func as a job in a detached process that outlives the module and
+    returns its pid, once it has written its first status
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(write_end)
+        with os.fdopen(read_end) as f:
+            job_pid = f.read()
+        os.waitpid(pid, 0)
+        return int(job_pid) if job_pid else None
+
+    try:
+        os.close(read_end)
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+        # let go of the module's stdout so ansible isn't left waiting for the job
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        status.fields['pid'] = os.getpid()
+        status.start()
+        os.write(write_end, str(os.getpid()).encode())
+        os.close(write_end)
+        try:
+            run_job(status, func)
+        except BaseException:
+            # already in the status file
+            pass
+    finally:
+        os._exit(0)
+
+
+def detach_job(status, func):
+    """
+    start func as a job unless one is still running with the same status
+    file, returns (its pid, whether it was started now)
+    """
+    running = read_job_status(status.path)
+    if running is not None and running['state'] in JOB_RUNNING:
+        return running['pid'], False
+    return start_job(status, func), True
+
+
 def branch_exists(repo, branch_name):
     if repo.branches.get(branch_name):
         return True
@@ -141,8 +502,12 @@ def resolve_commit(repo, ref):
     try:
         commit, ref = repo.resolve_refish(ref)
     except KeyError:
-        ## the ref doesn't exist
-        return None
+        ## not a ref or commit id, try it as a revision expression (e.g. HEAD~1)
+        try:
+            commit = repo.revparse_single(ref).peel(pygit2.Commit)
+        except (KeyError, ValueError, pygit2.GitError):
+            ## the ref doesn't exist
+            return None
     return commit
 
 
@@ -212,3 +577,1600 @@ def get_wt_changes(repo):
             output_status[filepath]="WT_UNREADABLE"
 
     return output_status
+
+
+RESULT_DETAIL = ['full', 'summary', 'none']
+RESULT_SAMPLE = 20
+
+# merged into module_args by modules that can return large file lists
+RESULT_DETAIL_ARGS = {
+    "result_detail": {"type": 'str', "required": False, "choices": RESULT_DETAIL, "default": 'full'},
+    "result_sample": {"type": 'int', "required": False, "default": RESULT_SAMPLE},
+    "result_inline_limit": {"type": 'int', "required": False},
+    "result_file": {"type": 'path', "required": False},
+}
+
+
+def describe_paths(paths, params):
+    """
+    the paths for a result message, or just how many with bounded result_detail
+    """
+    inline_limit = params.get('result_inline_limit')
+    if (params.get('result_detail') or 'full') == 'full' and (inline_limit is None or len(paths) <= inline_limit):
+        return ','.join(paths)
+    return f"{len(paths)} files"
+
+
+def bound_result(repo, params, result, keys, check_mode=False):
+    """
+    trim the file lists/dicts in result[key] for each key according to the
+    result_detail params, so big change sets don't bloat the json ansible
+    copies back from every host. result['summary'] gets the total (and for
+    dicts the count per status) of each. in full mode lists are only cut
+    short when result_inline_limit is set, anything over it is written to
+    result_file on the target instead, which is returned as
+    result['result_file']. in check mode the file isn't written
+    """
+    detail = params.get('result_detail') or 'full'
+    sample = max(params.get('result_sample') or 0, 0)
+    inline_limit = params.get('result_inline_limit')
+
+    result['summary'] = {}
+    spilled = {}
+    for key in keys:
+        value = result.get(key)
+        summary = {"total": len(value), "truncated": False}
+        if isinstance(value, dict):
+            counts = {}
+            for status in value.values():
+                counts[status] = counts.get(status, 0) + 1
+            summary['counts'] = counts
+        result['summary'][key] = summary
+
+        if detail == 'full':
+            limit = len(value) if inline_limit is None else inline_limit
+        elif detail == 'summary':
+            limit = sample
+        else:
+            limit = 0
+        if len(value) <= limit:
+            continue
+
+        summary['truncated'] = True
+        if detail == 'full':
+            spilled[key] = value
+            limit = sample
+        if isinstance(value, dict):
+            result[key] = dict(item for item, _ in zip(value.items(), range(limit)))
+        else:
+            result[key] = value[:limit]
+
+    if spilled and not check_mode:
+        path = params.get('result_file') or os.path.join(repo.path, "ansible_pygit_result.json")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".ansible_pygit_result")
+        with os.fdopen(fd, "w") as f:
+            # json.dump writes as it encodes rather than building one big string
+            json.dump(spilled, f)
+        os.replace(tmp_path, path)
+        result['result_file'] = path
+    return result
+
+
+def loose_objects(repo, objects_dir=None):
+    """
+    yield (oid, path) for every loose object in the object database,
+    or in objects_dir
+    """
+    if objects_dir is None:
+        objects_dir = os.path.join(repo.path, "objects")
+    for fanout in sorted(os.listdir(objects_dir)):
+        if len(fanout) != 2:
+            continue
+        fanout_dir = os.path.join(objects_dir, fanout)
+        try:
+            names = os.listdir(fanout_dir)
+        except NotADirectoryError:
+            continue
+        for name in names:
+            oid = fanout + name
+            if len(oid) not in (40, 64):
+                continue
+            yield oid, os.path.join(fanout_dir, name)
+
+
+def pack_files(repo):
+    """
+    list the .pack files in the object database
+    """
+    pack_dir = os.path.join(repo.path, "objects", "pack")
+    if not os.path.isdir(pack_dir):
+        return []
+    return sorted(os.path.join(pack_dir, name) for name in os.listdir(pack_dir)
+                  if name.endswith(".pack"))
+
+
+def pack_objects(pack_path):
+    """
+    the hex ids of the objects in a pack, read from its v2 idx
+    """
+    idx_path = pack_path[:-len(".pack")] + ".idx"
+    with open(idx_path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"\377tOc":
+        raise ValueError(f"unsupported pack index {idx_path}")
+    count = int.from_bytes(data[8 + 255 * 4:8 + 256 * 4], "big")
+    start = 8 + 256 * 4
+    return [data[start + i * 20:start + (i + 1) * 20].hex() for i in range(count)]
+
+
+def write_loose(repo, object_type, data, mtime=None):
+    """
+    write an object as a loose object even if a pack already holds it,
+    optionally backdated to mtime so prune ages it from then
+    """
+    raw = OBJECT_TYPE_NAMES[object_type] + b" " + str(len(data)).encode() + b"\0" + data
+    oid = hashlib.sha1(raw).hexdigest()
+    fanout_dir = os.path.join(repo.path, "objects", oid[:2])
+    path = os.path.join(fanout_dir, oid[2:])
+    if not os.path.exists(path):
+        os.makedirs(fanout_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=fanout_dir, prefix="tmp_obj_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.compress(raw))
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return oid
+
+
+def _pack_object_count(pack_path):
+    # the last entry of the v2 idx fanout table is the number of objects
+    idx_path = pack_path[:-len(".pack")] + ".idx"
+    try:
+        with open(idx_path, "rb") as f:
+            header = f.read(8 + 256 * 4)
+    except OSError:
+        return 0
+    if len(header) < 8 + 256 * 4 or header[:4] != b"\377tOc":
+        return 0
+    return int.from_bytes(header[-4:], "big")
+
+
+def count_objects(repo):
+    """
+    count loose and packed objects, the equivalent of git count-objects -v
+    """
+    counts = {
+        "loose_objects": 0,
+        "loose_size": 0,
+        "packs": 0,
+        "packed_objects": 0,
+        "pack_size": 0,
+    }
+    for _oid, path in loose_objects(repo):
+        counts["loose_objects"] += 1
+        try:
+            counts["loose_size"] += os.stat(path).st_size
+        except FileNotFoundError:
+            pass
+
+    for pack_path in pack_files(repo):
+        counts["packs"] += 1
+        counts["packed_objects"] += _pack_object_count(pack_path)
+        try:
+            counts["pack_size"] += os.stat(pack_path).st_size
+        except FileNotFoundError:
+            pass
+
+    return counts
+
+
+def worktree_git_dirs(repo):
+    """
+    the administrative directories (.git/worktrees/<name>) of the linked
+    worktrees of repo, each holding that worktree's HEAD, index and reflog
+    """
+    worktrees_dir = os.path.join(repo.path, "worktrees")
+    try:
+        names = sorted(os.listdir(worktrees_dir))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return [os.path.join(worktrees_dir, name) for name in names
+            if os.path.isdir(os.path.join(worktrees_dir, name))]
+
+
+def _worktree_head_tips(git_dir):
+    # a detached HEAD and its reflog aren't visible through the base repo's refs
+    tips = set()
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            tips.add(pygit2.Oid(hex=head))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(git_dir, "logs", "HEAD")) as f:
+            for line in f:
+                for oid in line.split(" ", 2)[:2]:
+                    try:
+                        tips.add(pygit2.Oid(hex=oid))
+                    except ValueError:
+                        pass
+    except OSError:
+        pass
+    return tips
+
+
+def ref_tips(repo):
+    """
+    the object ids that every reference, HEAD and reflog entry point at,
+    including the HEADs of linked worktrees
+    """
+    tips = set()
+    names = repo.listall_references()
+    if not repo.head_is_unborn:
+        names.append("HEAD")
+
+    for name in names:
+        try:
+            ref = repo.lookup_reference(name).resolve()
+        except (KeyError, pygit2.GitError):
+            continue
+        tips.add(ref.target)
+        try:
+            for entry in ref.log():
+                tips.add(entry.oid_new)
+                tips.add(entry.oid_old)
+        except (KeyError, pygit2.GitError):
+            pass
+
+    for git_dir in worktree_git_dirs(repo):
+        tips |= _worktree_head_tips(git_dir)
+
+    tips.discard(pygit2.Oid(hex=pygit2.GIT_OID_HEX_ZERO))
+    return tips
+
+
+def reachable_objects(repo, tips=None):
+    """
+    the set of object ids (as hex strings) reachable from tips,
+    by default every ref, reflog entry and the index of every worktree
+    """
+    if tips is None:
+        tips = ref_tips(repo)
+
+    reachable = set()
+    commits = []
+    for oid in tips:
+        obj = repo.get(oid)
+        # peel annotated tags, keeping the tag objects themselves
+        while obj is not None and obj.type == pygit2.enums.ObjectType.TAG:
+            reachable.add(str(obj.id))
+            obj = repo.get(obj.target)
+        if obj is None:
+            continue
+        if obj.type == pygit2.enums.ObjectType.COMMIT:
+            commits.append(obj.id)
+        elif obj.type == pygit2.enums.ObjectType.TREE:
+            _add_tree(repo, obj, reachable)
+        else:
+            reachable.add(str(obj.id))
+
+    if commits:
+        walker = repo.walk(None)
+        for oid in commits:
+            walker.push(oid)
+        for commit in walker:
+            reachable.add(str(commit.id))
+            _add_tree(repo, commit.tree, reachable)
+
+    indexes = [] if repo.is_bare else [repo.index]
+    for git_dir in worktree_git_dirs(repo):
+        try:
+            indexes.append(pygit2.Index(os.path.join(git_dir, "index")))
+        except (OSError, pygit2.GitError):
+            continue
+    for index in indexes:
+        for entry in index:
+            if entry.mode != pygit2.enums.FileMode.COMMIT:
+                reachable.add(str(entry.id))
+
+    return reachable
+
+
+def _add_tree(repo, tree, reachable):
+    # subtrees are shared between commits so each one is only walked once
+    pending = [tree]
+    while pending:
+        tree = pending.pop()
+        tree_id = str(tree.id)
+        if tree_id in reachable:
+            continue
+        reachable.add(tree_id)
+        for entry in tree:
+            if entry.filemode == pygit2.enums.FileMode.TREE:
+                pending.append(repo[entry.id])
+            elif entry.filemode != pygit2.enums.FileMode.COMMIT:
+                reachable.add(str(entry.id))
+
+
+def is_dirty(repo, untracked=True):
+    """
+    return True as soon as any staged, unstaged or (optionally) untracked
+    change is found, without building the full status of the worktree
+    """
+    if repo.is_bare:
+        return False
+
+    index = repo.index
+    index.read()
+    if repo.head_is_unborn:
+        if len(index) > 0:
+            return True
+    elif len(index.diff_to_tree(repo.head.peel(pygit2.Commit).tree)) > 0:
+        return True
+
+    # libgit2 only hashes files whose stat data differs from the index
+    if len(index.diff_to_workdir()) > 0:
+        return True
+
+    if not untracked:
+        return False
+
+    tracked = set(entry.path for entry in index)
+    workdir = repo.workdir
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(workdir, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                if rel_path == ".git":
+                    # a directory, or a file pointing at one in a linked worktree
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if repo.path_is_ignored(rel_path + "/"):
+                        continue
+                    if rel_path in tracked:
+                        # a submodule, a new commit in it is a gitlink change found above
+                        continue
+                    if os.path.lexists(os.path.join(entry.path, ".git")):
+                        # git status lists a nested repository as untracked, without looking inside
+                        return True
+                    pending.append(rel_path + "/")
+                elif rel_path not in tracked and not repo.path_is_ignored(rel_path):
+                    return True
+    return False
+
+
+class CommitGraph:
+    """
+    read-only access to objects/info/commit-graph, so history can be walked
+    using the parents, generation numbers and commit times stored there
+    instead of inflating every commit object
+    """
+    NO_PARENT = 0x70000000
+    EXTRA_EDGES = 0x80000000
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != b"CGPH" or data[4] != 1:
+            raise ValueError(f"unsupported commit-graph {path}")
+        self.hash_len = 20 if data[5] == 1 else 32
+        num_chunks = data[6]
+
+        chunks = {}
+        for i in range(num_chunks + 1):
+            entry = 8 + i * 12
+            chunks[data[entry:entry + 4]] = int.from_bytes(data[entry + 4:entry + 12], "big")
+        offsets = sorted(chunks.values())
+
+        def chunk(name):
+            if name not in chunks:
+                return None
+            start = chunks[name]
+            end = offsets[offsets.index(start) + 1] if start != offsets[-1] else len(data)
+            return memoryview(data)[start:end]
+
+        self.fanout = chunk(b"OIDF")
+        self.oids = chunk(b"OIDL")
+        self.cdat = chunk(b"CDAT")
+        self.edges = chunk(b"EDGE")
+        self.count = int.from_bytes(self.fanout[-4:], "big")
+
+    @classmethod
+    def open(cls, repo):
+        """
+        return the repository's commit-graph, or None if it hasn't got one
+        """
+        path = os.path.join(repo.path, "objects", "info", "commit-graph")
+        try:
+            return cls(path)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def position(self, raw_oid):
+        first = raw_oid[0]
+        low = int.from_bytes(self.fanout[(first - 1) * 4:first * 4], "big") if first else 0
+        high = int.from_bytes(self.fanout[first * 4:first * 4 + 4], "big")
+        hash_len = self.hash_len
+        while low < high:
+            mid = (low + high) // 2
+            candidate = bytes(self.oids[mid * hash_len:(mid + 1) * hash_len])
+            if candidate < raw_oid:
+                low = mid + 1
+            elif candidate > raw_oid:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def oid(self, position):
+        return bytes(self.oids[position * self.hash_len:(position + 1) * self.hash_len])
+
+    def commit(self, position):
+        """
+        return (parent positions, generation, commit time) for a commit
+        """
+        start = position * (self.hash_len + 16) + self.hash_len
+        record = self.cdat[start:start + 16]
+        parents = []
+        first_parent = int.from_bytes(record[0:4], "big")
+        second_parent = int.from_bytes(record[4:8], "big")
+        if first_parent != self.NO_PARENT:
+            parents.append(first_parent)
+        if second_parent & self.EXTRA_EDGES:
+            edge = second_parent & ~self.EXTRA_EDGES
+            while True:
+                value = int.from_bytes(self.edges[edge * 4:edge * 4 + 4], "big")
+                parents.append(value & ~self.EXTRA_EDGES)
+                if value & self.EXTRA_EDGES:
+                    break
+                edge += 1
+        elif second_parent != self.NO_PARENT:
+            parents.append(second_parent)
+        packed = int.from_bytes(record[8:16], "big")
+        return parents, packed >> 34, packed & 0x3FFFFFFFF
+
+
+def _commit_info(repo, graph, raw_oid):
+    # (parent ids, generation, commit time), generation is infinite for
+    # commits newer than the commit-graph so they are always visited first
+    if graph is not None:
+        position = graph.position(raw_oid)
+        if position is not None:
+            parents, generation, commit_time = graph.commit(position)
+            return [graph.oid(p) for p in parents], generation, commit_time
+    commit = repo[pygit2.Oid(raw=raw_oid)]
+    return [p.raw for p in commit.parent_ids], float("inf"), commit.commit_time
+
+
+DIVERGENCE_SLOP = 5
+
+
+def branch_divergence(repo, pairs):
+    """
+    compute (ahead, behind, merge_base) for a list of (local, upstream) oid
+    pairs in a single walk over their combined history, stopping once every
+    remaining commit is reachable from both sides of every pair
+    """
+    graph = CommitGraph.open(repo)
+
+    # every tip gets two bits per pair: bit 2i for local, bit 2i+1 for upstream
+    lows = 0
+    masks = {}
+    for i, (local, upstream) in enumerate(pairs):
+        masks[local.raw] = masks.get(local.raw, 0) | (1 << (2 * i))
+        masks[upstream.raw] = masks.get(upstream.raw, 0) | (1 << (2 * i + 1))
+        lows |= 1 << (2 * i)
+
+    def stale(mask):
+        # for each pair both bits or neither are set
+        return ((mask >> 1) ^ mask) & lows == 0
+
+    info = {}
+    from_common_child = {}
+    heap = []
+    queued = set()
+    active = 0
+
+    def push(raw_oid):
+        if raw_oid not in info:
+            info[raw_oid] = _commit_info(repo, graph, raw_oid)
+        _, generation, commit_time = info[raw_oid]
+        heapq.heappush(heap, (-generation, -commit_time, raw_oid))
+        queued.add(raw_oid)
+        return 0 if stale(masks[raw_oid]) else 1
+
+    for raw_oid in masks:
+        active += push(raw_oid)
+
+    # like git's limit_list keep going for a few commits after everything is
+    # stale, in case clock skew put an older commit ahead of its descendant
+    slop = DIVERGENCE_SLOP
+    while heap and slop:
+        if not active:
+            slop -= 1
+        else:
+            slop = DIVERGENCE_SLOP
+        _, _, raw_oid = heapq.heappop(heap)
+        queued.discard(raw_oid)
+        mask = masks[raw_oid]
+        if not stale(mask):
+            active -= 1
+        common = mask & (mask >> 1) & lows
+        for parent in info[raw_oid][0]:
+            old = masks.get(parent, 0)
+            masks[parent] = old | mask
+            from_common_child[parent] = from_common_child.get(parent, 0) | common
+            if parent in queued:
+                active += (0 if stale(masks[parent]) else 1) - (0 if stale(old) else 1)
+            elif masks[parent] != old:
+                active += push(parent)
+
+    results = []
+    for i in range(len(pairs)):
+        local_bit, upstream_bit = 1 << (2 * i), 1 << (2 * i + 1)
+        ahead = behind = 0
+        merge_base, merge_base_time = None, None
+        for raw_oid, mask in masks.items():
+            if mask & local_bit and not mask & upstream_bit:
+                ahead += 1
+            elif mask & upstream_bit and not mask & local_bit:
+                behind += 1
+            elif mask & local_bit and not from_common_child.get(raw_oid, 0) & local_bit:
+                commit_time = info[raw_oid][2]
+                if merge_base is None or commit_time > merge_base_time:
+                    merge_base, merge_base_time = raw_oid, commit_time
+        results.append((ahead, behind,
+                        str(pygit2.Oid(raw=merge_base)) if merge_base else None))
+    return results
+
+
+def tracking_branches(repo):
+    """
+    list (branch, upstream) Branch pairs for every local branch with an upstream
+    """
+    pairs = []
+    for name in repo.branches.local:
+        branch = repo.branches.local[name]
+        try:
+            upstream = branch.upstream
+        except (KeyError, pygit2.GitError):
+            upstream = None
+        if upstream is not None:
+            pairs.append((branch, upstream))
+    return pairs
+
+
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+
+def tree_blob(tree, path):
+    """
+    return the blob at path in tree, or None if there isn't one
+    """
+    try:
+        entry = tree[path]
+    except KeyError:
+        return None
+    if entry.type != pygit2.enums.ObjectType.BLOB:
+        return None
+    return entry
+
+
+def _has_blob_content(blob, dest):
+    # a symlink is always replaced, whatever it points at
+    return os.path.isfile(dest) and not os.path.islink(dest) and pygit2.hashfile(dest) == blob.id
+
+
+def blob_up_to_date(blob, dest, executable=False):
+    """
+    whether dest is a regular file with the content and mode write_blob would give it
+    """
+    return _has_blob_content(blob, dest) \
+        and stat.S_IMODE(os.stat(dest).st_mode) == (0o755 if executable else 0o644)
+
+
+def write_blob(blob, dest, executable=False, chunk_size=BLOB_CHUNK_SIZE, check_existing=True):
+    """
+    stream a blob to dest through a temporary file in the same directory,
+    returns False without writing if dest already has the same content and mode.
+    if only the mode differs it is just chmodded
+    """
+    if check_existing and _has_blob_content(blob, dest):
+        if blob_up_to_date(blob, dest, executable):
+            return False
+        os.chmod(dest, 0o755 if executable else 0o644)
+        return True
+
+    dest_dir = os.path.dirname(dest) or "."
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out, pygit2.BlobIO(blob) as src:
+            shutil.copyfileobj(src, out, chunk_size)
+        os.chmod(tmp_path, 0o755 if executable else 0o644)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def flatten_tree(repo, tree, prefix=""):
+    """
+    return a dict of path: (blob id, filemode) for every blob and symlink
+    in tree and its subtrees, submodules are skipped
+    """
+    entries = {}
+    pending = [(tree, prefix)]
+    while pending:
+        tree, prefix = pending.pop()
+        for entry in tree:
+            path = prefix + entry.name
+            if entry.filemode == pygit2.enums.FileMode.TREE:
+                pending.append((repo[entry.id], path + "/"))
+            elif entry.filemode != pygit2.enums.FileMode.COMMIT:
+                entries[path] = (str(entry.id), int(entry.filemode))
+    return entries
+
+
+LARGE_FILE_STORE = os.path.join(CACHE_DIR, "lfs")
+LARGE_FILE_VERSION = b"version https://git-lfs.github.com/spec/v1\n"
+LARGE_FILE_POINTER_MAX = 1024
+LARGE_FILE_ATTRIBUTES = "filter=lfs diff=lfs merge=lfs -text"
+
+# the options of the modules that read large files back out of the store
+LARGE_FILE_STORE_ARGS = {
+    "large_files": {"type": 'bool', "required": False, "default": False},
+    "large_file_store": {"type": 'path', "required": False, "default": LARGE_FILE_STORE},
+    "large_file_remote": {"type": 'path', "required": False},
+}
+
+# and of the modules that put them there
+LARGE_FILE_ARGS = {
+    **LARGE_FILE_STORE_ARGS,
+    "large_file_threshold": {"type": 'int', "required": False, "default": 0},
+    "large_file_patterns": {"type": 'list', "elements": 'str', "required": False},
+}
+
+
+def large_file_path(store, oid):
+    return os.path.join(store, "objects", oid[:2], oid[2:4], oid)
+
+
+def large_file_pointer(oid, size):
+    # the git-lfs pointer format, so the pointers mean the same thing to git-lfs
+    return LARGE_FILE_VERSION + f"oid sha256:{oid}\nsize {size}\n".encode()
+
+
+def parse_large_file_pointer(data):
+    """
+    the (sha256, size) a pointer file refers to, None if data isn't one
+    """
+    if len(data) > LARGE_FILE_POINTER_MAX or not data.startswith(LARGE_FILE_VERSION):
+        return None
+    fields = dict(line.split(" ", 1) for line in data.decode(errors="replace").splitlines()[1:] if " " in line)
+    oid = fields.get("oid", "")
+    if not oid.startswith("sha256:") or len(oid) != len("sha256:") + 64 or not fields.get("size", "").isdigit():
+        return None
+    return oid[len("sha256:"):], int(fields["size"])
+
+
+def _copy_large_file(src, dest, oid):
+    # through a temporary file, checking the content on the way
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        if digest.hexdigest() != oid:
+            raise ValueError(f"{src} does not hash to {oid}")
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fetch_large_file(oid, store, remote=None):
+    """
+    the path of the content with sha256 oid in store, copying it from the
+    remote store first if needed. None if neither has it
+    """
+    path = large_file_path(store, oid)
+    if os.path.exists(path):
+        return path
+    if remote is not None and os.path.exists(large_file_path(remote, oid)):
+        _copy_large_file(large_file_path(remote, oid), path, oid)
+        return path
+    return None
+
+
+class LargeFileFilter(pygit2.Filter):
+    """
+    the clean and smudge filter for files with the filter=lfs attribute.
+    cleaning streams the content into a content-addressed store shared by
+    every repository on the host (and a remote store directory, if there is
+    one) and hands git a small pointer. smudging swaps the pointer for the
+    content, fetching it from the remote store if it isn't on the host yet.
+    pointers whose content can't be found are checked out as they are.
+    with dry_run set cleaning only works out the pointer, nothing is stored
+    """
+    attributes = "filter"
+    store = LARGE_FILE_STORE
+    remote = None
+    dry_run = False
+
+    def check(self, src, attr_values):
+        if attr_values[0] != "lfs":
+            raise pygit2.Passthrough
+        self.clean = src.mode == pygit2.enums.FilterMode.TO_ODB
+        self.size = 0
+        self.head = b""
+        self.out = None
+        if self.clean:
+            self.digest = hashlib.sha256()
+        if self.clean and not self.dry_run:
+            tmp_dir = os.path.join(self.store, "tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            fd, self.tmp_path = tempfile.mkstemp(dir=tmp_dir)
+            self.out = os.fdopen(fd, "wb")
+
+    def write(self, data, src, write_next):
+        self.size += len(data)
+        if self.clean:
+            self.digest.update(data)
+            if self.out is not None:
+                self.out.write(data)
+            if len(self.head) <= LARGE_FILE_POINTER_MAX:
+                self.head += data[:LARGE_FILE_POINTER_MAX + 1 - len(self.head)]
+        elif self.head is None:
+            write_next(data)
+        else:
+            self.head += data
+            if len(self.head) > LARGE_FILE_POINTER_MAX:
+                # too big to be a pointer, so pass it through as it comes
+                write_next(self.head)
+                self.head = None
+
+    def close(self, write_next):
+        if self.clean:
+            if self.out is not None:
+                self.out.close()
+            if parse_large_file_pointer(self.head) is not None:
+                # a pointer whose content was never hydrated, keep it as it is
+                if self.out is not None:
+                    os.remove(self.tmp_path)
+                write_next(self.head)
+                return
+            oid = self.digest.hexdigest()
+            if self.out is None:
+                write_next(large_file_pointer(oid, self.size))
+                return
+            path = large_file_path(self.store, oid)
+            if os.path.exists(path):
+                os.remove(self.tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(self.tmp_path, path)
+            if self.remote is not None and not os.path.exists(large_file_path(self.remote, oid)):
+                _copy_large_file(path, large_file_path(self.remote, oid), oid)
+            write_next(large_file_pointer(oid, self.size))
+            return
+
+        if self.head is None:
+            return
+        pointer = parse_large_file_pointer(self.head)
+        path = fetch_large_file(pointer[0], self.store, self.remote) if pointer is not None else None
+        if path is None:
+            write_next(self.head)
+            return
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b""):
+                write_next(chunk)
+
+
+_registered_filters = set()
+
+
+def register_large_files(params, check_mode=False):
+    """
+    send files with the filter=lfs attribute through LargeFileFilter, with
+    the store options in params. large files are opt-in, so this does
+    nothing unless large_files is set. in check mode the stores are left alone
+    """
+    if not params.get('large_files'):
+        return
+    LargeFileFilter.dry_run = check_mode
+    LargeFileFilter.store = params.get('large_file_store') or LARGE_FILE_STORE
+    LargeFileFilter.remote = params.get('large_file_remote')
+    if "lfs" not in _registered_filters:
+        pygit2.filter_register("lfs", LargeFileFilter)
+        _registered_filters.add("lfs")
+
+
+def hydrate_large_files(repo, params, paths=None):
+    """
+    replace the pointer files in the worktree, of paths or of every file
+    with the filter=lfs attribute, with their content. checkouts only
+    rewrite files that changed, so this catches pointers checked out
+    before their content reached the stores.
+    returns (the paths hydrated, the paths whose content wasn't found)
+    """
+    store = params.get('large_file_store') or LARGE_FILE_STORE
+    remote = params.get('large_file_remote')
+    hydrated = []
+    missing = []
+    stale = []
+    index = repo.index
+    for entry in index:
+        if paths is not None and entry.path not in paths:
+            continue
+        full_path = os.path.join(repo.workdir, entry.path)
+        if os.path.islink(full_path) or not os.path.isfile(full_path) \
+                or os.path.getsize(full_path) > LARGE_FILE_POINTER_MAX \
+                or repo.get_attr(entry.path, "filter") != "lfs":
+            continue
+        with open(full_path, "rb") as f:
+            data = f.read()
+        pointer = parse_large_file_pointer(data)
+        if pointer is None:
+            continue
+        content = fetch_large_file(pointer[0], store, remote)
+        if content is None:
+            missing.append(entry.path)
+            continue
+        _copy_large_file(content, full_path, pointer[0])
+        os.chmod(full_path, 0o755 if entry.mode == pygit2.enums.FileMode.BLOB_EXECUTABLE else 0o644)
+        hydrated.append(entry.path)
+        if entry.id == pygit2.hash(data):
+            # the file changed under the index, cleaning it again gives the same pointer
+            stale.append(entry.path)
+
+    if stale:
+        # anything staged that isn't this pointer is left as it is
+        for path in stale:
+            index.add(path)
+        index.write()
+    return hydrated, missing
+
+
+def _attributes_pattern(path):
+    # anchored to the top of the worktree, with whitespace escaped like git lfs track does
+    return "/" + re.sub(r"\s", "[[:space:]]", path.replace("[", "\\[").replace("*", "\\*").replace("?", "\\?"))
+
+
+def _append_lines(path, lines):
+    try:
+        with open(path) as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = ""
+    lines = [line for line in dict.fromkeys(lines) if line not in existing.splitlines()]
+    if not lines:
+        return False
+    with open(path, "a") as f:
+        if existing and not existing.endswith("\n"):
+            f.write("\n")
+        f.write("\n".join(lines) + "\n")
+    return True
+
+
+def track_large_files(repo, paths, threshold=0, patterns=None):
+    """
+    add the patterns, and any of paths at least threshold bytes that aren't
+    tracked already, to .gitattributes with the filter=lfs attribute.
+    returns whether .gitattributes changed
+    """
+    attributes_path = os.path.join(repo.workdir, ".gitattributes")
+    changed = _append_lines(attributes_path, [f"{pattern} {LARGE_FILE_ATTRIBUTES}" for pattern in patterns or []])
+
+    if threshold > 0:
+        lines = []
+        for path in paths:
+            full_path = os.path.join(repo.workdir, path)
+            if os.path.islink(full_path) or not os.path.isfile(full_path) or os.path.getsize(full_path) < threshold:
+                continue
+            # after the patterns, so files they cover aren't listed again
+            if repo.get_attr(path, "filter") != "lfs":
+                lines.append(f"{_attributes_pattern(path)} {LARGE_FILE_ATTRIBUTES}")
+        changed = _append_lines(attributes_path, lines) or changed
+    return changed
+
+
+def get_diff(repo, compare, from_ref="HEAD", to_ref=None, context_lines=3):
+    """
+    diff two trees (compare=tree), a tree and the index (compare=index)
+    or the index and the worktree (compare=workdir)
+    """
+    index = repo.index
+    if compare == "workdir":
+        return index.diff_to_workdir(context_lines=context_lines)
+
+    from_commit = resolve_commit(repo, from_ref)
+    if from_commit is None:
+        raise KeyError(f"can't resolve {from_ref}")
+    from_tree = from_commit.peel(pygit2.Tree)
+
+    if compare == "index":
+        return from_tree.diff_to_index(index, context_lines=context_lines)
+
+    to_commit = resolve_commit(repo, to_ref)
+    if to_commit is None:
+        raise KeyError(f"can't resolve {to_ref}")
+    return from_tree.diff_to_tree(to_commit.peel(pygit2.Tree), context_lines=context_lines)
+
+
+LOCK_TIMEOUT = 30
+LOCK_INITIAL_DELAY = 0.05
+LOCK_MAX_DELAY = 2.0
+REPO_LOCK_FILE = "ansible_pygit.lock"
+
+
+class LockTimeout(Exception):
+    pass
+
+
+def is_lock_error(error):
+    """
+    whether a libgit2 error was caused by another process holding index.lock or a ref lock.
+    a ref that moved under us is not one, retrying would commit on top of it from stale state
+    """
+    message = str(error)
+    return isinstance(error, (pygit2.GitError, OSError)) and ("locked" in message or "lock file" in message)
+
+
+class LockWaiter:
+    """
+    runs operations on a repo, retrying them with bounded exponential backoff
+    while git lock files are held by someone else, and optionally holding a
+    host-local advisory lock on the repo for the whole block so that forks
+    targeting the same repo queue up instead of racing.
+    waited is the total time in seconds spent waiting for either kind of lock
+    """
+
+    def __init__(self, repo, timeout=LOCK_TIMEOUT, serialize=False):
+        self.repo = repo
+        self.timeout = timeout
+        self.serialize = serialize
+        self.waited = 0.0
+        self._lock_file = None
+
+    def _wait(self, deadline, delay, what):
+        now = time.monotonic()
+        if now >= deadline:
+            raise LockTimeout(f"timed out after {self.timeout}s waiting for {what}")
+        pause = min(delay, deadline - now)
+        time.sleep(pause)
+        self.waited += pause
+        return min(delay * 2, LOCK_MAX_DELAY)
+
+    def __enter__(self):
+        if not self.serialize:
+            return self
+        path = os.path.join(self.repo.path, REPO_LOCK_FILE)
+        self._lock_file = open(path, "a")
+        deadline = time.monotonic() + self.timeout
+        delay = LOCK_INITIAL_DELAY
+        while True:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except BlockingIOError:
+                try:
+                    delay = self._wait(deadline, delay, path)
+                except LockTimeout:
+                    self._lock_file.close()
+                    self._lock_file = None
+                    raise
+
+    def __exit__(self, *exc):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        return False
+
+    def run(self, func, *args, **kwargs):
+        """
+        call func, retrying while it fails on a lock. func is called again
+        from the start, so it should re-read whatever the lock protects
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = LOCK_INITIAL_DELAY
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except (pygit2.GitError, OSError) as e:
+                if not is_lock_error(e):
+                    raise
+                delay = self._wait(deadline, delay, f"a lock in {self.repo.path} ({e})")
+
+
+def index_conflicts(index):
+    """
+    sorted paths with conflicts in an (in-memory) index
+    """
+    if index.conflicts is None:
+        return []
+    paths = set()
+    for ancestor, ours, theirs in index.conflicts:
+        entry = ours or theirs or ancestor
+        paths.add(entry.path)
+    return sorted(paths)
+
+
+def checked_out_branch(repo):
+    """
+    the full name of the branch checked out in the worktree, or None for bare repos and detached heads
+    """
+    if repo.is_bare or repo.head_is_unborn or repo.head_is_detached:
+        return None
+    return repo.head.name
+
+
+def move_branch(repo, ref_name, old_target, new_target, message):
+    """
+    point a branch at new_target, failing if it no longer points at old_target.
+    if the branch is checked out the index and worktree are brought along,
+    refusing to overwrite local changes
+    """
+    ref = repo.references[ref_name]
+    if ref.target != old_target:
+        raise pygit2.GitError(f"{ref_name} moved from {old_target} to {ref.target}")
+    if checked_out_branch(repo) == ref_name:
+        repo.checkout_tree(repo[new_target], strategy=pygit2.enums.CheckoutStrategy.SAFE)
+    ref.set_target(new_target, message)
+
+
+def pick_commit(repo, commit, onto, revert=False, mainline=0):
+    """
+    the index from cherry-picking (or reverting) commit onto the commit onto,
+    computed in memory without touching the index or worktree.
+    mainline picks the parent to diff a merge commit against (1, 2, ...)
+    """
+    if len(commit.parents) < 2:
+        mainline = 0
+    elif not mainline:
+        raise ValueError(f"{commit.id} is a merge, set mainline to pick a parent")
+    if revert:
+        return repo.revert_commit(commit, onto, mainline)
+
+    # pygit2 has no cherrypick_commit, but it is just this three-way merge
+    if commit.parents:
+        ancestor = commit.parents[max(mainline, 1) - 1].tree
+    else:
+        ancestor = repo[repo.TreeBuilder().write()]
+    return repo.merge_trees(ancestor, onto.tree, commit.tree)
+
+
+def revert_message(commit):
+    subject = commit.message.split("\n", 1)[0]
+    return f'Revert "{subject}"\n\nThis reverts commit {commit.id}.\n'
+
+
+def cherry_pick_message(commit):
+    return f"{commit.message.rstrip()}\n\n(cherry picked from commit {commit.id})\n"
+
+
+def pick_commits(staged, commit_ids, tip_id, committer, revert=False, mainline=0, message=None):
+    """
+    cherry-pick (or revert) each of commit_ids in turn onto the commit tip_id
+    in memory. the new trees and commits are written to staged (a
+    StagedObjects), so they only reach the odb if it is committed.
+    picks keep their author, reverts are authored by the committer.
+    returns (created, skipped, tip id, conflict): {picked id: new id} for the
+    commits made, the ids with nothing left to apply and, if one conflicts
+    (which stops the picking), (its id, the conflicting paths), else None
+    """
+    repo = staged.repo
+    created = {}
+    skipped = []
+    tip = repo[tip_id]
+    for commit_id in commit_ids:
+        commit = repo[commit_id]
+        index = pick_commit(repo, commit, tip, revert, mainline)
+        conflicts = index_conflicts(index)
+        if conflicts:
+            return created, skipped, tip.id, (str(commit.id), conflicts)
+
+        tree = index.write_tree(repo)
+        if tree == tip.tree_id:
+            skipped.append(str(commit.id))
+            continue
+        if revert:
+            author, msg = committer, message or revert_message(commit)
+        else:
+            author, msg = commit.author, message or cherry_pick_message(commit)
+        new_id = repo.create_commit(None, author, committer, msg, tree, [tip.id])
+        created[str(commit.id)] = str(new_id)
+        tip = repo[new_id]
+    return created, skipped, tip.id, None
+
+
+SEMVER_TAG = re.compile(r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+
+
+def semver_key(name):
+    """
+    a sort key ordering version tags (v1.2.3, 1.2, v2.0.0-rc.1, ...) by
+    semver precedence, or None if name isn't a version
+    """
+    match = SEMVER_TAG.match(name)
+    if match is None:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    version = (int(major), int(minor or 0), int(patch or 0))
+    if prerelease is None:
+        # a release sorts after all of its prereleases
+        return version + (1, ())
+    identifiers = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in prerelease.split("."))
+    return version + (0, identifiers)
+
+
+def tag_index(repo, match=None, exclude=None, lightweight=True):
+    """
+    peel every tag (short names matching the match globs and none of the
+    exclude globs) to its commit once, returns {commit id: [tag names]}.
+    tags of trees and blobs are left out
+    """
+    index = {}
+    for name in repo.references:
+        if not name.startswith("refs/tags/"):
+            continue
+        short = name[len("refs/tags/"):]
+        if match and not any(fnmatch.fnmatchcase(short, pattern) for pattern in match):
+            continue
+        if exclude and any(fnmatch.fnmatchcase(short, pattern) for pattern in exclude):
+            continue
+        ref = repo.references[name]
+        if ref.type != pygit2.enums.ReferenceType.DIRECT:
+            continue
+        obj = repo[ref.target]
+        if not lightweight and obj.type != pygit2.enums.ObjectType.TAG:
+            continue
+        try:
+            commit = obj.peel(pygit2.Commit)
+        except (pygit2.GitError, ValueError):
+            continue
+        index.setdefault(commit.id, []).append(short)
+    return index
+
+
+def best_tag(names):
+    """
+    the highest version of names, or the last alphabetically if none are versions
+    """
+    return max(names, key=lambda name: (semver_key(name) is not None, semver_key(name) or (), name))
+
+
+DESCRIBE_CANDIDATES = 10
+
+
+def nearest_tag(repo, target, index):
+    """
+    the tag nearest to the commit target, as (tag name, tagged commit id,
+    commits since the tag) or None. like git describe, the first
+    DESCRIBE_CANDIDATES tagged commits found are candidates and the one
+    with the fewest commits since it wins. the distances of all of them
+    are counted in the one walk, by marking each commit with the
+    candidates whose history it is in
+    """
+    if not index:
+        return None
+    if target in index:
+        return best_tag(index[target]), target, 0
+    candidates = []
+    full = 0
+    # the candidate bits of commits whose children have been walked
+    pending = {}
+    walked = 0
+    for commit in repo.walk(target, pygit2.enums.SortMode.TOPOLOGICAL | pygit2.enums.SortMode.TIME):
+        marks = pending.pop(commit.id, 0)
+        if len(candidates) < DESCRIBE_CANDIDATES and commit.id in index:
+            marks |= 1 << len(candidates)
+            full |= marks
+            # children come first, so nothing walked yet is in its history
+            candidates.append([commit.id, walked])
+        for bit, candidate in enumerate(candidates):
+            if not marks & (1 << bit):
+                candidate[1] += 1
+        walked += 1
+        for parent_id in commit.parent_ids:
+            pending[parent_id] = pending.get(parent_id, 0) | marks
+        if len(candidates) == DESCRIBE_CANDIDATES and all(bits == full for bits in pending.values()):
+            # the rest of the history is in every candidate's
+            break
+    if not candidates:
+        return None
+    commit_id, distance = min(candidates, key=lambda candidate: candidate[1])
+    return best_tag(index[commit_id]), commit_id, distance
+
+
+def abbreviate(repo, oid, length):
+    """
+    the shortest prefix of oid, of at least length hex digits, no other
+    object in repo starts with
+    """
+    hex_id = str(oid)
+    for size in range(max(length, 4), len(hex_id)):
+        try:
+            repo[hex_id[:size]]
+            return hex_id[:size]
+        except pygit2.AmbiguousError:
+            pass
+    return hex_id
+
+
+def latest_tag(repo, index, target=None, prereleases=False):
+    """
+    the highest version tag in index, as (tag name, commit id) or None. with
+    target only tags it contains count, checked newest version first so
+    usually only one ancestry check is needed
+    """
+    versions = []
+    for commit_id, names in index.items():
+        for name in names:
+            key = semver_key(name)
+            if key is not None and (prereleases or key[3] == 1):
+                versions.append((key, name, commit_id))
+    for _, name, commit_id in sorted(versions, reverse=True):
+        if target is None or commit_id == target or repo.descendant_of(target, commit_id):
+            return name, commit_id
+    return None
+
+
+OBJECT_TYPE_NAMES = {
+    pygit2.enums.ObjectType.COMMIT: b"commit",
+    pygit2.enums.ObjectType.TREE: b"tree",
+    pygit2.enums.ObjectType.BLOB: b"blob",
+    pygit2.enums.ObjectType.TAG: b"tag",
+}
+
+
+def hash_object(object_type, data):
+    header = OBJECT_TYPE_NAMES[object_type] + b" " + str(len(data)).encode() + b"\0"
+    return pygit2.Oid(raw=hashlib.sha1(header + data).digest())
+
+
+STAGED_PRIORITY = 10
+
+
+class StagedObjects:
+    """
+    a temporary loose object store layered over a repository's odb, on a
+    repository handle of its own (staged.repo). every object written
+    through staged.repo lands in it and is readable straight away, and
+    commit() packs them all into the repo with one PackBuilder pass, so no
+    loose objects are left behind. without commit() nothing reaches the odb
+    """
+
+    def __init__(self, repo):
+        # libgit2 can't remove a backend, so the staging one goes away with this handle
+        self.repo = pygit2.Repository(repo.path)
+        self.path = tempfile.mkdtemp(prefix="tmp_objdir-", dir=os.path.join(repo.path, "objects"))
+        # above the default loose and pack backends, so libgit2 writes here rather than to the odb
+        self.repo.odb.add_backend(pygit2.OdbBackendLoose(self.path, 1, False), STAGED_PRIORITY)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.path, ignore_errors=True)
+        return False
+
+    def write(self, object_type, data):
+        oid = hash_object(object_type, data)
+        if oid not in self.repo.odb:
+            self.repo.odb.write(object_type, data)
+        return oid
+
+    def read(self, oid):
+        return self.repo.odb.read(oid)
+
+    def commit(self):
+        """
+        pack the staged objects into the repository, returns how many were packed
+        """
+        ids = [pygit2.Oid(hex=oid) for oid, _path in loose_objects(self.repo, self.path)]
+        if not ids:
+            return 0
+        builder = pygit2.PackBuilder(self.repo)
+        for oid in ids:
+            builder.add(oid)
+        builder.write(os.path.join(self.repo.path, "objects", "pack"))
+        return builder.written_objects_count
+
+
+def import_pack(git_bin, repo, f):
+    """
+    index the pack that f (a file object) is positioned at into repo with
+    git index-pack, which resolves the deltas and completes a thin pack from
+    objects the repo already has. returns how many objects the pack holds
+    """
+    start = f.tell()
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"PACK":
+        raise ValueError("not a pack")
+    # index-pack reads the file descriptor, whose offset is past whatever f has buffered
+    os.lseek(f.fileno(), start, os.SEEK_SET)
+    proc = subprocess.run([git_bin, f"--git-dir={repo.path}", "index-pack", "--stdin", "--fix-thin"],
+                          stdin=f.fileno(), capture_output=True)
+    if proc.returncode != 0:
+        raise ValueError(proc.stderr.decode("utf-8", "replace").strip())
+    return int.from_bytes(header[8:12], "big")
+
+
+PACK_INDEX_SIGNATURE = b"\377tOc"
+PACK_LARGE_OFFSET = 0x80000000
+
+
+def tree_data(entries):
+    """
+    the raw tree object for entries of (name bytes, filemode, oid), sorted the
+    way git sorts them, with directories compared as if they ended in /
+    """
+    def sort_key(entry):
+        name, mode, _ = entry
+        return name + b"/" if mode == pygit2.enums.FileMode.TREE else name
+
+    return b"".join(b"%o %s\0" % (mode, name) + oid.raw for name, mode, oid in sorted(entries, key=sort_key))
+
+
+def commit_data(tree, parents, author, committer, message):
+    """
+    the raw commit object, author and committer are pygit2.Signatures
+    """
+    def signature(sig):
+        sign = "-" if sig.offset < 0 else "+"
+        hours, minutes = divmod(abs(sig.offset), 60)
+        return f"{sig.name} <{sig.email}> {sig.time} {sign}{hours:02d}{minutes:02d}"
+
+    lines = [f"tree {tree}"]
+    lines += [f"parent {parent}" for parent in parents]
+    lines.append(f"author {signature(author)}")
+    lines.append(f"committer {signature(committer)}")
+    if not message.endswith("\n"):
+        message += "\n"
+    return ("\n".join(lines) + "\n\n" + message).encode()
+
+
+def write_pack(repo, objects):
+    """
+    write objects, a list of (oid, type, data), to repo as a new pack and its
+    index. the objects are stored whole, deltas are left to the next repack
+    """
+    pack_dir = os.path.join(repo.path, "objects", "pack")
+    os.makedirs(pack_dir, exist_ok=True)
+    fd, pack_tmp = tempfile.mkstemp(dir=pack_dir, prefix="tmp_pack_")
+    entries = []
+    try:
+        with os.fdopen(fd, "wb") as f:
+            sha = hashlib.sha1()
+            offset = 0
+
+            def emit(data):
+                nonlocal offset
+                f.write(data)
+                sha.update(data)
+                offset += len(data)
+
+            emit(b"PACK" + (2).to_bytes(4, "big") + len(objects).to_bytes(4, "big"))
+            for oid, object_type, data in objects:
+                size = len(data)
+                header = bytearray([(object_type << 4) | (size & 0x0f)])
+                size >>= 4
+                while size:
+                    header[-1] |= 0x80
+                    header.append(size & 0x7f)
+                    size >>= 7
+                packed = bytes(header) + zlib.compress(data)
+                entries.append((oid.raw, zlib.crc32(packed), offset))
+                emit(packed)
+            pack_sha = sha.digest()
+            f.write(pack_sha)
+
+        entries.sort()
+        fanout = [0] * 256
+        for raw, _, _ in entries:
+            fanout[raw[0]] += 1
+        index = bytearray(PACK_INDEX_SIGNATURE + (2).to_bytes(4, "big"))
+        total = 0
+        for count in fanout:
+            total += count
+            index += total.to_bytes(4, "big")
+        index += b"".join(raw for raw, _, _ in entries)
+        index += b"".join(crc.to_bytes(4, "big") for _, crc, _ in entries)
+        large = []
+        for _, _, offset in entries:
+            if offset < PACK_LARGE_OFFSET:
+                index += offset.to_bytes(4, "big")
+            else:
+                index += (PACK_LARGE_OFFSET | len(large)).to_bytes(4, "big")
+                large.append(offset)
+        index += b"".join(offset.to_bytes(8, "big") for offset in large)
+        index += pack_sha
+        index += hashlib.sha1(index).digest()
+
+        name = os.path.join(pack_dir, f"pack-{pack_sha.hex()}")
+        os.chmod(pack_tmp, 0o444)
+        os.replace(pack_tmp, name + ".pack")
+        # the pack is only used once its index appears
+        fd, index_tmp = tempfile.mkstemp(dir=pack_dir, prefix="tmp_idx_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(index)
+        os.chmod(index_tmp, 0o444)
+        os.replace(index_tmp, name + ".idx")
+    finally:
+        if os.path.exists(pack_tmp):
+            os.unlink(pack_tmp)
+    return len(objects)
+
+
+class MemoryObjects:
+    """
+    an in-memory object store for building history without touching the odb,
+    standing in for libgit2's mempack backend, which pygit2 doesn't expose.
+    flush() writes everything held as a single pack
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.objects = {}
+        self.size = 0
+
+    def __contains__(self, oid):
+        return oid in self.objects or oid in self.repo.odb
+
+    def write(self, object_type, data):
+        oid = hash_object(object_type, data)
+        if oid not in self:
+            self.objects[oid] = (object_type, data)
+            self.size += len(data)
+        return oid
+
+    def flush(self):
+        """
+        pack the objects held into the repository, returns how many were packed
+        """
+        if not self.objects:
+            return 0
+        count = write_pack(self.repo, [(oid, object_type, data) for oid, (object_type, data) in self.objects.items()])
+        self.clear()
+        return count
+
+    def clear(self):
+        """
+        drop the objects held without writing them (for check mode)
+        """
+        self.objects = {}
+        self.size = 0
+
+
+BUNDLE_SIGNATURE = b"# v2 git bundle\n"
+
+
+def read_bundle_header(f):
+    """
+    parse a v2 bundle header, returns (prerequisites, refs) as lists of
+    (id, comment) and (refname, id), leaving f at the start of the pack
+    """
+    if f.readline() != BUNDLE_SIGNATURE:
+        raise ValueError("not a v2 git bundle")
+    prerequisites, refs = [], []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("truncated bundle header")
+        line = line.rstrip(b"\n").decode("utf-8", "surrogateescape")
+        if not line:
+            return prerequisites, refs
+        if line.startswith("-"):
+            oid, _, comment = line[1:].partition(" ")
+            prerequisites.append((oid, comment))
+        else:
+            oid, _, name = line.partition(" ")
+            refs.append((name, oid))
+
+
+def verify_pack(f):
+    """
+    check a pack's header and trailing checksum without unpacking it,
+    returns the number of objects it claims to hold
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"PACK":
+        raise ValueError("not a pack")
+    sha = hashlib.sha1(header)
+    tail = b""
+    while True:
+        chunk = f.read(BLOB_CHUNK_SIZE)
+        if not chunk:
+            break
+        data = tail + chunk
+        sha.update(data[:-20])
+        tail = data[-20:]
+    if len(tail) != 20 or sha.digest() != tail:
+        raise ValueError("pack checksum mismatch")
+    return int.from_bytes(header[8:12], "big")
+
+
+def bundle_objects(repo, tips, bases):
+    """
+    ids of the objects reachable from tips (commits or tags) but not from bases.
+    like git bundle, the trees and blobs of the bases count as present at the
+    other end, so unchanged files are never resent
+    """
+    present = set()
+    for base in bases:
+        present.add(str(base))
+        _add_tree(repo, repo[base].peel(pygit2.Tree), present)
+
+    objects = set(present)
+    commits = []
+    for tip in tips:
+        obj = repo[tip]
+        while obj.type == pygit2.enums.ObjectType.TAG:
+            objects.add(str(obj.id))
+            obj = repo[obj.target]
+        if obj.type == pygit2.enums.ObjectType.COMMIT:
+            commits.append(obj.id)
+        elif obj.type == pygit2.enums.ObjectType.TREE:
+            # a tag of a tree has no history to walk, just the tree
+            _add_tree(repo, obj, objects)
+        else:
+            objects.add(str(obj.id))
+
+    if commits:
+        walker = repo.walk(None)
+        for commit_id in commits:
+            walker.push(commit_id)
+        for base in bases:
+            walker.hide(base)
+        for commit in walker:
+            objects.add(str(commit.id))
+            _add_tree(repo, commit.tree, objects)
+
+    return [pygit2.Oid(hex=oid) for oid in objects - present]
+
+
+def write_bundle(repo, dest, refs, bases):
+    """
+    write a v2 bundle of refs, a list of (refname, id), to dest leaving out
+    everything reachable from bases. the pack is built next to dest and copied
+    in behind the header, returns how many objects it holds
+    """
+    objects = bundle_objects(repo, [oid for _, oid in refs], bases)
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(dest) or ".", prefix=".tmp-bundle-")
+    try:
+        builder = pygit2.PackBuilder(repo)
+        for oid in objects:
+            builder.add(oid)
+        builder.write(work_dir)
+        pack = [name for name in os.listdir(work_dir) if name.endswith(".pack")][0]
+
+        tmp_path = os.path.join(work_dir, "bundle")
+        with open(tmp_path, "wb") as out:
+            out.write(BUNDLE_SIGNATURE)
+            for base in bases:
+                subject = repo[base].peel(pygit2.Commit).message.split("\n", 1)[0]
+                out.write(f"-{base} {subject}\n".encode())
+            for name, oid in refs:
+                out.write(f"{oid} {name}\n".encode())
+            out.write(b"\n")
+            with open(os.path.join(work_dir, pack), "rb") as src:
+                shutil.copyfileobj(src, out, BLOB_CHUNK_SIZE)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return builder.written_objects_count
@@ -6,18 +6,31 @@
 from ansible.module_utils.basic import AnsibleModule
 import pygit2
 from ansible.module_utils.pygit_utils import (
+    LARGE_FILE_ARGS,
+    LOCK_TIMEOUT,
+    LockTimeout,
+    LockWaiter,
+    RESULT_DETAIL_ARGS,
+    bound_result,
+    describe_paths,
     get_wt_changes,
     get_status,
     open_repository,
+    register_large_files,
     relativize_path,
-    normalize_path
+    normalize_path,
+    track_large_files,
 )
 
 DOCUMENTATION = r'''
 ---
 module: git_add
 short_description: Stage one or more files in a Git repository
-description: Stage files that have working tree changes in a Git repository. Idempotent; unchanged files are ignored.
+description:
+  - Stage files that have working tree changes in a Git repository. Idempotent; unchanged files are ignored.
+  - With C(large_files), files with the C(filter=lfs) attribute are stored in a content-addressed store on the host
+    and only a small git-lfs style pointer is committed. Files matching C(large_file_patterns) or at least
+    C(large_file_threshold) bytes get that attribute in C(.gitattributes), which is staged with them.
 options:
   repo:
     description: Path on the filesystem to the Git repository worktree
@@ -27,6 +40,62 @@ options:
     description: List of file paths to stage. Paths may be absolute (inside the worktree) or relative to the worktree.
     type: list
     required: true
+  lock_timeout:
+    description: Seconds to keep retrying, with exponential backoff, while another process holds the index lock
+    type: int
+    required: false
+    default: 30
+  serialize:
+    description: Hold a host-local advisory lock on the repository for the whole task, so forks staging into the same repository queue up
+    type: bool
+    required: false
+    default: false
+  result_detail:
+    description:
+      - C(full) returns every path. If C(result_inline_limit) is set, lists longer than it are written to C(result_file)
+        on the target (except in check mode) and only a sample is returned inline.
+      - C(summary) returns C(result_sample) paths of each list, C(none) returns no paths. C(summary) is always returned.
+    type: str
+    required: false
+    choices: [full, summary, none]
+    default: full
+  result_sample:
+    description: How many paths of each list to return when they are cut short
+    type: int
+    required: false
+    default: 20
+  result_inline_limit:
+    description: The longest list returned inline with C(result_detail=full), by default there is no limit
+    type: int
+    required: false
+  result_file:
+    description: Where to write the lists too long to return inline, as JSON (default C(ansible_pygit_result.json) in the git directory)
+    type: path
+    required: false
+  large_files:
+    description: Store the content of files with the C(filter=lfs) attribute outside the repository, committing pointers
+    type: bool
+    required: false
+    default: false
+  large_file_threshold:
+    description: With C(large_files), also store files of at least this many bytes outside the repository, 0 for none
+    type: int
+    required: false
+    default: 0
+  large_file_patterns:
+    description: With C(large_files), also store files matching these C(.gitattributes) patterns outside the repository
+    type: list
+    elements: str
+    required: false
+  large_file_store:
+    description: The content-addressed store, shared by every repository on the host so each large file is kept once
+    type: path
+    required: false
+    default: ~/.cache/ansible_pygit/lfs
+  large_file_remote:
+    description: A directory standing in for a remote store, every large file staged is copied there too
+    type: path
+    required: false
 '''
 
 EXAMPLES = r'''
@@ -36,6 +105,22 @@ EXAMPLES = r'''
      files:
      - test_file1
      - test_file2
+
+ - name: Stage a generated tree, returning only counts
+   git_add:
+     repo: /home/example/projects/test_repo
+     files: "{{ generated_files }}"
+     result_detail: summary
+
+ - name: Stage build artifacts, keeping anything over 10MB out of the object database
+   git_add:
+     repo: /home/example/projects/test_repo
+     files: "{{ artifacts }}"
+     large_files: true
+     large_file_threshold: 10485760
+     large_file_patterns:
+       - "*.iso"
+     large_file_remote: /mnt/shared/lfs
 '''
 
 RETURN = r'''
@@ -45,12 +130,24 @@ added_files:
 status:
   description: A dict with the files currently staged for commit as keys and their statuses as the values
   type: dict
+large_files:
+  description: The staged files whose content went to the large-file store (relative to the worktree)
+  type: list
 ignored_files:
   description: Files that were ignored because they are outside the repository or had no working tree changes
   type: list
 changed:
   description: Whether any change was made
   type: bool
+summary:
+  description: For each of C(added_files), C(ignored_files) and C(status), the C(total) number of paths, whether the list was C(truncated) and for C(status) the C(counts) of each status
+  type: dict
+result_file:
+  description: The file the full lists were written to, when any were too long to return inline
+  type: str
+lock_wait:
+  description: Seconds spent waiting for the index lock or the advisory lock
+  type: float
 message:
   description: A human-readable message
   type: str
@@ -62,8 +159,22 @@ message:
 module_args = {
     "repo": {"type": 'path', "required": True},
     "files": {"type": "list", "required": True},
+    "lock_timeout": {"type": 'int', "required": False, "default": LOCK_TIMEOUT},
+    "serialize": {"type": 'bool', "required": False, "default": False},
+    **RESULT_DETAIL_ARGS,
+    **LARGE_FILE_ARGS,
 }
 
+RESULT_LISTS = ['added_files', 'large_files', 'ignored_files', 'status']
+
+
+def write_index(index, paths):
+    # pick up anything written by whoever held the lock before adding to it
+    index.read(False)
+    for rel_path in paths:
+        index.add(rel_path)
+    index.write()
+
 
 def run_module():
 
@@ -72,8 +183,10 @@ def run_module():
         "changed": False,
         "message": '',
         "added_files": [],
+        "large_files": [],
         "ignored_files": [],
         "status": {},
+        "lock_wait": 0.0,
     }
 
     module = AnsibleModule(
@@ -89,41 +202,55 @@ def run_module():
     except pygit2.GitError as e:
         module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
 
-    index = repo_ref.index
-
-    working_tree_changes = get_wt_changes(repo_ref)
-
-    to_stage: list[str] = []
-    ignored: list[str] = []
-
-    for provided_path in files:
-        is_inside, abs_path, rel_path = relativize_path(repo_ref, provided_path)
-        if not is_inside:
-            # outside the repo; ignore
-            ignored.append(provided_path)
-            continue
-        if working_tree_changes.get(rel_path):
-            to_stage.append(rel_path)
-        else:
-            ignored.append(provided_path)
-
-    if module.check_mode:
-        if to_stage:
-            result['message'] = f"would stage {','.join(to_stage)} for commit"
-            result['changed'] = False
-            result['ignored_files'] = ignored
-            result['status'] = get_status(repo_ref)
-            module.exit_json(**result)
-        else:
-            result['message'] = "no new files added for commit"
-            result['ignored_files'] = ignored
-            result['status'] = get_status(repo_ref)
-            module.exit_json(**result)
-
-    if to_stage:
-        for rel_path in to_stage:
-            index.add(rel_path)
-        index.write()
+    # before anything hashes the worktree, so large files compare as their pointers
+    register_large_files(module.params, module.check_mode)
+
+    locks = LockWaiter(repo_ref, timeout=module.params.get('lock_timeout'), serialize=module.params.get('serialize'))
+    try:
+        with locks:
+            result['lock_wait'] = locks.waited
+            index = repo_ref.index
+
+            working_tree_changes = get_wt_changes(repo_ref)
+
+            to_stage: list[str] = []
+            ignored: list[str] = []
+
+            for provided_path in files:
+                is_inside, abs_path, rel_path = relativize_path(repo_ref, provided_path)
+                if not is_inside:
+                    # outside the repo; ignore
+                    ignored.append(provided_path)
+                    continue
+                if working_tree_changes.get(rel_path):
+                    to_stage.append(rel_path)
+                else:
+                    ignored.append(provided_path)
+
+            if module.check_mode:
+                if to_stage:
+                    result['message'] = f"would stage {describe_paths(to_stage, module.params)} for commit"
+                    result['changed'] = False
+                    result['ignored_files'] = ignored
+                    result['status'] = get_status(repo_ref)
+                    module.exit_json(**bound_result(repo_ref, module.params, result, RESULT_LISTS, module.check_mode))
+                else:
+                    result['message'] = "no new files added for commit"
+                    result['ignored_files'] = ignored
+                    result['status'] = get_status(repo_ref)
+                    module.exit_json(**bound_result(repo_ref, module.params, result, RESULT_LISTS, module.check_mode))
+
+            if to_stage and module.params.get('large_files'):
+                tracked = track_large_files(repo_ref, to_stage, module.params.get('large_file_threshold'),
+                                            module.params.get('large_file_patterns'))
+                if tracked and ".gitattributes" not in to_stage:
+                    to_stage.append(".gitattributes")
+
+            if to_stage:
+                locks.run(write_index, index, to_stage)
+    except LockTimeout as e:
+        module.fail_json(msg=f"failed to stage files in {repo}", exception=str(e), lock_wait=locks.waited)
+    result['lock_wait'] = locks.waited
 
     result['status'] = get_status(repo_ref)
 
@@ -132,11 +259,13 @@ def run_module():
         result['ignored_files'] = ignored
     else:
         result['added_files'] = to_stage
+        if module.params.get('large_files'):
+            result['large_files'] = [path for path in to_stage if repo_ref.get_attr(path, "filter") == "lfs"]
         result['ignored_files'] = ignored
-        result['message'] = f"staged {','.join(to_stage)} for commit"
+        result['message'] = f"staged {describe_paths(to_stage, module.params)} for commit"
         result['changed'] = True
 
-    module.exit_json(**result)
+    module.exit_json(**bound_result(repo_ref, module.params, result, RESULT_LISTS, module.check_mode))
 
 
 def main():
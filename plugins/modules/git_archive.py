@@ -0,0 +1,296 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_archive
+short_description: Create a tar or zip archive of a ref
+description:
+  - Streams the files of a branch, tag or commit from the object database straight into a tar, tar.gz or zip archive,
+    without a checkout.
+  - Archives are reproducible, entries are sorted by path and every timestamp is the commit time. Like C(git archive)
+    each directory gets an entry of its own.
+  - The tree id and options are recorded in the archive, and an archive already built from the same tree with the same options
+    is not regenerated.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  ref:
+    description: The branch, tag or commit to archive
+    type: str
+    required: false
+    default: HEAD
+    aliases: [branch]
+  dest:
+    description: Path of the archive to create
+    type: path
+    required: true
+  format:
+    description: The archive format, by default it is guessed from the extension of C(dest)
+    type: str
+    required: false
+    choices: [tar, tar.gz, zip]
+  prefix:
+    description: A directory to prepend to every path in the archive, e.g. C(app-1.0/)
+    type: str
+    required: false
+    default: ''
+  paths:
+    description: Only archive these files or directories (relative to the repository root)
+    type: list
+    elements: str
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Build a release tarball
+  git_archive:
+    repo: /srv/git/app.git
+    ref: v1.2.0
+    dest: /srv/releases/app-1.2.0.tar.gz
+    prefix: app-1.2.0/
+
+- name: Zip up the docs directory
+  git_archive:
+    repo: /srv/git/app.git
+    dest: /srv/releases/docs.zip
+    paths:
+      - docs
+'''
+
+RETURN = r'''
+commit:
+  description: The commit id that was archived
+  type: str
+tree:
+  description: The tree id that was archived
+  type: str
+entries:
+  description: The number of files in the archive
+  type: int
+changed:
+  description: Whether the archive was (re)generated
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import gzip
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    BLOB_CHUNK_SIZE,
+    flatten_tree,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "ref": {"type": 'str', "required": False, "default": "HEAD", "aliases": ['branch']},
+    "dest": {"type": 'path', "required": True},
+    "format": {"type": 'str', "required": False, "choices": ['tar', 'tar.gz', 'zip']},
+    "prefix": {"type": 'str', "required": False, "default": ''},
+    "paths": {"type": 'list', "elements": 'str', "required": False},
+}
+
+LINK = int(pygit2.enums.FileMode.LINK)
+EXECUTABLE = int(pygit2.enums.FileMode.BLOB_EXECUTABLE)
+FINGERPRINT_KEY = "PYGIT.fingerprint"
+# zip can't store dates before 1980
+ZIP_EPOCH = 315532800
+
+
+def guess_format(dest):
+    if dest.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if dest.endswith(".zip"):
+        return "zip"
+    return "tar"
+
+
+def select_entries(entries, paths):
+    if not paths:
+        return entries
+    prefixes = [path.strip("/") for path in paths]
+    return dict((path, entry) for path, entry in entries.items()
+                if any(path == p or path.startswith(p + "/") for p in prefixes))
+
+
+def archive_fingerprint(tree_id, archive_format, prefix, paths):
+    key = "\n".join([str(tree_id), archive_format, prefix] + sorted(paths or []))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def existing_fingerprint(dest, archive_format):
+    try:
+        if archive_format == "zip":
+            with zipfile.ZipFile(dest) as archive:
+                return archive.comment.decode().split("\n")[-1]
+        with tarfile.open(dest, "r:*") as archive:
+            return archive.pax_headers.get(FINGERPRINT_KEY)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile, UnicodeDecodeError):
+        return None
+
+
+def archive_members(entries, prefix):
+    """
+    (name, entry) for every file in the archive and (name/, None) for every
+    directory above them, like git archive, sorted so directories come first
+    """
+    members = dict((prefix + path, entry) for path, entry in entries.items())
+    for name in list(members):
+        parts = name.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            members.setdefault("/".join(parts[:depth]) + "/", None)
+    return sorted(members.items())
+
+
+def write_tar(repo_ref, out, entries, prefix, mtime, pax_headers):
+    with tarfile.open(fileobj=out, mode="w|", format=tarfile.PAX_FORMAT, pax_headers=pax_headers) as archive:
+        for name, entry in archive_members(entries, prefix):
+            info = tarfile.TarInfo(name)
+            info.mtime = mtime
+            info.uname = info.gname = "root"
+            if entry is None:
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                archive.addfile(info)
+                continue
+            blob_id, mode = entry
+            blob = repo_ref[blob_id]
+            if mode == LINK:
+                info.type = tarfile.SYMTYPE
+                info.linkname = blob.data.decode("utf-8", "surrogateescape")
+                info.mode = 0o777
+                archive.addfile(info)
+                continue
+            info.mode = 0o755 if mode == EXECUTABLE else 0o644
+            info.size = blob.size
+            with pygit2.BlobIO(blob) as src:
+                archive.addfile(info, src)
+
+
+def write_zip(repo_ref, out, entries, prefix, mtime, comment):
+    date_time = time.gmtime(max(mtime, ZIP_EPOCH))[:6]
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.comment = comment
+        for name, entry in archive_members(entries, prefix):
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.create_system = 3
+            if entry is None:
+                info.external_attr = (0o40755 << 16) | 0x10
+                archive.writestr(info, b"")
+                continue
+            blob_id, mode = entry
+            blob = repo_ref[blob_id]
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # streamed entries only get zip64 headers when the size is known up front
+            info.file_size = blob.size
+            if mode == LINK:
+                info.external_attr = (0o120777 << 16)
+            else:
+                info.external_attr = (0o100755 if mode == EXECUTABLE else 0o100644) << 16
+            with archive.open(info, "w") as dst, pygit2.BlobIO(blob) as src:
+                shutil.copyfileobj(src, dst, BLOB_CHUNK_SIZE)
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "tree": '',
+        "entries": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    ref = module.params.get('ref')
+    dest = normalize_path(module.params.get('dest'))
+    archive_format = module.params.get('format') or guess_format(dest)
+    prefix = module.params.get('prefix')
+    paths = module.params.get('paths')
+
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    commit = resolve_commit(repo_ref, ref)
+    if commit is None:
+        module.fail_json(msg=f"{ref} not found in {repo}")
+    commit = commit.peel(pygit2.Commit)
+    result['commit'] = str(commit.id)
+    result['tree'] = str(commit.tree_id)
+
+    entries = select_entries(flatten_tree(repo_ref, commit.tree), paths)
+    result['entries'] = len(entries)
+
+    fingerprint = archive_fingerprint(commit.tree_id, archive_format, prefix, paths)
+    if os.path.exists(dest) and existing_fingerprint(dest, archive_format) == fingerprint:
+        result['message'] = f"{dest} is already an archive of {ref}"
+        module.exit_json(**result)
+
+    if module.check_mode:
+        result['message'] = f"would archive {ref} to {dest}"
+        module.exit_json(**result)
+
+    dest_dir = os.path.dirname(dest)
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if archive_format == "zip":
+                comment = f"{commit.id}\n{fingerprint}".encode()
+                write_zip(repo_ref, out, entries, prefix, commit.commit_time, comment)
+            else:
+                pax_headers = {"comment": str(commit.id), FINGERPRINT_KEY: fingerprint}
+                if archive_format == "tar.gz":
+                    # no file name and a fixed mtime keep the gzip header reproducible
+                    with gzip.GzipFile(filename="", mode="wb", fileobj=out, mtime=commit.commit_time) as gz:
+                        write_tar(repo_ref, gz, entries, prefix, commit.commit_time, pax_headers)
+                else:
+                    write_tar(repo_ref, out, entries, prefix, commit.commit_time, pax_headers)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        module.fail_json(msg=f"failed to write {dest}", exception=str(e))
+
+    result['message'] = f"archived {ref} to {dest}"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_bundle
+short_description: Create, verify and fetch from git bundles
+description:
+  - Moves history between repositories that can't reach each other, e.g. across an air gap, as a single file
+    in git's v2 bundle format (readable by C(git bundle) and C(git fetch)).
+  - C(create) writes a bundle of C(refs). With C(bases), commits already present at the other end,
+    only the history since them is included, so the bundle is proportional to the new history.
+  - C(verify) checks a bundle's header and pack checksum, and that the repository has its prerequisite commits.
+  - C(fetch) hands the bundle's pack to C(git index-pack) and updates remote-tracking refs, like fetching from a
+    C(file://) remote. This needs the C(git) command.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  path:
+    description: Path of the bundle file
+    type: path
+    required: true
+  action:
+    description: Whether to create, verify or fetch from the bundle
+    type: str
+    required: false
+    choices: [create, verify, fetch]
+    default: create
+  refs:
+    description: The branches and tags to put in the bundle (C(create) only), defaults to every local branch and tag
+    type: list
+    elements: str
+    required: false
+  bases:
+    description: Commits (or refs) the receiving repository already has, the bundle leaves out their history (C(create) only)
+    type: list
+    elements: str
+    required: false
+  remote:
+    description:
+      - Branches in the bundle are fetched to C(refs/remotes/<remote>/) (C(fetch) only).
+      - Tags are fetched to C(refs/tags/) and existing tags are never moved.
+    type: str
+    required: false
+    default: bundle
+'''
+
+EXAMPLES = r'''
+- name: Bundle everything since the last transfer
+  git_bundle:
+    repo: /srv/git/app.git
+    path: /media/usb/app.bundle
+    refs:
+      - main
+      - v1.2.0
+    bases:
+      - v1.1.0
+
+- name: Fetch it at the other end
+  git_bundle:
+    repo: /srv/git/app.git
+    path: /media/usb/app.bundle
+    action: fetch
+'''
+
+RETURN = r'''
+refs:
+  description: The refs in the bundle, as name to commit id
+  type: dict
+prerequisites:
+  description: The commits the bundle needs the receiving repository to have
+  type: list
+objects:
+  description: The number of objects in the bundle (C(create) and C(verify)) or added to the repository (C(fetch))
+  type: int
+updated_refs:
+  description: The local refs created or moved, as name to commit id (C(fetch) only)
+  type: dict
+changed:
+  description: Whether the bundle was written or the repository updated
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    import_pack,
+    normalize_path,
+    open_repository,
+    read_bundle_header,
+    resolve_commit,
+    verify_pack,
+    write_bundle,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "path": {"type": 'path', "required": True},
+    "action": {"type": 'str', "required": False, "choices": ['create', 'verify', 'fetch'], "default": 'create'},
+    "refs": {"type": 'list', "elements": 'str', "required": False},
+    "bases": {"type": 'list', "elements": 'str', "required": False},
+    "remote": {"type": 'str', "required": False, "default": 'bundle'},
+}
+
+
+def bundle_refs(repo_ref, names):
+    if not names:
+        return sorted((ref.name, ref.target) for ref in repo_ref.references.objects
+                      if ref.name.startswith(("refs/heads/", "refs/tags/"))
+                      and ref.type == pygit2.enums.ReferenceType.DIRECT)
+    refs = []
+    for name in names:
+        try:
+            ref = repo_ref.lookup_reference_dwim(name).resolve()
+        except (KeyError, pygit2.InvalidSpecError):
+            raise KeyError(f"{name} is not a branch or tag")
+        refs.append((ref.name, ref.target))
+    return sorted(set(refs))
+
+
+def read_header(path):
+    try:
+        with open(path, "rb") as f:
+            return read_bundle_header(f)
+    except (OSError, ValueError):
+        return None
+
+
+def local_ref_name(name, remote):
+    if name.startswith("refs/tags/"):
+        return name
+    if name.startswith("refs/heads/"):
+        name = name[len("refs/heads/"):]
+    elif name.startswith("refs/"):
+        name = name[len("refs/"):]
+    return f"refs/remotes/{remote}/{name}"
+
+
+def reachable_from(repo_ref, oid, bases):
+    obj = repo_ref[oid]
+    while obj.type == pygit2.enums.ObjectType.TAG:
+        obj = repo_ref[obj.target]
+    if obj.type != pygit2.enums.ObjectType.COMMIT:
+        # a tree or a blob has no history, it is always sent
+        return False
+    return any(obj.id == base or repo_ref.descendant_of(base, obj.id) for base in bases)
+
+
+def create(module, repo_ref, path, result):
+    try:
+        refs = bundle_refs(repo_ref, module.params.get('refs'))
+    except KeyError as e:
+        module.fail_json(msg=str(e))
+
+    bases = []
+    for base in module.params.get('bases') or []:
+        commit = resolve_commit(repo_ref, base)
+        if commit is None:
+            module.fail_json(msg=f"base {base} not found")
+        bases.append(commit.peel(pygit2.Commit).id)
+    bases = sorted(set(bases))
+
+    result['refs'] = dict((name, str(oid)) for name, oid in refs)
+    result['prerequisites'] = [str(oid) for oid in bases]
+
+    if bases and all(reachable_from(repo_ref, oid, bases) for _, oid in refs):
+        module.fail_json(msg="refusing to create an empty bundle, every ref is already in bases")
+
+    existing = read_header(path)
+    if existing is not None:
+        prerequisites, existing_refs = existing
+        if sorted(oid for oid, _ in prerequisites) == result['prerequisites'] \
+                and dict(existing_refs) == result['refs']:
+            result['message'] = f"{path} is already a bundle of these refs"
+            module.exit_json(**result)
+
+    if module.check_mode:
+        result['message'] = f"would write a bundle of {len(refs)} refs to {path}"
+        module.exit_json(**result)
+
+    try:
+        result['objects'] = write_bundle(repo_ref, path, refs, bases)
+    except (OSError, pygit2.GitError) as e:
+        module.fail_json(msg=f"failed to write {path}", exception=str(e))
+
+    result['message'] = f"wrote a bundle of {len(refs)} refs to {path}"
+    result['changed'] = True
+    module.exit_json(**result)
+
+
+def check_prerequisites(module, repo_ref, path, prerequisites):
+    missing = [oid for oid, _ in prerequisites if oid not in repo_ref]
+    if missing:
+        module.fail_json(msg=f"{path} needs commits missing from the repository: {','.join(missing)}",
+                         missing=missing)
+
+
+def verify(module, repo_ref, path, result):
+    try:
+        with open(path, "rb") as f:
+            prerequisites, refs = read_bundle_header(f)
+            result['objects'] = verify_pack(f)
+    except (OSError, ValueError) as e:
+        module.fail_json(msg=f"{path} is not a valid bundle", exception=str(e))
+
+    result['refs'] = dict(refs)
+    result['prerequisites'] = [oid for oid, _ in prerequisites]
+    check_prerequisites(module, repo_ref, path, prerequisites)
+
+    result['message'] = f"{path} is valid"
+    module.exit_json(**result)
+
+
+def fetch(module, repo_ref, path, result):
+    remote = module.params.get('remote')
+    try:
+        with open(path, "rb") as f:
+            prerequisites, refs = read_bundle_header(f)
+            result['refs'] = dict(refs)
+            result['prerequisites'] = [oid for oid, _ in prerequisites]
+            check_prerequisites(module, repo_ref, path, prerequisites)
+
+            updates = {}
+            for name, oid in refs:
+                if name == "HEAD":
+                    continue
+                local = local_ref_name(name, remote)
+                current = repo_ref.references.get(local)
+                if current is None or (str(current.target) != oid and not local.startswith("refs/tags/")):
+                    updates[local] = oid
+
+            if updates and not module.check_mode and not all(oid in repo_ref for oid in updates.values()):
+                result['objects'] = import_pack(module.get_bin_path('git', required=True), repo_ref, f)
+    except (OSError, ValueError, pygit2.GitError) as e:
+        module.fail_json(msg=f"failed to fetch from {path}", exception=str(e))
+
+    result['updated_refs'] = updates
+    if not updates:
+        result['message'] = f"already up to date with {path}"
+        module.exit_json(**result)
+
+    if module.check_mode:
+        result['message'] = f"would update {','.join(sorted(updates))} from {path}"
+        module.exit_json(**result)
+
+    for local, oid in updates.items():
+        repo_ref.create_reference_direct(local, pygit2.Oid(hex=oid), True, message=f"fetch: from bundle {path}")
+
+    result['message'] = f"updated {','.join(sorted(updates))} from {path}"
+    result['changed'] = True
+    module.exit_json(**result)
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "refs": {},
+        "prerequisites": [],
+        "objects": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    path = normalize_path(module.params.get('path'))
+    action = module.params.get('action')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if action == 'create':
+        create(module, repo_ref, path, result)
+    elif action == 'verify':
+        verify(module, repo_ref, path, result)
+    else:
+        fetch(module, repo_ref, path, result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
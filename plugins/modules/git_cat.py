@@ -0,0 +1,219 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_cat
+short_description: Read files from a commit without checking it out
+description:
+  - Returns the contents of one or more paths from the tree of a branch, tag or commit, read straight from the object database.
+  - With C(dest) the files are streamed to disk in chunks instead, and files that already have the same content are left alone,
+    only fixing their mode if it differs.
+  - Works on bare repositories.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  ref:
+    description: The branch, tag or commit to read the files from
+    type: str
+    required: false
+    default: HEAD
+    aliases: [branch]
+  paths:
+    description: Paths of the files to read, relative to the repository root
+    type: list
+    elements: str
+    required: true
+  dest:
+    description:
+      - Directory to write the files to, each one is written to C(dest)/C(path).
+      - If omitted the contents are returned in the result.
+    type: path
+    required: false
+  max_inline_size:
+    description: Fail rather than return a file larger than this many bytes in the result (use C(dest) for large files)
+    type: int
+    required: false
+    default: 1048576
+'''
+
+EXAMPLES = r'''
+- name: Read a config file from the production branch
+  git_cat:
+    repo: /srv/git/deploy.git
+    ref: production
+    paths:
+      - config/app.yaml
+  register: config
+
+- name: Copy release files from a tag to /opt/app
+  git_cat:
+    repo: /srv/git/deploy.git
+    ref: v1.2.0
+    paths:
+      - bin/app
+      - config/app.yaml
+    dest: /opt/app
+'''
+
+RETURN = r'''
+files:
+  description: One entry per requested path
+  type: list
+  elements: dict
+  contains:
+    path:
+      description: The path in the tree
+      type: str
+    id:
+      description: The blob id of the file
+      type: str
+    size:
+      description: The size of the file in bytes
+      type: int
+    content:
+      description: The file contents, only returned when C(dest) is not set
+      type: str
+    encoding:
+      description: C(utf-8) for text content or C(base64) for binary content, only returned when C(dest) is not set
+      type: str
+    dest:
+      description: Where the file was written, only returned when C(dest) is set
+      type: str
+    changed:
+      description: Whether the file at C(dest) was (or in check mode would be) written
+      type: bool
+commit:
+  description: The commit id the files were read from
+  type: str
+changed:
+  description: Whether any file was written to C(dest)
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import base64
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    blob_up_to_date,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+    tree_blob,
+    write_blob,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "ref": {"type": 'str', "required": False, "default": "HEAD", "aliases": ['branch']},
+    "paths": {"type": 'list', "elements": 'str', "required": True},
+    "dest": {"type": 'path', "required": False},
+    "max_inline_size": {"type": 'int', "required": False, "default": 1048576},
+}
+
+
+def inline_content(blob):
+    if blob.is_binary:
+        return base64.b64encode(blob.data).decode("ascii"), "base64"
+    try:
+        return blob.data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return base64.b64encode(blob.data).decode("ascii"), "base64"
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "files": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    ref = module.params.get('ref')
+    paths = module.params.get('paths')
+    dest = module.params.get('dest')
+    max_inline_size = module.params.get('max_inline_size')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    commit = resolve_commit(repo_ref, ref)
+    if commit is None:
+        module.fail_json(msg=f"{ref} not found in {repo}")
+    commit = commit.peel(pygit2.Commit)
+    result['commit'] = str(commit.id)
+
+    blobs = []
+    missing = []
+    for path in paths:
+        blob = tree_blob(commit.tree, path.strip("/"))
+        if blob is None:
+            missing.append(path)
+        blobs.append((path.strip("/"), blob))
+
+    if missing:
+        module.fail_json(msg=f"{','.join(missing)} not found in {ref}")
+
+    written = []
+    for path, blob in blobs:
+        info = {"path": path, "id": str(blob.id), "size": blob.size}
+
+        if dest is None:
+            if blob.size > max_inline_size:
+                module.fail_json(msg=f"{path} is {blob.size} bytes, use dest to read files larger than {max_inline_size} bytes")
+            info['content'], info['encoding'] = inline_content(blob)
+            result['files'].append(info)
+            continue
+
+        file_dest = os.path.join(normalize_path(dest), path)
+        executable = blob.filemode == pygit2.enums.FileMode.BLOB_EXECUTABLE
+        info['dest'] = file_dest
+        if module.check_mode:
+            info['changed'] = not blob_up_to_date(blob, file_dest, executable)
+        else:
+            try:
+                info['changed'] = write_blob(blob, file_dest, executable=executable)
+            except OSError as e:
+                module.fail_json(msg=f"failed to write {file_dest}", exception=str(e))
+        if info['changed']:
+            written.append(path)
+        result['files'].append(info)
+
+    if dest is None:
+        result['message'] = f"read {','.join(p for p, _ in blobs)} from {ref}"
+    elif not written:
+        result['message'] = f"{dest} already up to date with {ref}"
+    elif module.check_mode:
+        result['message'] = f"would write {','.join(written)} to {dest}"
+    else:
+        result['message'] = f"wrote {','.join(written)} to {dest}"
+        result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -29,6 +29,22 @@ options:
     type: boolean
     required: false
     default: false
+  large_files:
+    description: hydrate files with the filter=lfs attribute, replacing their pointers with
+                 the content from the large-file store (see git_add)
+    type: boolean
+    default: false
+    required: false
+  large_file_store:
+    description: the content-addressed store shared by every repository on the host
+    type: path
+    default: ~/.cache/ansible_pygit/lfs
+    required: false
+  large_file_remote:
+    description: a directory standing in for a remote store, content missing from
+                 large_file_store is fetched from here
+    type: path
+    required: false
 '''
 
 EXAMPLES = r'''
@@ -39,7 +55,12 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-None
+hydrated_large_files:
+    description: pointer files replaced with their content from the large-file store (large_files only)
+    type: list
+missing_large_files:
+    description: files left as pointers because their content is in neither store (large_files only)
+    type: list
 '''
 
 import os
@@ -53,6 +74,7 @@ module_args = {
     "branch": {"type": "str", "required": True},
     "files": {"type": "list", "required": False},
     "force": {"type": "bool", "required": False, "default": False},
+    **LARGE_FILE_STORE_ARGS,
 }
 
 def run_module():
@@ -85,6 +107,8 @@ def run_module():
         module.fail_json(msg = f"failed to get repo at {repo}",
                          exception = str(e))
 
+    register_large_files(module.params, module.check_mode)
+
     ref = resolve_reference(repo_ref, branch)
     if ref == None:
         module.fail_json(msg = f"can't resolve branch {branch}",
@@ -99,6 +123,12 @@ def run_module():
         result['message'] = f"{ branch } already checked out"
         result['changed'] = False
 
+        if module.params.get('large_files'):
+            # hydrate anything whose content has turned up since
+            result['hydrated_large_files'], result['missing_large_files'] = \
+                hydrate_large_files(repo_ref, module.params)
+            result['changed'] = bool(result['hydrated_large_files'])
+
         module.exit_json(**result)
 
     elif files == None:
@@ -112,6 +142,10 @@ def run_module():
         repo_ref.checkout(refname=ref, paths=files, strategy=strategy)
         result['message'] = f"checked out files: { ",".join(files) }"
         result['changed'] = True
+
+    if module.params.get('large_files'):
+        result['hydrated_large_files'], result['missing_large_files'] = \
+            hydrate_large_files(repo_ref, module.params, files)
          
     module.exit_json(**result)
 
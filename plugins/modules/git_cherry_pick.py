@@ -0,0 +1,186 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_cherry_pick
+short_description: Cherry-pick commits onto a branch without a checkout
+description:
+  - Applies the changes of each commit in memory and commits them directly to C(branch), so it works on bare repositories.
+  - Commits whose changes are already on C(branch) are skipped, which makes the task idempotent.
+  - The original author and message are kept and C((cherry picked from commit <id>)) is appended to the message.
+  - If any commit conflicts nothing is changed and the conflicting paths are returned, in check mode without failing.
+  - No objects are written to the repository in check mode.
+  - If C(branch) is checked out in the worktree, the worktree is updated too, but never over local changes.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  commits:
+    description: The commits to cherry-pick, in the order to apply them (usually oldest first)
+    type: list
+    elements: str
+    required: true
+  branch:
+    description: The branch to apply the commits to, defaults to the current branch
+    type: str
+    required: false
+  mainline:
+    description: For merge commits, the parent number (starting from 1) whose changes are applied
+    type: int
+    required: false
+    default: 0
+  author:
+    description: Committer name
+    type: str
+    required: false
+    default: ansible_pygit
+  email:
+    description: Committer email
+    type: str
+    required: false
+    default: ansible_pygit@ansible.com
+'''
+
+EXAMPLES = r'''
+- name: Backport a fix to the release branch
+  git_cherry_pick:
+    repo: /srv/git/app.git
+    branch: release/1.2
+    commits:
+      - 3f2a9c1
+'''
+
+RETURN = r'''
+commits:
+  description: The commits created (or that would be in check mode), as C(picked id) to C(new id)
+  type: dict
+already_applied:
+  description: Commits whose changes were already on C(branch)
+  type: list
+conflicts:
+  description: The paths that conflict
+  type: list
+commit:
+  description: The commit C(branch) points to afterwards
+  type: str
+changed:
+  description: Whether C(branch) was moved
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    StagedObjects,
+    cannonicalise_name,
+    move_branch,
+    normalize_path,
+    open_repository,
+    pick_commits,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "commits": {"type": 'list', "elements": 'str', "required": True},
+    "branch": {"type": 'str', "required": False},
+    "mainline": {"type": 'int', "required": False, "default": 0},
+    "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
+    "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "commits": {},
+        "already_applied": [],
+        "conflicts": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    commits = module.params.get('commits')
+    branch = module.params.get('branch')
+    mainline = module.params.get('mainline')
+    sig = pygit2.Signature(module.params.get('author'), module.params.get('email'))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if branch is None and (repo_ref.head_is_unborn or repo_ref.head_is_detached):
+        module.fail_json(msg=f"{repo} has no current branch, set branch")
+    branch_name = cannonicalise_name(repo_ref, branch)
+    if not branch_name.startswith("refs/heads/") or branch_name not in repo_ref.references:
+        module.fail_json(msg=f"{branch or branch_name} is not a branch in {repo}")
+
+    to_pick = []
+    for ref in commits:
+        commit = resolve_commit(repo_ref, ref)
+        if commit is None:
+            module.fail_json(msg=f"{ref} not found in {repo}")
+        to_pick.append(commit.peel(pygit2.Commit))
+
+    start_id = repo_ref.references[branch_name].target
+    # each commit is applied on top of the last in a throwaway object store,
+    # which is only packed into the repository once every one applies cleanly
+    with StagedObjects(repo_ref) as staged:
+        try:
+            created, skipped, tip_id, conflict = pick_commits(
+                staged, [commit.id for commit in to_pick], start_id, sig, mainline=mainline)
+        except (ValueError, pygit2.GitError) as e:
+            module.fail_json(msg=f"failed to cherry-pick {','.join(commits)}", exception=str(e))
+        result['commits'] = created
+        result['already_applied'] = skipped
+        result['commit'] = str(tip_id)
+
+        if conflict is not None:
+            result['conflicts'] = conflict[1]
+            result['message'] = f"cherry-picking {conflict[0]} conflicts in {','.join(result['conflicts'])}"
+            if module.check_mode:
+                module.exit_json(**result)
+            module.fail_json(msg=result['message'], **result)
+
+        if not result['commits']:
+            result['message'] = f"{','.join(commits)} already on {branch_name}"
+            module.exit_json(**result)
+
+        if module.check_mode:
+            result['message'] = f"would cherry-pick {','.join(result['commits'])} on {branch_name}"
+            module.exit_json(**result)
+
+        try:
+            staged.commit()
+            move_branch(repo_ref, branch_name, start_id, tip_id, f"cherry-pick: {','.join(result['commits'])}")
+        except (pygit2.GitError, OSError) as e:
+            module.fail_json(msg=f"failed to update {branch_name}", exception=str(e))
+
+    result['message'] = f"cherry-picked {','.join(result['commits'])} on {branch_name}"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -47,15 +47,63 @@ options:
     description: the passphrase to access the keypair (if required)
     type: string
     required: false
+  check_upstream:
+    description: if the repo already exists, list the upstream refs (without fetching)
+                 to report whether branch has moved since it was cloned or fetched
+    type: boolean
+    default: false
+    required: false
+  detach:
+    description: start the clone in the background and return straight away, poll it with git_job_status.
+                 While that clone is running, another clone of the same repo returns its pid and status_file
+                 with detach, and fails without
+    type: boolean
+    default: false
+    required: false
+  status_file:
+    description: where to write the progress of the clone (objects, bytes, rate and ETA) as json,
+                 defaults to a file under ~/.cache/ansible_pygit/jobs when detach is set
+    type: path
+    required: false
 '''
 
 EXAMPLES = r'''
+- name: start cloning a large repo
+  git_clone:
+    upstream: https://git.example.com/big.git
+    repo: /srv/big
+    detach: true
+  register: clone
+
+- name: wait for it
+  git_job_status:
+    status_file: "{{ clone.status_file }}"
+  register: job
+  until: job.finished
+  retries: 120
+  delay: 10
 '''
 
 RETURN = r'''
-None
+upstream_commit:
+    description: the commit branch points to upstream (check_upstream only)
+    type: str
+local_commit:
+    description: the commit the repo last saw for branch upstream (check_upstream only)
+    type: str
+upstream_changed:
+    description: whether branch has moved upstream (check_upstream only)
+    type: bool
+status_file:
+    description: the file the progress of the clone is written to (detach or status_file only)
+    type: str
+pid:
+    description: the process running the clone in the background (detach only)
+    type: int
 '''
 
+import os
+
 from ansible.module_utils.basic import AnsibleModule
 import pygit2
 from ansible.module_utils.pygit_utils import *
@@ -70,8 +118,31 @@ module_args = dict(
     pubkey = {"type": 'str', "required": False},
     privkey = {"type": 'str', "required": False},
     passphrase = {"type": 'str', "required": False, "no_log": True},
+    check_upstream = {"type": 'bool', "required": False, "default": False},
+    **JOB_ARGS,
 )
 
+def check_upstream(module, repo, upstream, branch, credentials, result):
+    """
+    compare ids with upstream's refs, transferring no objects
+    """
+    repo_ref = open_repository(repo)
+    try:
+        remote_refs, _, _ = ls_remote(upstream, credentials)
+    except pygit2.GitError as e:
+        module.fail_json(msg = f"failed to list the refs of { upstream }",  exception = str(e))
+
+    if repo_ref.is_bare:
+        local = f"refs/heads/{branch}"
+    else:
+        local = f"refs/remotes/origin/{branch}"
+    local_ref = repo_ref.references.get(local)
+
+    result['upstream_commit'] = remote_refs.get(f"refs/heads/{branch}")
+    result['local_commit'] = str(local_ref.target) if local_ref is not None else None
+    result['upstream_changed'] = result['upstream_commit'] != result['local_commit']
+
+
 def run_module():
 
     # seed the result dict in the object
@@ -100,23 +171,56 @@ def run_module():
     privkey = module.params.get('privkey')
     passphrase = module.params.get('passphrase')
 
-    if pygit2.discover_repository(repo):
-        result['message'] = f"repository exists at { repo }"
-        result['changed'] = False
+    credentials = get_credentials(username, pubkey, privkey, passphrase)
 
+    # a detached clone still running has already created the repository
+    status_path = job_status_path(module.params, "clone", os.path.abspath(repo))
+    running = read_job_status(status_path)
+    if running is not None and running['state'] in JOB_RUNNING:
+        result['status_file'] = status_path
+        result['pid'] = running['pid']
+        if not module.params.get('detach'):
+            module.fail_json(msg = f"{ repo } is still being cloned by process { running['pid'] }", **result)
+        result['message'] = f"already cloning { upstream } to { repo }"
         module.exit_json(**result)
 
+    if discover_repository(repo):
+        result['message'] = f"repository exists at { repo }"
+        result['changed'] = False
 
-    credentials = get_credentials(username, pubkey, privkey, passphrase)
+        if module.params.get('check_upstream'):
+            check_upstream(module, repo, upstream, branch, credentials, result)
 
-    callbacks = pygit2.RemoteCallbacks(credentials=credentials)
+        module.exit_json(**result)
 
     if upstream[0] == '/':
         upstream = f"file://{upstream}"
 
-    try:
+    status = job_status(module.params, "clone", os.path.abspath(repo))
+    callbacks = ProgressCallbacks(credentials, status)
+
+    def clone():
         pygit2.clone_repository(upstream, repo, checkout_branch=branch,
                                 callbacks=callbacks, bare=bare)
+        return {"message": f"cloned {upstream} at {repo}"}
+
+    if module.params.get('detach'):
+        result['status_file'] = status.path
+        result['pid'], result['changed'] = detach_job(status, clone)
+        if result['changed']:
+            result['message'] = f"started cloning { upstream } to { repo }"
+        else:
+            result['message'] = f"already cloning { upstream } to { repo }"
+        module.exit_json(**result)
+
+    if status is not None:
+        result['status_file'] = status.path
+        status.start()
+
+    try:
+        run_job(status, clone)
+    except JobCancelled as e:
+        module.fail_json(msg = f"clone of { upstream } to { repo } cancelled",  exception = str(e), **result)
     except pygit2.GitError as e:
         module.fail_json(msg = f"failed clone { upstream } to {repo}",  exception = str(e))
     except KeyError as e:
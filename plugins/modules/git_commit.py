@@ -5,6 +5,9 @@
 from ansible.module_utils.basic import AnsibleModule
 
 from ansible.module_utils.pygit_utils import (
+    LOCK_TIMEOUT,
+    LockTimeout,
+    LockWaiter,
     get_status,
     normalize_path,
     open_repository,
@@ -42,6 +45,16 @@ options:
     type: string
     required: false
     default: ansible_pygit@ansible.com
+  lock_timeout:
+    description: Seconds to keep retrying, with exponential backoff, while another process holds a lock on the branch being committed to
+    type: int
+    required: false
+    default: 30
+  serialize:
+    description: Hold a host-local advisory lock on the repository for the whole task, so forks committing to the same repository queue up
+    type: bool
+    required: false
+    default: false
 '''
 
 EXAMPLES = r'''
@@ -57,6 +70,9 @@ RETURN = r'''
 commit:
   description: the commit id (sha) of the created commit
   type: str
+lock_wait:
+  description: seconds spent waiting for ref locks or the advisory lock
+  type: float
 '''
 
 # define available arguments/parameters a user can pass to the module
@@ -66,6 +82,8 @@ module_args = {
     "msg": {"type": 'str', "required": False, "default": "commited by ansible_pygit"},
     "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
     "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+    "lock_timeout": {"type": 'int', "required": False, "default": LOCK_TIMEOUT},
+    "serialize": {"type": 'bool', "required": False, "default": False},
 }
 
 def _open_repo(repo_param):
@@ -106,6 +124,7 @@ def run_module():
         "changed": False,
         "message": '',
         "commit": '',
+        "lock_wait": 0.0,
     }
 
     module = AnsibleModule(
@@ -124,25 +143,34 @@ def run_module():
     except pygit2.GitError as e:
         module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
 
-    status = get_status(repo_ref)
-    if status == {}:
-        result['message'] = "no files staged for commit"
-        module.exit_json(**result)
-
-    canonical_name, parents = None, []
+    locks = LockWaiter(repo_ref, timeout=module.params.get('lock_timeout'), serialize=module.params.get('serialize'))
     try:
-        canonical_name, parents = _determine_ref_and_parents(repo_ref, branch)
-    except KeyError as e:
-        module.fail_json(msg=str(e), exception=str(e))
-
-    tree = repo_ref.index.write_tree()
-    sig = pygit2.Signature(author, email)
-
-    if module.check_mode:
-        result['message'] = f"would create commit on {canonical_name}"
-        module.exit_json(**result)
-
-    commit_ref = repo_ref.create_commit(canonical_name, sig, sig, msg, tree, parents)
+        with locks:
+            result['lock_wait'] = locks.waited
+            status = get_status(repo_ref)
+            if status == {}:
+                result['message'] = "no files staged for commit"
+                module.exit_json(**result)
+
+            canonical_name, parents = None, []
+            try:
+                canonical_name, parents = _determine_ref_and_parents(repo_ref, branch)
+            except KeyError as e:
+                module.fail_json(msg=str(e), exception=str(e))
+
+            tree = repo_ref.index.write_tree()
+            sig = pygit2.Signature(author, email)
+
+            if module.check_mode:
+                result['message'] = f"would create commit on {canonical_name}"
+                module.exit_json(**result)
+
+            # libgit2 refuses to update the branch if it no longer points at parents, that
+            # isn't retried as the tree was built from an index read before it moved
+            commit_ref = locks.run(repo_ref.create_commit, canonical_name, sig, sig, msg, tree, parents)
+    except (LockTimeout, pygit2.GitError) as e:
+        module.fail_json(msg=f"failed to commit to {repo}", exception=str(e), lock_wait=locks.waited)
+    result['lock_wait'] = locks.waited
 
     result['commit'] = str(commit_ref)
     result['message'] = f"committed {commit_ref} to {branch if branch else canonical_name}"
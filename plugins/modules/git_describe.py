@@ -0,0 +1,230 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_describe
+short_description: Find the nearest and latest tags of a commit
+description:
+  - Describes a commit like C(git describe --tags), e.g. C(v1.2.0-3-g1a2b3c4), from the nearest tag in its history and
+    the number of commits since it.
+  - Also returns the latest version tag (by semantic version, not date) the commit contains, and the latest version
+    tag in the repository.
+  - Every tag is peeled to its commit once up front, so the history is walked once however many tags there are.
+  - Like C(git describe), the first 10 tagged commits found are candidates, and the one the commit is the fewest
+    commits ahead of is the nearest. The distances to all of them are counted in that same walk.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  target:
+    description: The branch, tag or commit to describe
+    type: str
+    required: false
+    default: HEAD
+  match:
+    description: Only consider tags whose names match one of these globs, e.g. C(v*)
+    type: list
+    elements: str
+    required: false
+  exclude:
+    description: Ignore tags whose names match one of these globs
+    type: list
+    elements: str
+    required: false
+  lightweight:
+    description: Consider lightweight tags as well as annotated ones, like C(git describe --tags)
+    type: bool
+    required: false
+    default: true
+  prereleases:
+    description: Whether prerelease versions (C(v2.0.0-rc.1)) can be the latest version tags
+    type: bool
+    required: false
+    default: false
+  abbrev:
+    description: The least number of hex digits of the commit id to use in C(describe), more if needed to be unique
+    type: int
+    required: false
+    default: 7
+  long:
+    description: Always include the distance and commit id in C(describe), even on a tagged commit
+    type: bool
+    required: false
+    default: false
+  dirty:
+    description: Append C(-dirty) to C(describe) when the worktree has uncommitted changes (C(target=HEAD) only)
+    type: bool
+    required: false
+    default: false
+  always:
+    description: Describe the commit as its abbreviated id when no tag is found, instead of failing
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Work out the version being deployed
+  git_describe:
+    repo: /srv/app
+    match:
+      - v*
+  register: version
+
+- name: Stamp it
+  copy:
+    dest: /srv/app/VERSION
+    content: "{{ version.describe }}"
+
+- name: Find the release to roll back to
+  git_describe:
+    repo: /srv/git/app.git
+    target: production
+    match:
+      - v*
+  register: prod
+
+- debug:
+    msg: "production is on {{ prod.latest }}, newest release is {{ prod.latest_overall }}"
+'''
+
+RETURN = r'''
+describe:
+  description: The description, C(<tag>-<distance>-g<abbreviated id>), just C(<tag>) on a tagged commit
+  type: str
+tag:
+  description: The nearest tag in the commit's history, null if none
+  type: str
+distance:
+  description: How many commits the target has that the nearest tag doesn't
+  type: int
+commit:
+  description: The commit described
+  type: str
+tag_commit:
+  description: The commit the nearest tag points at
+  type: str
+exact:
+  description: Whether the commit is tagged
+  type: bool
+tags:
+  description: All the matching tags of the commit itself
+  type: list
+latest:
+  description: The highest version tag the commit contains, null if none
+  type: str
+latest_overall:
+  description: The highest version tag in the repository, reachable or not
+  type: str
+changed:
+  description: Always false
+  type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    abbreviate,
+    is_dirty,
+    latest_tag,
+    nearest_tag,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+    tag_index,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "target": {"type": 'str', "required": False, "default": 'HEAD'},
+    "match": {"type": 'list', "elements": 'str', "required": False},
+    "exclude": {"type": 'list', "elements": 'str', "required": False},
+    "lightweight": {"type": 'bool', "required": False, "default": True},
+    "prereleases": {"type": 'bool', "required": False, "default": False},
+    "abbrev": {"type": 'int', "required": False, "default": 7},
+    "long": {"type": 'bool', "required": False, "default": False},
+    "dirty": {"type": 'bool', "required": False, "default": False},
+    "always": {"type": 'bool', "required": False, "default": False},
+}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "describe": '',
+        "tag": None,
+        "distance": 0,
+        "commit": '',
+        "tag_commit": None,
+        "exact": False,
+        "tags": [],
+        "latest": None,
+        "latest_overall": None,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    target = module.params.get('target')
+    prereleases = module.params.get('prereleases')
+    abbrev = module.params.get('abbrev')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    commit = resolve_commit(repo_ref, target)
+    if commit is None:
+        module.fail_json(msg=f"{target} not found in {repo}")
+    commit_id = commit.peel(pygit2.Commit).id
+    result['commit'] = str(commit_id)
+
+    index = tag_index(repo_ref, module.params.get('match'), module.params.get('exclude'),
+                      module.params.get('lightweight'))
+    result['tags'] = sorted(index.get(commit_id, []))
+
+    latest = latest_tag(repo_ref, index, commit_id, prereleases)
+    result['latest'] = latest[0] if latest else None
+    latest = latest_tag(repo_ref, index, None, prereleases)
+    result['latest_overall'] = latest[0] if latest else None
+
+    abbreviated = abbreviate(repo_ref, commit_id, abbrev)
+    nearest = nearest_tag(repo_ref, commit_id, index)
+    if nearest is None:
+        if not module.params.get('always'):
+            module.fail_json(msg=f"no tags can describe {target}", **result)
+        describe = abbreviated
+    else:
+        tag, tag_commit, distance = nearest
+        result['tag'] = tag
+        result['tag_commit'] = str(tag_commit)
+        result['distance'] = distance
+        result['exact'] = distance == 0
+        if distance == 0 and not module.params.get('long'):
+            describe = tag
+        else:
+            describe = f"{tag}-{distance}-g{abbreviated}"
+
+    if module.params.get('dirty') and target == 'HEAD' and is_dirty(repo_ref, untracked=False):
+        describe += "-dirty"
+    result['describe'] = describe
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_diff
+short_description: Report the differences between trees, the index and the worktree
+description:
+  - Diffs two commits, a commit and the index, or the index and the worktree and returns the changed files
+    as name-status, numstat or a patch.
+  - Rename and copy detection is bounded by C(rename_limit), above which only exact renames are detected,
+    so very large diffs do not go quadratic.
+options:
+  repo:
+    description: Path to the Git repository
+    type: path
+    required: true
+  compare:
+    description:
+      - C(tree) diffs C(from_ref) against C(to_ref).
+      - C(index) diffs C(from_ref) against the index (the staged changes).
+      - C(workdir) diffs the index against the worktree (the unstaged changes).
+    type: str
+    required: false
+    choices: [tree, index, workdir]
+    default: tree
+  from_ref:
+    description: The old side of a C(tree) or C(index) diff
+    type: str
+    required: false
+    default: HEAD
+  to_ref:
+    description: The new side of a C(tree) diff
+    type: str
+    required: false
+  paths:
+    description: Only report files matching these paths, directories or glob patterns
+    type: list
+    elements: str
+    required: false
+  output:
+    description:
+      - C(name_status) returns the status and paths of each change.
+      - C(numstat) also returns the number of added and deleted lines.
+      - C(patch) also returns the patch text, up to C(max_patch_bytes).
+    type: str
+    required: false
+    choices: [name_status, numstat, patch]
+    default: name_status
+  max_patch_bytes:
+    description: The maximum total size of the patch text returned, later patches are omitted
+    type: int
+    required: false
+    default: 1048576
+  context_lines:
+    description: Number of lines of context in the patch
+    type: int
+    required: false
+    default: 3
+  find_renames:
+    description: Detect renamed files
+    type: bool
+    required: false
+    default: true
+  find_copies:
+    description: Detect copied files
+    type: bool
+    required: false
+    default: false
+  rename_threshold:
+    description: How similar (in percent) two files must be to count as a rename or copy
+    type: int
+    required: false
+    default: 50
+  rename_limit:
+    description: The maximum number of files to consider for inexact rename and copy detection
+    type: int
+    required: false
+    default: 1000
+'''
+
+EXAMPLES = r'''
+- name: Files changed between two tags
+  git_diff:
+    repo: /home/example/projects/test_repo
+    from_ref: v1.0
+    to_ref: v1.1
+    paths:
+      - deploy
+
+- name: Line counts of the staged changes
+  git_diff:
+    repo: /home/example/projects/test_repo
+    compare: index
+    output: numstat
+'''
+
+RETURN = r'''
+files:
+  description: One entry per changed file
+  type: list
+  elements: dict
+  contains:
+    status:
+      description: The git status letter, A, D, M, R, C or T
+      type: str
+    path:
+      description: The path on the new side
+      type: str
+    old_path:
+      description: The path on the old side (differs from C(path) for renames and copies)
+      type: str
+    similarity:
+      description: The similarity of a renamed or copied file, in percent
+      type: int
+    binary:
+      description: Whether the file is binary (C(numstat) and C(patch) only)
+      type: bool
+    additions:
+      description: Number of added lines (C(numstat) and C(patch) only)
+      type: int
+    deletions:
+      description: Number of deleted lines (C(numstat) and C(patch) only)
+      type: int
+    patch:
+      description: The patch text (C(patch) only)
+      type: str
+additions:
+  description: Total added lines (C(numstat) and C(patch) only)
+  type: int
+deletions:
+  description: Total deleted lines (C(numstat) and C(patch) only)
+  type: int
+truncated:
+  description: Whether some patch text was left out because of C(max_patch_bytes)
+  type: bool
+changed:
+  description: Always false
+  type: bool
+'''
+
+import fnmatch
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    get_diff,
+    normalize_path,
+    open_repository,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "compare": {"type": 'str', "required": False, "choices": ['tree', 'index', 'workdir'], "default": 'tree'},
+    "from_ref": {"type": 'str', "required": False, "default": "HEAD"},
+    "to_ref": {"type": 'str', "required": False},
+    "paths": {"type": 'list', "elements": 'str', "required": False},
+    "output": {"type": 'str', "required": False, "choices": ['name_status', 'numstat', 'patch'], "default": 'name_status'},
+    "max_patch_bytes": {"type": 'int', "required": False, "default": 1048576},
+    "context_lines": {"type": 'int', "required": False, "default": 3},
+    "find_renames": {"type": 'bool', "required": False, "default": True},
+    "find_copies": {"type": 'bool', "required": False, "default": False},
+    "rename_threshold": {"type": 'int', "required": False, "default": 50},
+    "rename_limit": {"type": 'int', "required": False, "default": 1000},
+}
+
+
+def path_matches(path, patterns):
+    for pattern in patterns:
+        pattern = pattern.strip("/")
+        if path == pattern or path.startswith(pattern + "/") or fnmatch.fnmatchcase(path, pattern):
+            return True
+    return False
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "files": [],
+        "truncated": False,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_if=[('compare', 'tree', ('to_ref',))],
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    compare = module.params.get('compare')
+    from_ref = module.params.get('from_ref')
+    to_ref = module.params.get('to_ref')
+    paths = module.params.get('paths')
+    output = module.params.get('output')
+    max_patch_bytes = module.params.get('max_patch_bytes')
+    context_lines = module.params.get('context_lines')
+    find_renames = module.params.get('find_renames')
+    find_copies = module.params.get('find_copies')
+    rename_threshold = module.params.get('rename_threshold')
+    rename_limit = module.params.get('rename_limit')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if compare != 'tree' and repo_ref.is_bare:
+        module.fail_json(msg=f"{repo} is a bare repository, only tree diffs are possible")
+
+    try:
+        diff = get_diff(repo_ref, compare, from_ref, to_ref, context_lines=context_lines)
+    except KeyError as e:
+        module.fail_json(msg=str(e), exception=str(e))
+
+    find_flags = 0
+    if find_renames:
+        find_flags |= pygit2.enums.DiffFind.FIND_RENAMES
+    if find_copies:
+        find_flags |= pygit2.enums.DiffFind.FIND_COPIES
+    if find_flags:
+        # libgit2 falls back to exact matches only when there are more than
+        # rename_limit candidates, which keeps huge diffs linear
+        diff.find_similar(flags=find_flags, rename_threshold=rename_threshold,
+                          copy_threshold=rename_threshold, rename_limit=rename_limit)
+
+    additions = deletions = 0
+    patch_bytes = 0
+    for i, delta in enumerate(diff.deltas):
+        path = delta.new_file.path
+        if paths and not (path_matches(path, paths) or path_matches(delta.old_file.path, paths)):
+            continue
+
+        info = {
+            "status": delta.status_char(),
+            "path": path,
+            "old_path": delta.old_file.path,
+        }
+        if delta.status in (pygit2.enums.DeltaStatus.RENAMED, pygit2.enums.DeltaStatus.COPIED):
+            info['similarity'] = delta.similarity
+
+        if output != 'name_status':
+            patch = diff[i]
+            info['binary'] = patch.delta.is_binary
+            _context, added, deleted = patch.line_stats
+            info['additions'] = added
+            info['deletions'] = deleted
+            additions += added
+            deletions += deleted
+
+            if output == 'patch':
+                # counted in bytes, not characters
+                size = len(patch.data)
+                if patch_bytes + size > max_patch_bytes:
+                    result['truncated'] = True
+                else:
+                    info['patch'] = patch.text or ''
+                    patch_bytes += size
+
+        result['files'].append(info)
+
+    if output != 'name_status':
+        result['additions'] = additions
+        result['deletions'] = deletions
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_export
+short_description: Export the tree of a ref to a plain directory
+description:
+  - Writes the files of a branch, tag or commit to a directory with no C(.git), reading them straight from the object database.
+  - A manifest of path to blob id is kept between runs, so only files whose blob or mode changed are written, deleted or chmodded.
+  - Only the files in the manifest are looked at. Files added to C(dest) by anything else are left alone, and a file
+    changed by hand is only rewritten once its blob changes in the tree.
+  - Files are written by a pool of workers.
+  - With C(atomic) the directory is built next to the current one (unchanged files are hard links) and swapped in by replacing a symlink.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  ref:
+    description: The branch, tag or commit to export
+    type: str
+    required: false
+    default: HEAD
+    aliases: [branch]
+  dest:
+    description: Directory to export to
+    type: path
+    required: true
+  manifest:
+    description: Where to keep the manifest of the last export, defaults to C(dest).manifest.json
+    type: path
+    required: false
+  atomic:
+    description:
+      - Build each export in a new C(dest).I(tree id).I(suffix) directory and atomically repoint the C(dest) symlink at it.
+      - The previous export directory is removed once the symlink has been swapped, if this module created it. A
+        directory C(dest) pointed at that isn't named like an export is left in place.
+      - C(dest) must be a symlink or not exist.
+    type: bool
+    required: false
+    default: false
+  workers:
+    description: Number of files to write concurrently
+    type: int
+    required: false
+    default: 8
+'''
+
+EXAMPLES = r'''
+- name: Deploy the release tag to /opt/app
+  git_export:
+    repo: /srv/git/app.git
+    ref: v1.2.0
+    dest: /opt/app
+    atomic: true
+'''
+
+RETURN = r'''
+commit:
+  description: The commit id that was exported
+  type: str
+tree:
+  description: The tree id that was exported
+  type: str
+written_files:
+  description: Files written because they are new or their content changed
+  type: list
+deleted_files:
+  description: Files removed because they are no longer in the tree
+  type: list
+mode_changes:
+  description: Files whose mode changed without their content changing
+  type: list
+dest:
+  description: The directory holding the export, for C(atomic) this is the directory C(dest) points to
+  type: str
+changed:
+  description: Whether any change was made
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    flatten_tree,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+    write_blob,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "ref": {"type": 'str', "required": False, "default": "HEAD", "aliases": ['branch']},
+    "dest": {"type": 'path', "required": True},
+    "manifest": {"type": 'path', "required": False},
+    "atomic": {"type": 'bool', "required": False, "default": False},
+    "workers": {"type": 'int', "required": False, "default": 8},
+}
+
+LINK = int(pygit2.enums.FileMode.LINK)
+EXECUTABLE = int(pygit2.enums.FileMode.BLOB_EXECUTABLE)
+
+
+def read_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return dict((p, tuple(entry)) for p, entry in manifest.get("entries", {}).items())
+
+
+def write_manifest(path, commit, entries):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"commit": str(commit.id), "tree": str(commit.tree_id), "entries": entries}, f)
+    os.replace(tmp_path, path)
+
+
+def compare_manifests(old, new):
+    """
+    split the differences between two manifests into (write, delete, chmod) path lists
+    """
+    to_write, to_chmod = [], []
+    for path, (blob_id, mode) in new.items():
+        previous = old.get(path)
+        if previous is None or previous[0] != blob_id or (LINK in (mode, previous[1]) and mode != previous[1]):
+            to_write.append(path)
+        elif previous[1] != mode:
+            to_chmod.append(path)
+    to_delete = [path for path in old if path not in new]
+    return sorted(to_write), sorted(to_delete), sorted(to_chmod)
+
+
+def export_entry(repo_ref, root, path, blob_id, mode):
+    dest = os.path.join(root, path)
+    blob = repo_ref[blob_id]
+    if os.path.lexists(dest) and (os.path.islink(dest) or mode == LINK):
+        os.remove(dest)
+    if mode == LINK:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.symlink(blob.data, dest)
+    else:
+        write_blob(blob, dest, executable=(mode == EXECUTABLE), check_existing=False)
+
+
+def set_mode(path, mode, break_link):
+    if break_link:
+        # the file may be a hard link shared with the previous export
+        tmp_path = path + ".tmp-chmod"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, path)
+    os.chmod(path, 0o755 if mode == EXECUTABLE else 0o644)
+
+
+def export_dir_prefix(dest, tree_id):
+    return f"{os.path.basename(dest)}.{str(tree_id)[:12]}."
+
+
+def made_by_export(dest, path):
+    """
+    whether path is a directory an atomic export to dest created, named
+    dest.<tree id>.<suffix> next to it, rather than one someone else pointed dest at
+    """
+    name = os.path.basename(path)
+    return os.path.dirname(path) == os.path.realpath(os.path.dirname(dest)) \
+        and re.fullmatch(re.escape(os.path.basename(dest)) + r"\.[0-9a-f]{12}\.[^/]+", name) is not None
+
+
+def remove_entry(root, path):
+    dest = os.path.join(root, path)
+    if os.path.lexists(dest):
+        os.remove(dest)
+    # remove directories left empty, stopping at the export root
+    parent = os.path.dirname(dest)
+    while parent != root and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "tree": '',
+        "dest": '',
+        "written_files": [],
+        "deleted_files": [],
+        "mode_changes": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    ref = module.params.get('ref')
+    dest = normalize_path(module.params.get('dest'))
+    manifest = module.params.get('manifest') or f"{dest}.manifest.json"
+    atomic = module.params.get('atomic')
+    workers = module.params.get('workers')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    commit = resolve_commit(repo_ref, ref)
+    if commit is None:
+        module.fail_json(msg=f"{ref} not found in {repo}")
+    commit = commit.peel(pygit2.Commit)
+    result['commit'] = str(commit.id)
+    result['tree'] = str(commit.tree_id)
+
+    if atomic and os.path.exists(dest) and not os.path.islink(dest):
+        module.fail_json(msg=f"{dest} must be a symlink (or not exist) for an atomic export")
+
+    current = os.path.realpath(dest) if os.path.exists(dest) else None
+    old_entries = read_manifest(manifest) if current else {}
+    new_entries = flatten_tree(repo_ref, commit.tree)
+    to_write, to_delete, to_chmod = compare_manifests(old_entries, new_entries)
+
+    result['written_files'] = to_write
+    result['deleted_files'] = to_delete
+    result['mode_changes'] = to_chmod
+    result['dest'] = current or dest
+
+    if current and not (to_write or to_delete or to_chmod):
+        result['message'] = f"{dest} already matches {ref}"
+        module.exit_json(**result)
+
+    if module.check_mode:
+        result['message'] = f"would export {ref} to {dest}"
+        module.exit_json(**result)
+
+    if atomic:
+        root = tempfile.mkdtemp(prefix=export_dir_prefix(dest, commit.tree_id), dir=os.path.dirname(dest))
+        os.chmod(root, 0o755)
+        if current and old_entries:
+            # unchanged files are shared with the current export as hard links,
+            # changed files get new inodes as write_blob replaces them
+            shutil.copytree(current, root, symlinks=True, copy_function=os.link, dirs_exist_ok=True)
+    else:
+        root = dest
+        os.makedirs(root, exist_ok=True)
+
+    try:
+        for path in to_delete:
+            remove_entry(root, path)
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = [executor.submit(export_entry, repo_ref, root, path, *new_entries[path])
+                       for path in to_write]
+            futures += [executor.submit(set_mode, os.path.join(root, path), new_entries[path][1], atomic)
+                        for path in to_chmod]
+            for future in futures:
+                future.result()
+    except OSError as e:
+        module.fail_json(msg=f"failed to export {ref} to {root}", exception=str(e))
+
+    if atomic:
+        tmp_link = f"{dest}.tmp-link"
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(root, tmp_link)
+        os.replace(tmp_link, dest)
+        if current and current != root and made_by_export(dest, current):
+            shutil.rmtree(current, ignore_errors=True)
+
+    write_manifest(manifest, commit, new_entries)
+
+    result['dest'] = root
+    result['message'] = f"exported {ref} to {dest}"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
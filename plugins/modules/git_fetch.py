@@ -0,0 +1,256 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_fetch
+short_description: Fetch from a remote
+description:
+  - Fetches the refs of C(remote) into the repository, like C(git fetch), using the remote's configured refspecs
+    unless C(refspecs) is given.
+  - With C(detach) the fetch runs in the background and the task returns straight away; its progress (objects,
+    bytes, rate and ETA) is written to C(status_file) for M(git_job_status) to poll or cancel.
+  - In check mode the remote's refs are listed but nothing is fetched.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  remote:
+    description: The remote to fetch from
+    type: str
+    required: false
+    default: origin
+  refspecs:
+    description: The refspecs to fetch, defaults to the remote's fetch refspecs
+    type: list
+    elements: str
+    required: false
+  prune:
+    description: Delete remote-tracking branches that no longer exist on the remote
+    type: bool
+    required: false
+    default: false
+  depth:
+    description: Fetch only this many commits of history, 0 fetches all of it
+    type: int
+    required: false
+    default: 0
+  username:
+    description: the username for the remote repo (if required)
+    type: str
+    required: false
+  pubkey:
+    description: the path to a public key file for ssh
+    type: path
+    required: false
+  privkey:
+    description: the path to the private key for ssh
+    type: path
+    required: false
+  passphrase:
+    description: the passphrase to access the keypair (if required)
+    type: str
+    required: false
+  detach:
+    description: Start the fetch in the background and return straight away, poll it with M(git_job_status)
+    type: bool
+    required: false
+    default: false
+  status_file:
+    description:
+      - Where to write the progress of the fetch as json.
+      - Defaults to a file under C(~/.cache/ansible_pygit/jobs) when C(detach) is set.
+    type: path
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Fetch everything from origin
+  git_fetch:
+    repo: /srv/app
+    prune: true
+
+- name: Start fetching a large mirror
+  git_fetch:
+    repo: /srv/git/mirror.git
+    detach: true
+  register: fetch
+
+- name: Wait for it, reporting progress
+  git_job_status:
+    status_file: "{{ fetch.status_file }}"
+  register: job
+  until: job.finished
+  retries: 60
+  delay: 10
+'''
+
+RETURN = r'''
+updated:
+  description: The refs the fetch created, moved or pruned, as name to C({old, new}), null for missing
+  type: dict
+objects:
+  description: How many objects were received
+  type: int
+bytes:
+  description: How many bytes were received
+  type: int
+status_file:
+  description: The file the progress is written to (C(detach) or C(status_file) only)
+  type: str
+pid:
+  description: The process running the fetch in the background (C(detach) only)
+  type: int
+changed:
+  description: Whether any refs were updated (or would be in check mode), or a background fetch was started
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    JOB_ARGS,
+    JobCancelled,
+    ProgressCallbacks,
+    detach_job,
+    get_credentials,
+    job_status,
+    ls_remote,
+    normalize_path,
+    open_repository,
+    run_job,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "remote": {"type": 'str', "required": False, "default": 'origin'},
+    "refspecs": {"type": 'list', "elements": 'str', "required": False},
+    "prune": {"type": 'bool', "required": False, "default": False},
+    "depth": {"type": 'int', "required": False, "default": 0},
+    "username": {"type": 'str', "required": False},
+    "pubkey": {"type": 'path', "required": False},
+    "privkey": {"type": 'path', "required": False},
+    "passphrase": {"type": 'str', "required": False, "no_log": True},
+    **JOB_ARGS,
+}
+
+
+def ref_ids(repo_ref):
+    """
+    the ids of the refs a fetch can update, leaving out local branches and symbolic refs
+    """
+    ids = {}
+    for name in repo_ref.references:
+        target = repo_ref.references[name].target
+        if not name.startswith("refs/heads/") and isinstance(target, pygit2.Oid):
+            ids[name] = str(target)
+    return ids
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "updated": {},
+        "objects": 0,
+        "bytes": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    remote = module.params.get('remote')
+    refspecs = module.params.get('refspecs')
+    username = module.params.get('username')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    try:
+        remote_ref = repo_ref.remotes[remote]
+    except KeyError as e:
+        module.fail_json(msg=f"failed to get remote {remote}", exception=str(e))
+
+    credentials = get_credentials(username, module.params.get('pubkey'),
+                                  module.params.get('privkey'), module.params.get('passphrase'))
+
+    if module.check_mode:
+        try:
+            remote_refs, _, _ = ls_remote(remote, credentials, repo=repo_ref, username=username)
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to list the refs of {remote}", exception=str(e))
+        local = ref_ids(repo_ref)
+        for name, oid in remote_refs.items():
+            if name.startswith("refs/heads/"):
+                tracking = f"refs/remotes/{remote}/{name[len('refs/heads/'):]}"
+            elif name.startswith("refs/tags/") and not name.endswith("^{}"):
+                tracking = name
+            else:
+                continue
+            if local.get(tracking) != oid:
+                result['updated'][tracking] = {"old": local.get(tracking), "new": oid}
+        result['changed'] = bool(result['updated'])
+        result['message'] = f"would fetch {len(result['updated'])} refs from {remote}"
+        module.exit_json(**result)
+
+    status = job_status(module.params, "fetch", f"{repo_ref.path}:{remote}")
+    callbacks = ProgressCallbacks(credentials, status)
+    prune = pygit2.enums.FetchPrune.PRUNE if module.params.get('prune') else pygit2.enums.FetchPrune.UNSPECIFIED
+
+    def fetch():
+        before = ref_ids(repo_ref)
+        stats = remote_ref.fetch(refspecs, callbacks=callbacks, prune=prune, depth=module.params.get('depth'),
+                                 message=f"fetch: {remote}")
+        after = ref_ids(repo_ref)
+        updated = dict((name, {"old": before.get(name), "new": after.get(name)})
+                       for name in set(before) | set(after) if before.get(name) != after.get(name))
+        return {"updated": updated, "objects": stats.received_objects, "bytes": stats.received_bytes}
+
+    if module.params.get('detach'):
+        result['status_file'] = status.path
+        result['pid'], result['changed'] = detach_job(status, fetch)
+        if result['changed']:
+            result['message'] = f"started fetching from {remote}"
+        else:
+            result['message'] = f"already fetching from {remote}"
+        module.exit_json(**result)
+
+    if status is not None:
+        result['status_file'] = status.path
+        status.start()
+
+    try:
+        result.update(run_job(status, fetch))
+    except JobCancelled as e:
+        module.fail_json(msg=f"fetch from {remote} cancelled", exception=str(e), **result)
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to fetch from {remote}", exception=str(e), **result)
+
+    result['changed'] = bool(result['updated'])
+    if result['changed']:
+        result['message'] = f"fetched {len(result['updated'])} refs from {remote}"
+    else:
+        result['message'] = f"{remote} has nothing new"
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_find_repos
+short_description: Find the Git repositories under one or more directories
+description:
+  - Scans directory trees with a pool of workers and returns every worktree and bare repository found, with basic facts.
+  - Scanning stops at repository boundaries, the contents of a repository (including nested repositories and
+    submodules) are never walked.
+options:
+  paths:
+    description: The directories to scan
+    type: list
+    elements: path
+    required: true
+  max_depth:
+    description: How many directory levels below each path to look
+    type: int
+    required: false
+    default: 8
+  exclude:
+    description: Glob patterns of directory names not to descend into
+    type: list
+    elements: str
+    required: false
+    default: [node_modules, .cache]
+  follow_symlinks:
+    description: Whether to descend into symlinked directories
+    type: bool
+    required: false
+    default: false
+  workers:
+    description: Number of directories to scan concurrently
+    type: int
+    required: false
+    default: 8
+'''
+
+EXAMPLES = r'''
+- name: Inventory every checkout in the home directories
+  git_find_repos:
+    paths:
+      - /home
+    max_depth: 4
+  register: found
+
+- name: Gather facts about them
+  git_info:
+    repos: "{{ found.repos | map(attribute='path') | list }}"
+'''
+
+RETURN = r'''
+repos:
+  description: The repositories found, sorted by path
+  type: list
+  elements: dict
+  contains:
+    path:
+      description: The worktree, or the repository directory for bare repositories
+      type: str
+    git_dir:
+      description: The git directory
+      type: str
+    bare:
+      description: Whether the repository is bare
+      type: bool
+    head:
+      description: The commit id HEAD points at, null for an empty repository
+      type: str
+    branch:
+      description: The current branch, null if HEAD is detached
+      type: str
+    error:
+      description: Why the repository could not be opened
+      type: str
+scanned_dirs:
+  description: How many directories were read
+  type: int
+changed:
+  description: Always false
+  type: bool
+'''
+
+import fnmatch
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    normalize_path,
+)
+
+module_args = {
+    "paths": {"type": 'list', "elements": 'path', "required": True},
+    "max_depth": {"type": 'int', "required": False, "default": 8},
+    "exclude": {"type": 'list', "elements": 'str', "required": False, "default": ['node_modules', '.cache']},
+    "follow_symlinks": {"type": 'bool', "required": False, "default": False},
+    "workers": {"type": 'int', "required": False, "default": 8},
+}
+
+BARE_MARKERS = {"HEAD", "objects", "refs"}
+
+
+def repo_facts(path, git_dir):
+    facts = {"path": path, "git_dir": git_dir}
+    try:
+        # the location is known, so skip libgit2's own discovery
+        repo_ref = pygit2.Repository(git_dir, pygit2.enums.RepositoryOpenFlag.NO_SEARCH)
+    except pygit2.GitError as e:
+        facts['error'] = str(e)
+        return facts
+
+    facts['bare'] = repo_ref.is_bare
+    facts['head'] = None if repo_ref.head_is_unborn else str(repo_ref.head.target)
+    if repo_ref.head_is_detached:
+        facts['branch'] = None
+    else:
+        facts['branch'] = repo_ref.references['HEAD'].target.removeprefix("refs/heads/")
+    return facts
+
+
+def scan_dir(path, depth, exclude, follow_symlinks):
+    """
+    read one directory, returning (repo facts or None, [subdirectories to scan])
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return None, []
+
+    names = set(entry.name for entry in entries)
+    if ".git" in names:
+        return repo_facts(path, os.path.join(path, ".git")), []
+    if BARE_MARKERS <= names and os.path.isfile(os.path.join(path, "HEAD")):
+        return repo_facts(path, path), []
+
+    if depth <= 0:
+        return None, []
+
+    subdirs = []
+    for entry in entries:
+        try:
+            if not entry.is_dir(follow_symlinks=follow_symlinks):
+                continue
+        except OSError:
+            continue
+        if any(fnmatch.fnmatch(entry.name, pattern) for pattern in exclude):
+            continue
+        subdirs.append(entry.path)
+    return None, subdirs
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "repos": [],
+        "scanned_dirs": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    paths = module.params.get('paths')
+    max_depth = module.params.get('max_depth')
+    exclude = module.params.get('exclude') or []
+    follow_symlinks = module.params.get('follow_symlinks')
+    workers = module.params.get('workers')
+
+    repos = []
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = {}
+
+        def submit(path, depth):
+            # with follow_symlinks the same directory can be reached twice
+            real_path = os.path.realpath(path)
+            if real_path in seen:
+                return
+            seen.add(real_path)
+            future = executor.submit(scan_dir, path, depth, exclude, follow_symlinks)
+            pending[future] = depth
+
+        for path in paths:
+            submit(normalize_path(path), max_depth)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                result['scanned_dirs'] += 1
+                facts, subdirs = future.result()
+                if facts is not None:
+                    repos.append(facts)
+                for subdir in subdirs:
+                    submit(subdir, depth - 1)
+
+    result['repos'] = sorted(repos, key=lambda facts: facts['path'])
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_grep
+short_description: Search file contents at one or more refs without a checkout
+description:
+  - Searches the files of each ref's tree for lines matching a regular expression, like C(git grep -n <pattern> <ref>),
+    reading blobs straight from the object database so no checkout is needed, and bare repositories work too.
+  - Binary files (a NUL in the first 8000 bytes, as git decides) and symlinks are skipped.
+  - Each blob is searched once however many refs share it, in a pool of worker threads. With C(cache) the matches
+    are also remembered on the host by blob id, so files that are the same across repositories or runs aren't
+    searched again.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  pattern:
+    description: The regular expression (Python syntax) to search for
+    type: str
+    required: true
+  refs:
+    description: The branches, tags or commits to search
+    type: list
+    elements: str
+    required: false
+    default: [HEAD]
+  paths:
+    description: Only search files whose path matches one of these globs
+    type: list
+    elements: str
+    required: false
+  ignore_case:
+    description: Match without regard to case
+    type: bool
+    required: false
+    default: false
+  fixed:
+    description: Treat C(pattern) as a literal string instead of a regular expression
+    type: bool
+    required: false
+    default: false
+  max_matches:
+    description: The most matching lines to return, refs after the one that reaches this many aren't searched
+    type: int
+    required: false
+    default: 1000
+  workers:
+    description: How many blobs to search at once
+    type: int
+    required: false
+    default: 8
+  cache:
+    description: Remember the matches of every blob searched on this host, keyed by pattern and blob id
+    type: bool
+    required: false
+    default: true
+'''
+
+EXAMPLES = r'''
+- name: Make sure no release ever shipped a private key
+  git_grep:
+    repo: /srv/git/app.git
+    pattern: "-----BEGIN [A-Z ]*PRIVATE KEY-----"
+    refs: "{{ release_tags }}"
+  register: keys
+  failed_when: keys.matched
+
+- name: Find the callers of a deprecated function on main
+  git_grep:
+    repo: /srv/app
+    pattern: "old_api("
+    fixed: true
+    refs:
+      - main
+    paths:
+      - "*.py"
+'''
+
+RETURN = r'''
+matches:
+  description: The matching lines, each C({ref, path, line, text}), in ref then path order
+  type: list
+matched:
+  description: Whether anything matched
+  type: bool
+truncated:
+  description: Whether the search stopped at C(max_matches)
+  type: bool
+files:
+  description: How many files were searched (per ref), and how many of them C(matched)
+  type: dict
+blobs:
+  description: How many distinct blobs were C(searched), came from the C(cache), or were skipped as C(binary)
+  type: dict
+changed:
+  description: Always false
+  type: bool
+'''
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    CACHE_DIR,
+    flatten_tree,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "pattern": {"type": 'str', "required": True},
+    "refs": {"type": 'list', "elements": 'str', "required": False, "default": ['HEAD']},
+    "paths": {"type": 'list', "elements": 'str', "required": False},
+    "ignore_case": {"type": 'bool', "required": False, "default": False},
+    "fixed": {"type": 'bool', "required": False, "default": False},
+    "max_matches": {"type": 'int', "required": False, "default": 1000},
+    "workers": {"type": 'int', "required": False, "default": 8},
+    "cache": {"type": 'bool', "required": False, "default": True},
+}
+
+GREP_CACHE_DIR = os.path.join(CACHE_DIR, "grep")
+# matches kept per blob, so the cache holds the same whatever max_matches is
+GREP_BLOB_MATCHES = 1000
+GREP_CACHE_SIZE = 100000
+# binary blobs are cached as this instead of a list of matches
+BINARY = None
+
+
+def cache_path(pattern, ignore_case, fixed):
+    key = hashlib.sha1(json.dumps([pattern, ignore_case, fixed]).encode()).hexdigest()
+    return os.path.join(GREP_CACHE_DIR, f"{key}.json")
+
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    # best effort, a lost cache only costs searching again
+    while len(cache) > GREP_CACHE_SIZE:
+        del cache[next(iter(cache))]
+    try:
+        os.makedirs(GREP_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=GREP_CACHE_DIR, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+class Searcher:
+    """
+    searches blobs for regex, each worker thread reading them through its
+    own Repository so no libgit2 object is shared between threads
+    """
+
+    def __init__(self, git_dir, regex, prefilter=True):
+        self.git_dir = git_dir
+        self.regex = regex
+        self.prefilter = prefilter
+        self.local = threading.local()
+
+    def search(self, blob_id):
+        """
+        the [line number, text] of the matching lines of a blob, BINARY for binary blobs
+        """
+        repo = getattr(self.local, "repo", None)
+        if repo is None:
+            repo = self.local.repo = pygit2.Repository(self.git_dir, pygit2.enums.RepositoryOpenFlag.NO_SEARCH)
+        blob = repo[blob_id]
+        if blob.is_binary:
+            return BINARY
+        text = blob.data.decode("utf-8", errors="replace")
+        # most blobs don't match at all, so find that out in one pass
+        if self.prefilter and self.regex.search(text) is None:
+            return []
+        found = []
+        # numbered like git, by newlines only
+        lines = text.split("\n")
+        if text.endswith("\n"):
+            lines.pop()
+        for number, line in enumerate(lines, 1):
+            if self.regex.search(line):
+                found.append([number, line])
+                if len(found) >= GREP_BLOB_MATCHES:
+                    break
+        return found
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "matches": [],
+        "matched": False,
+        "truncated": False,
+        "files": {"searched": 0, "matched": 0},
+        "blobs": {"searched": 0, "cached": 0, "binary": 0},
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    pattern = module.params.get('pattern')
+    paths = module.params.get('paths')
+    ignore_case = module.params.get('ignore_case')
+    fixed = module.params.get('fixed')
+    max_matches = module.params.get('max_matches')
+
+    try:
+        # multiline, so ^ and $ find the same lines when searching the whole blob first
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(re.escape(pattern) if fixed else pattern, flags)
+    except re.error as e:
+        module.fail_json(msg=f"invalid pattern {pattern}", exception=str(e))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    # the files to search at each ref, as (path, blob id)
+    trees = []
+    for ref in module.params.get('refs'):
+        commit = resolve_commit(repo_ref, ref)
+        if commit is None:
+            module.fail_json(msg=f"{ref} not found in {repo}")
+        files = []
+        for path, (blob_id, mode) in sorted(flatten_tree(repo_ref, commit.tree).items()):
+            if mode == pygit2.enums.FileMode.LINK:
+                continue
+            if paths and not any(fnmatch.fnmatchcase(path, glob) for glob in paths):
+                continue
+            files.append((path, blob_id))
+        trees.append((ref, files))
+
+    cache_file = cache_path(pattern, ignore_case, fixed)
+    cache = load_cache(cache_file) if module.params.get('cache') else {}
+    found = {}
+    # \A and \Z anchor the whole blob even in multiline mode, so only the lines can be searched
+    searcher = Searcher(repo_ref.path, regex, prefilter=fixed or re.search(r"\\[AZ]", pattern) is None)
+
+    with ThreadPoolExecutor(max_workers=max(module.params.get('workers'), 1)) as executor:
+        for ref, files in trees:
+            # search every blob of this ref not seen yet at once, in path order
+            pending = {}
+            for _path, blob_id in files:
+                if blob_id in found or blob_id in pending:
+                    continue
+                if blob_id in cache:
+                    found[blob_id] = cache[blob_id]
+                    result['blobs']['cached'] += 1
+                else:
+                    pending[blob_id] = True
+            for blob_id, lines in zip(pending, executor.map(searcher.search, pending)):
+                found[blob_id] = cache[blob_id] = lines
+                result['blobs']['searched'] += 1
+
+            for path, blob_id in files:
+                result['files']['searched'] += 1
+                lines = found[blob_id]
+                if lines is BINARY:
+                    continue
+                if lines:
+                    result['files']['matched'] += 1
+                for number, text in lines:
+                    if len(result['matches']) >= max_matches:
+                        result['truncated'] = True
+                        break
+                    result['matches'].append({"ref": ref, "path": path, "line": number, "text": text})
+                if result['truncated']:
+                    break
+            if result['truncated']:
+                break
+
+    result['blobs']['binary'] = sum(1 for lines in found.values() if lines is BINARY)
+    result['matched'] = bool(result['matches'])
+
+    if module.params.get('cache') and result['blobs']['searched']:
+        save_cache(cache_file, cache)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_import
+short_description: Import a series of directory snapshots as commits on a branch
+description:
+  - Turns an ordered series of snapshot directories, e.g. nightly config dumps, into one commit each on C(branch),
+    without an index or a checkout, so it works on bare repositories.
+  - Trees are built in memory. Files whose size and modification time match the same path in the previous snapshot
+    reuse its blob without being read, and directories whose entries are unchanged reuse its tree.
+  - New objects are held in memory and written as a single pack at the end (or whenever C(pack_limit) is reached)
+    rather than as loose objects, and the branch is moved once. The pack is not deltified, C(git_maintenance) or
+    C(git gc) compresses it later.
+  - Snapshots with the same content as the commit before them are left out, as are leading snapshots that match the
+    most recent commits on C(branch) in order, so re-running an import, or running it again with new snapshots
+    appended, only commits what is new.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  snapshots:
+    description: The snapshots to import, oldest first, each a directory or a dict of the options below
+    type: list
+    elements: raw
+    required: true
+    suboptions:
+      path:
+        description: The snapshot directory
+        type: path
+        required: true
+      message:
+        description: The commit message, defaults to C(Import <path>)
+        type: str
+        required: false
+      date:
+        description: The commit date as seconds since the epoch or an ISO 8601 timestamp, defaults to the directory's modification time
+        type: str
+        required: false
+  branch:
+    description: The branch to commit to, created if it doesn't exist. Defaults to the current branch
+    type: str
+    required: false
+  exclude:
+    description: Glob patterns of file and directory names to leave out of every snapshot
+    type: list
+    elements: str
+    required: false
+    default: [.git]
+  reuse_unchanged:
+    description: Trust size and modification time to spot files unchanged since the previous snapshot, set to false to read every file
+    type: bool
+    required: false
+    default: true
+  pack_limit:
+    description: Write a pack whenever this many MiB of new objects are held in memory
+    type: int
+    required: false
+    default: 512
+  author:
+    description: Author name
+    type: str
+    required: false
+    default: ansible_pygit
+  email:
+    description: Author email
+    type: str
+    required: false
+    default: ansible_pygit@ansible.com
+'''
+
+EXAMPLES = r'''
+- name: Find the nightly dumps
+  ansible.builtin.find:
+    paths: /srv/dumps
+    file_type: directory
+  register: dumps
+
+- name: Import them as history
+  git_import:
+    repo: /srv/git/config-history.git
+    branch: main
+    snapshots: "{{ dumps.files | map(attribute='path') | sort }}"
+
+- name: Import a tagged release with its date
+  git_import:
+    repo: /srv/git/config-history.git
+    snapshots:
+      - path: /srv/dumps/release-1.2
+        message: Release 1.2
+        date: "2025-03-01T12:00:00+00:00"
+'''
+
+RETURN = r'''
+commits:
+  description: How many commits were created (or would be in check mode)
+  type: int
+unchanged:
+  description: The snapshots left out because they were already imported or match the snapshot before them
+  type: list
+objects:
+  description: How many new objects were packed
+  type: int
+packs:
+  description: How many packs were written
+  type: int
+commit:
+  description: The commit C(branch) points to afterwards
+  type: str
+changed:
+  description: Whether C(branch) was moved
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import datetime
+import fnmatch
+import os
+import stat
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    MemoryObjects,
+    cannonicalise_name,
+    commit_data,
+    move_branch,
+    normalize_path,
+    open_repository,
+    tree_data,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "snapshots": {"type": 'list', "elements": 'raw', "required": True},
+    "branch": {"type": 'str', "required": False},
+    "exclude": {"type": 'list', "elements": 'str', "required": False, "default": ['.git']},
+    "reuse_unchanged": {"type": 'bool', "required": False, "default": True},
+    "pack_limit": {"type": 'int', "required": False, "default": 512},
+    "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
+    "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+}
+
+BLOB = pygit2.enums.ObjectType.BLOB
+TREE = pygit2.enums.ObjectType.TREE
+COMMIT = pygit2.enums.ObjectType.COMMIT
+
+
+class SnapshotTrees:
+    """
+    builds the tree of each snapshot, remembering the blob of every file and
+    the tree of every directory in the previous snapshot so unchanged ones
+    don't have to be read or rebuilt
+    """
+
+    def __init__(self, store, exclude, reuse_unchanged):
+        self.store = store
+        self.exclude = exclude
+        self.reuse_unchanged = reuse_unchanged
+        self.blobs = {}
+        self.trees = {}
+        self.new_blobs = {}
+        self.new_trees = {}
+
+    def build(self, root):
+        self.new_blobs = {}
+        self.new_trees = {}
+        tree = self._build_dir(root, "")
+        self.blobs = self.new_blobs
+        self.trees = self.new_trees
+        return tree if tree is not None else self.store.write(TREE, b"")
+
+    def _blob(self, path, rel_path, st):
+        key = (rel_path, st.st_size, st.st_mtime_ns)
+        oid = self.blobs.get(key) if self.reuse_unchanged else None
+        if oid is None:
+            if stat.S_ISLNK(st.st_mode):
+                data = os.fsencode(os.readlink(path))
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+            oid = self.store.write(BLOB, data)
+        self.new_blobs[key] = oid
+        return oid
+
+    def _build_dir(self, path, rel_path):
+        with os.scandir(path) as it:
+            dir_entries = sorted(it, key=lambda entry: entry.name)
+
+        entries = []
+        for entry in dir_entries:
+            if any(fnmatch.fnmatch(entry.name, pattern) for pattern in self.exclude):
+                continue
+            entry_rel_path = f"{rel_path}/{entry.name}" if rel_path else entry.name
+            st = entry.stat(follow_symlinks=False)
+            if stat.S_ISDIR(st.st_mode):
+                oid = self._build_dir(entry.path, entry_rel_path)
+                mode = pygit2.enums.FileMode.TREE
+            elif stat.S_ISLNK(st.st_mode):
+                oid = self._blob(entry.path, entry_rel_path, st)
+                mode = pygit2.enums.FileMode.LINK
+            elif stat.S_ISREG(st.st_mode):
+                oid = self._blob(entry.path, entry_rel_path, st)
+                if st.st_mode & stat.S_IXUSR:
+                    mode = pygit2.enums.FileMode.BLOB_EXECUTABLE
+                else:
+                    mode = pygit2.enums.FileMode.BLOB
+            else:
+                # sockets, fifos and devices can't be stored
+                continue
+            # git doesn't track empty directories
+            if oid is not None:
+                entries.append((os.fsencode(entry.name), int(mode), oid))
+
+        if not entries:
+            return None
+        entries = tuple(entries)
+        previous = self.trees.get(rel_path)
+        if previous is not None and previous[0] == entries:
+            oid = previous[1]
+        else:
+            oid = self.store.write(TREE, tree_data(entries))
+        self.new_trees[rel_path] = (entries, oid)
+        return oid
+
+
+def parse_snapshot(snapshot):
+    if isinstance(snapshot, str):
+        snapshot = {"path": snapshot}
+    if not isinstance(snapshot, dict) or not snapshot.get('path'):
+        raise ValueError(f"snapshot {snapshot} is not a path or a dict with a path")
+    unknown = set(snapshot) - {"path", "message", "date"}
+    if unknown:
+        raise ValueError(f"snapshot {snapshot['path']} has unknown options {','.join(sorted(unknown))}")
+    return dict(snapshot, path=normalize_path(str(snapshot['path'])))
+
+
+def snapshot_time(snapshot):
+    date = snapshot.get('date')
+    if not date:
+        return int(os.stat(snapshot['path']).st_mtime), 0
+    try:
+        return int(date), 0
+    except ValueError:
+        pass
+    when = datetime.datetime.fromisoformat(date)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return int(when.timestamp()), int(when.utcoffset().total_seconds() // 60)
+
+
+class ImportedPrefix:
+    """
+    works out, one snapshot tree at a time (oldest first), how many of the
+    leading trees are already the latest first-parent commits leading to
+    tip_id, so the series can be re-run. pending is true while the trees
+    seen so far could still be the start of a longer match
+    """
+
+    def __init__(self, repo_ref, tip_id, limit):
+        history = []
+        commit = repo_ref[tip_id] if tip_id else None
+        while commit is not None and len(history) < limit:
+            history.append(commit.tree_id)
+            commit = commit.parents[0] if commit.parents else None
+        history.reverse()
+        self.history = history
+        # where in history the trees seen so far might start
+        self.starts = list(range(len(history)))
+        self.seen = 0
+        self.matched = 0
+
+    @property
+    def pending(self):
+        return bool(self.starts)
+
+    def add(self, tree):
+        starts = []
+        for start in self.starts:
+            if self.history[start + self.seen] != tree:
+                continue
+            if start + self.seen + 1 == len(self.history):
+                # matches run up to the tip, later ones start earlier and are longer
+                self.matched = self.seen + 1
+            else:
+                starts.append(start)
+        self.starts = starts
+        self.seen += 1
+
+
+def commit_snapshot(module, store, tree, snapshot, parent_id, result):
+    path = snapshot['path']
+    try:
+        when, offset = snapshot_time(snapshot)
+    except (OSError, ValueError) as e:
+        module.fail_json(msg=f"bad date for snapshot {path}", exception=str(e), **result)
+
+    sig = pygit2.Signature(module.params.get('author'), module.params.get('email'), when, offset)
+    message = snapshot.get('message') or f"Import {path}"
+    result['commits'] += 1
+    return store.write(COMMIT, commit_data(tree, [parent_id] if parent_id else [], sig, sig, message))
+
+
+def commit_undecided(module, store, prefix, undecided, tip_id, result):
+    """
+    once prefix is no longer pending, skip the undecided snapshots already
+    on the branch and commit the rest, returns the new tip
+    """
+    for index, (tree, snapshot) in enumerate(undecided):
+        if index < prefix.matched:
+            result['unchanged'].append(snapshot['path'])
+        else:
+            tip_id = commit_snapshot(module, store, tree, snapshot, tip_id, result)
+    return tip_id
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "commits": 0,
+        "unchanged": [],
+        "objects": 0,
+        "packs": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    try:
+        snapshots = [parse_snapshot(snapshot) for snapshot in module.params.get('snapshots')]
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+    branch = module.params.get('branch')
+    pack_limit = module.params.get('pack_limit') * 1024 * 1024
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if branch is None:
+        if repo_ref.head_is_detached:
+            module.fail_json(msg=f"{repo} has no current branch, set branch")
+        # an unborn HEAD still names the branch it will create
+        branch_name = repo_ref.references['HEAD'].target
+    else:
+        branch_name = cannonicalise_name(repo_ref, branch)
+        if not branch_name.startswith("refs/heads/"):
+            branch_name = f"refs/heads/{branch}"
+
+    start_id = None
+    if branch_name in repo_ref.references:
+        start_id = repo_ref.references[branch_name].target
+
+    store = MemoryObjects(repo_ref)
+    trees = SnapshotTrees(store, module.params.get('exclude') or [], module.params.get('reuse_unchanged'))
+    prefix = ImportedPrefix(repo_ref, start_id, len(snapshots))
+    # snapshots that may already be on the branch, their trees are then already in the odb
+    undecided = []
+    tip_id = start_id
+    last_tree = None
+    for snapshot in snapshots:
+        path = snapshot['path']
+        try:
+            tree = trees.build(path)
+        except OSError as e:
+            module.fail_json(msg=f"failed to read snapshot {path}", exception=str(e), **result)
+        # a run of identical snapshots makes one commit
+        if tree == last_tree:
+            result['unchanged'].append(path)
+            continue
+        last_tree = tree
+
+        if prefix.pending:
+            prefix.add(tree)
+            undecided.append((tree, snapshot))
+            if prefix.pending:
+                continue
+            tip_id = commit_undecided(module, store, prefix, undecided, tip_id, result)
+            undecided = []
+        else:
+            tip_id = commit_snapshot(module, store, tree, snapshot, tip_id, result)
+
+        # each snapshot is committed as soon as it is built, so this bounds what is held
+        if store.size > pack_limit:
+            if module.check_mode:
+                store.clear()
+            else:
+                result['objects'] += store.flush()
+                result['packs'] += 1
+    tip_id = commit_undecided(module, store, prefix, undecided, tip_id, result)
+
+    result['commit'] = str(tip_id) if tip_id else ''
+    if not result['commits']:
+        result['message'] = f"nothing new to import to {branch_name}"
+        module.exit_json(**result)
+
+    if module.check_mode:
+        result['message'] = f"would import {result['commits']} snapshots to {branch_name}"
+        module.exit_json(**result)
+
+    try:
+        if store.objects:
+            result['objects'] += store.flush()
+            result['packs'] += 1
+        if start_id is not None:
+            move_branch(repo_ref, branch_name, start_id, tip_id, f"import: {result['commits']} snapshots")
+        else:
+            unborn_head = not repo_ref.is_bare and repo_ref.head_is_unborn \
+                and repo_ref.references['HEAD'].target == branch_name
+            if unborn_head:
+                repo_ref.checkout_tree(repo_ref[tip_id], strategy=pygit2.enums.CheckoutStrategy.SAFE)
+            repo_ref.create_reference_direct(branch_name, tip_id, False,
+                                             message=f"import: {result['commits']} snapshots")
+    except (pygit2.GitError, OSError) as e:
+        module.fail_json(msg=f"failed to import to {branch_name}", exception=str(e), **result)
+
+    result['message'] = f"imported {result['commits']} snapshots to {branch_name}"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
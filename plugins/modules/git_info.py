@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_info
+short_description: Gather facts about one or more Git repositories
+description:
+  - Read-only module that returns the HEAD commit, current branch, dirty state, ahead/behind counts,
+    latest tag and remote URLs of a repository as Ansible facts.
+  - Only the facts listed in C(gather) are computed, and the dirty check stops at the first change it finds.
+options:
+  repo:
+    description: Path to a Git repository. Facts are returned in C(ansible_facts.git_info).
+    type: path
+    required: false
+  repos:
+    description: A list of repository paths. Facts are returned in C(ansible_facts.git_info) keyed by path.
+    type: list
+    elements: path
+    required: false
+  gather:
+    description: The facts to compute
+    type: list
+    elements: str
+    required: false
+    choices: [head, branch, dirty, ahead_behind, divergence, tag, remotes]
+    default: [head, branch, dirty, ahead_behind, tag, remotes]
+  untracked:
+    description: Whether untracked files make a worktree dirty
+    type: bool
+    required: false
+    default: true
+  workers:
+    description: Number of repositories to inspect concurrently when C(repos) is used
+    type: int
+    required: false
+    default: 4
+  ceiling_dirs:
+    description: Stop looking for a repository in the parents of a path at these directories (default C($GIT_CEILING_DIRECTORIES))
+    type: list
+    elements: path
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Gather facts about a repository
+  git_info:
+    repo: /home/example/projects/test_repo
+
+- name: Check which checkouts have local changes
+  git_info:
+    repos:
+      - /srv/app1
+      - /srv/app2
+    gather:
+      - dirty
+
+- name: Compare every local branch with its upstream
+  git_info:
+    repo: /home/example/projects/test_repo
+    gather:
+      - divergence
+'''
+
+RETURN = r'''
+ansible_facts:
+  description: Contains C(git_info), the facts for C(repo) or a dict of facts keyed by path for C(repos)
+  type: dict
+  contains:
+    head:
+      description: The commit id HEAD points to, or null for an unborn repository
+      type: str
+    branch:
+      description: The short name of the checked out branch, or null if HEAD is detached
+      type: str
+    dirty:
+      description: Whether the worktree has staged, unstaged or untracked changes
+      type: bool
+    upstream:
+      description: The upstream branch of the current branch, if any
+      type: str
+    ahead:
+      description: Commits on the current branch that are not on its upstream
+      type: int
+    behind:
+      description: Commits on the upstream that are not on the current branch
+      type: int
+    divergence:
+      description:
+        - Only gathered when requested. A dict keyed by local branch name, for every branch with an upstream,
+          holding C(upstream), C(ahead), C(behind) and C(merge_base).
+        - All branches are computed in a single walk that uses the commit-graph when there is one.
+      type: dict
+    tag:
+      description: The nearest tag reachable from HEAD
+      type: str
+    remotes:
+      description: A dict of remote names and their URLs
+      type: dict
+    error:
+      description: Why facts could not be gathered for a repository (C(repos) only)
+      type: str
+changed:
+  description: Always false
+  type: bool
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    branch_divergence,
+    is_dirty,
+    normalize_path,
+    open_repository,
+    tracking_branches,
+)
+
+DEFAULT_FACTS = ['head', 'branch', 'dirty', 'ahead_behind', 'tag', 'remotes']
+ALL_FACTS = DEFAULT_FACTS + ['divergence']
+
+module_args = {
+    "repo": {"type": 'path', "required": False},
+    "repos": {"type": 'list', "elements": 'path', "required": False},
+    "gather": {"type": 'list', "elements": 'str', "required": False, "choices": ALL_FACTS, "default": DEFAULT_FACTS},
+    "untracked": {"type": 'bool', "required": False, "default": True},
+    "workers": {"type": 'int', "required": False, "default": 4},
+    "ceiling_dirs": {"type": 'list', "elements": 'path', "required": False},
+}
+
+
+def _current_branch(repo_ref):
+    """
+    return the (name, Branch) HEAD points to, Branch is None for an unborn branch
+    """
+    if repo_ref.head_is_detached:
+        return None, None
+    if repo_ref.head_is_unborn:
+        target = repo_ref.lookup_reference("HEAD").target
+        return target[len("refs/heads/"):], None
+    branch = repo_ref.lookup_branch(repo_ref.head.shorthand)
+    return branch.branch_name, branch
+
+
+def gather_facts(repo_ref, gather, untracked):
+    facts = {}
+    unborn = repo_ref.head_is_unborn
+    branch_name, branch = _current_branch(repo_ref)
+
+    if 'head' in gather:
+        facts['head'] = None if unborn else str(repo_ref.head.target)
+
+    if 'branch' in gather:
+        facts['branch'] = branch_name
+
+    if 'dirty' in gather:
+        facts['dirty'] = is_dirty(repo_ref, untracked=untracked)
+
+    if 'ahead_behind' in gather:
+        facts['upstream'] = None
+        facts['ahead'] = 0
+        facts['behind'] = 0
+        if branch is not None:
+            try:
+                upstream = branch.upstream
+            except (KeyError, pygit2.GitError):
+                # the configured upstream branch no longer exists
+                upstream = None
+            if upstream is not None:
+                facts['upstream'] = upstream.shorthand
+                ahead, behind = repo_ref.ahead_behind(branch.target, upstream.target)
+                facts['ahead'] = ahead
+                facts['behind'] = behind
+
+    if 'divergence' in gather:
+        tracked = tracking_branches(repo_ref)
+        counts = branch_divergence(repo_ref, [(b.target, u.target) for b, u in tracked])
+        facts['divergence'] = {}
+        for (local, upstream), (ahead, behind, merge_base) in zip(tracked, counts):
+            facts['divergence'][local.branch_name] = {
+                "upstream": upstream.shorthand,
+                "ahead": ahead,
+                "behind": behind,
+                "merge_base": merge_base,
+            }
+
+    if 'tag' in gather:
+        facts['tag'] = None
+        if not unborn:
+            try:
+                facts['tag'] = repo_ref.describe(
+                    describe_strategy=pygit2.enums.DescribeStrategy.TAGS,
+                    abbreviated_size=0,
+                )
+            except (KeyError, pygit2.GitError):
+                # no tag is reachable from HEAD
+                pass
+
+    if 'remotes' in gather:
+        facts['remotes'] = dict((remote.name, remote.url) for remote in repo_ref.remotes)
+
+    return facts
+
+
+def _gather_path(path, gather, untracked, ceiling_dirs):
+    try:
+        repo_ref = open_repository(normalize_path(path), ceiling_dirs)
+        return gather_facts(repo_ref, gather, untracked)
+    except (KeyError, pygit2.GitError, OSError) as e:
+        return {"error": str(e)}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "ansible_facts": {},
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[('repo', 'repos')],
+        required_one_of=[('repo', 'repos')],
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    repos = module.params.get('repos')
+    gather = module.params.get('gather')
+    untracked = module.params.get('untracked')
+    workers = module.params.get('workers')
+    ceiling_dirs = module.params.get('ceiling_dirs')
+
+    if repo is not None:
+        try:
+            repo_ref = open_repository(normalize_path(repo), ceiling_dirs)
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+        result['ansible_facts']['git_info'] = gather_facts(repo_ref, gather, untracked)
+        module.exit_json(**result)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        gathered = executor.map(lambda path: _gather_path(path, gather, untracked, ceiling_dirs), repos)
+        result['ansible_facts']['git_info'] = dict(zip(repos, gathered))
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_job_status
+short_description: Poll or cancel a background clone, fetch or push
+description:
+  - Reads the progress a detached M(git_clone), M(git_fetch) or M(git_push) writes to its status file, so checking on
+    a long transfer costs one small file read and no git access.
+  - With C(cancel) the job is asked to stop; it aborts the transfer at its next progress update (about every half a
+    second), leaving the repository as it was before.
+  - A job whose process has gone away without finishing is reported as C(lost).
+options:
+  status_file:
+    description: The status file, as returned by the task that started the job
+    type: path
+    required: true
+  cancel:
+    description: Ask the job to stop
+    type: bool
+    required: false
+    default: false
+  wait:
+    description: Seconds to wait for the job to finish (or stop, after C(cancel)) before returning, 0 returns at once
+    type: int
+    required: false
+    default: 0
+'''
+
+EXAMPLES = r'''
+- name: Wait for a detached clone, up to 20 minutes
+  git_job_status:
+    status_file: "{{ clone.status_file }}"
+  register: job
+  until: job.finished
+  retries: 120
+  delay: 10
+
+- name: Give up on it
+  git_job_status:
+    status_file: "{{ clone.status_file }}"
+    cancel: true
+    wait: 10
+'''
+
+RETURN = r'''
+state:
+  description: One of C(starting), C(running), C(done), C(failed), C(cancelled) or C(lost)
+  type: str
+finished:
+  description: Whether the job has stopped, whatever the reason
+  type: bool
+operation:
+  description: C(clone), C(fetch) or C(push)
+  type: str
+target:
+  description: What is being transferred, the clone's path or the repository and remote
+  type: str
+pid:
+  description: The process running the job
+  type: int
+phase:
+  description: C(receiving), C(resolving) (deltas) or C(pushing)
+  type: str
+objects:
+  description: How many objects have been received or pushed
+  type: int
+total_objects:
+  description: How many objects there are to transfer
+  type: int
+deltas:
+  description: How many deltas have been resolved
+  type: int
+total_deltas:
+  description: How many deltas there are to resolve
+  type: int
+bytes:
+  description: How many bytes have been transferred
+  type: int
+rate:
+  description: The average transfer rate in bytes per second
+  type: float
+percent:
+  description: How far through the job is, counting objects and deltas
+  type: float
+eta:
+  description: Estimated seconds left, null until there is something to estimate from
+  type: float
+remote:
+  description: The last progress message from the remote, e.g. while it counts objects
+  type: str
+started:
+  description: When the job started, in seconds since the epoch
+  type: float
+updated:
+  description: When the status was last written, in seconds since the epoch
+  type: float
+error:
+  description: Why the job failed
+  type: str
+result:
+  description: What the job returned when done, e.g. the refs fetched or pushed
+  type: dict
+changed:
+  description: Whether a cancel was requested
+  type: bool
+'''
+
+import os
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.pygit_utils import (
+    JOB_PROGRESS_INTERVAL,
+    JOB_RUNNING,
+    read_job_status,
+)
+
+module_args = {
+    "status_file": {"type": 'path', "required": True},
+    "cancel": {"type": 'bool', "required": False, "default": False},
+    "wait": {"type": 'int', "required": False, "default": 0},
+}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "state": '',
+        "finished": False,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    status_file = module.params.get('status_file')
+
+    status = read_job_status(status_file)
+    if status is None:
+        module.fail_json(msg=f"no job status at {status_file}")
+
+    if module.params.get('cancel') and status['state'] in JOB_RUNNING:
+        result['changed'] = True
+        if not module.check_mode:
+            with open(f"{status_file}.cancel", "w"):
+                pass
+
+    deadline = time.monotonic() + module.params.get('wait')
+    while status['state'] in JOB_RUNNING and time.monotonic() < deadline:
+        time.sleep(JOB_PROGRESS_INTERVAL)
+        status = read_job_status(status_file) or status
+
+    result.update(status)
+    result['finished'] = status['state'] not in JOB_RUNNING
+    if result['finished'] and not module.check_mode and os.path.exists(f"{status_file}.cancel"):
+        # the job went before it saw the request
+        os.unlink(f"{status_file}.cancel")
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_log
+short_description: Query the commit history of a Git repository
+description:
+  - Walks the history of a revision range and returns the commits matching the path, author, date and message filters.
+  - Commits are read lazily and the walk stops as soon as C(limit) commits have been found, so the output is bounded
+    however long the history is.
+  - Path filtering compares tree entry ids with the parent commits, no diffs are computed.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  range:
+    description: A revision (e.g. C(main)) or revision range (e.g. C(v1.0..HEAD)) to walk
+    type: str
+    required: false
+    default: HEAD
+    aliases: [rev]
+  paths:
+    description: Only return commits that changed one of these paths (files or directories, relative to the repository root)
+    type: list
+    elements: str
+    required: false
+  author:
+    description: Only return commits whose author C(name <email>) matches this regular expression
+    type: str
+    required: false
+  grep:
+    description: Only return commits whose message matches this regular expression
+    type: str
+    required: false
+  since:
+    description: Only return commits made at or after this time (ISO 8601 date or unix timestamp)
+    type: str
+    required: false
+  until:
+    description: Only return commits made at or before this time (ISO 8601 date or unix timestamp)
+    type: str
+    required: false
+  first_parent:
+    description: Only follow the first parent of merge commits
+    type: bool
+    required: false
+    default: false
+  limit:
+    description: Maximum number of commits to return
+    type: int
+    required: false
+    default: 100
+  skip:
+    description: Number of matching commits to skip before returning any
+    type: int
+    required: false
+    default: 0
+  full_message:
+    description: Return the full commit message rather than just the subject line
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Commits touching deploy/ since v1.0 by a given author
+  git_log:
+    repo: /home/example/projects/test_repo
+    range: v1.0..HEAD
+    paths:
+      - deploy
+    author: example@example.com
+
+- name: The second page of 50 commits
+  git_log:
+    repo: /home/example/projects/test_repo
+    limit: 50
+    skip: 50
+'''
+
+RETURN = r'''
+commits:
+  description: The matching commits, newest first
+  type: list
+  elements: dict
+  contains:
+    id:
+      description: The commit id
+      type: str
+    author:
+      description: The author name
+      type: str
+    email:
+      description: The author email
+      type: str
+    time:
+      description: The commit time as a unix timestamp
+      type: int
+    parents:
+      description: The parent commit ids
+      type: list
+    message:
+      description: The subject line, or the full message if C(full_message) is set
+      type: str
+truncated:
+  description: Whether more matching commits exist beyond C(limit)
+  type: bool
+next_skip:
+  description: The C(skip) value that returns the next page, or null if there are no more commits
+  type: int
+changed:
+  description: Always false
+  type: bool
+'''
+
+import re
+from datetime import datetime
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    normalize_path,
+    open_repository,
+)
+
+SINCE_SLOP = 5
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "range": {"type": 'str', "required": False, "default": "HEAD", "aliases": ['rev']},
+    "paths": {"type": 'list', "elements": 'str', "required": False},
+    "author": {"type": 'str', "required": False},
+    "grep": {"type": 'str', "required": False},
+    "since": {"type": 'str', "required": False},
+    "until": {"type": 'str', "required": False},
+    "first_parent": {"type": 'bool', "required": False, "default": False},
+    "limit": {"type": 'int', "required": False, "default": 100},
+    "skip": {"type": 'int', "required": False, "default": 0},
+    "full_message": {"type": 'bool', "required": False, "default": False},
+}
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    return int(parsed.timestamp())
+
+
+def tree_entry_id(tree, path):
+    try:
+        return tree[path].id
+    except KeyError:
+        return None
+
+
+def touches_paths(commit, paths):
+    """
+    a commit touches a path if its tree entry differs from every parent's,
+    which is the same simplification git log uses for merges
+    """
+    entries = [tree_entry_id(commit.tree, path) for path in paths]
+    if not commit.parent_ids:
+        return any(entry is not None for entry in entries)
+
+    for parent in commit.parents:
+        parent_entries = [tree_entry_id(parent.tree, path) for path in paths]
+        if parent_entries == entries:
+            return False
+    return True
+
+
+def walk_range(repo_ref, rev_range, first_parent):
+    revspec = repo_ref.revparse(rev_range)
+    if revspec.flags & pygit2.enums.RevSpecFlag.RANGE:
+        start = revspec.to_object.peel(pygit2.Commit).id
+        hide = revspec.from_object.peel(pygit2.Commit).id
+    else:
+        start = revspec.from_object.peel(pygit2.Commit).id
+        hide = None
+
+    walker = repo_ref.walk(start, pygit2.enums.SortMode.TIME)
+    if hide is not None:
+        walker.hide(hide)
+    if first_parent:
+        walker.simplify_first_parent()
+    return walker
+
+
+def format_commit(commit, full_message):
+    message = commit.message if full_message else commit.message.split("\n", 1)[0]
+    return {
+        "id": str(commit.id),
+        "author": commit.author.name,
+        "email": commit.author.email,
+        "time": commit.commit_time,
+        "parents": [str(p) for p in commit.parent_ids],
+        "message": message,
+    }
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "commits": [],
+        "truncated": False,
+        "next_skip": None,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    rev_range = module.params.get('range')
+    paths = module.params.get('paths')
+    author = module.params.get('author')
+    grep = module.params.get('grep')
+    first_parent = module.params.get('first_parent')
+    limit = module.params.get('limit')
+    skip = module.params.get('skip')
+    full_message = module.params.get('full_message')
+
+    try:
+        since = parse_time(module.params.get('since'))
+        until = parse_time(module.params.get('until'))
+    except ValueError as e:
+        module.fail_json(msg="since and until must be ISO 8601 dates or unix timestamps", exception=str(e))
+
+    try:
+        author_re = re.compile(author) if author else None
+        grep_re = re.compile(grep) if grep else None
+    except re.error as e:
+        module.fail_json(msg="invalid author or grep pattern", exception=str(e))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if paths:
+        paths = [path.strip("/") for path in paths]
+
+    try:
+        walker = walk_range(repo_ref, rev_range, first_parent)
+    except (KeyError, ValueError, pygit2.GitError) as e:
+        module.fail_json(msg=f"can't resolve {rev_range}", exception=str(e))
+
+    commits = []
+    matched = 0
+    too_old = 0
+    for commit in walker:
+        # cheap header checks first, the path check reads trees
+        if until is not None and commit.commit_time > until:
+            continue
+        if since is not None and commit.commit_time < since:
+            # commits come out in time order, so once a few in a row are too
+            # old (allowing for clock skew) nothing later can match
+            too_old += 1
+            if too_old > SINCE_SLOP:
+                break
+            continue
+        too_old = 0
+        if author_re and not author_re.search(f"{commit.author.name} <{commit.author.email}>"):
+            continue
+        if grep_re and not grep_re.search(commit.message):
+            continue
+        if paths and not touches_paths(commit, paths):
+            continue
+
+        matched += 1
+        if matched <= skip:
+            continue
+        if len(commits) == limit:
+            result['truncated'] = True
+            result['next_skip'] = skip + limit
+            break
+        commits.append(format_commit(commit, full_message))
+
+    result['commits'] = commits
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
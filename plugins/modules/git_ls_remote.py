@@ -0,0 +1,223 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_ls_remote
+short_description: List the refs of a remote repository without fetching
+description:
+  - Lists the branches and tags a remote advertises, like C(git ls-remote), without transferring any objects.
+  - With C(repo) and a remote name as C(url), also reports which remote branches and tags have moved since the last
+    fetch, i.e. differ from the repository's remote-tracking branches and tags.
+  - With C(cache_ttl) the answer is cached on the target, so repeated checks of the same remote within that many
+    seconds don't touch the network.
+options:
+  url:
+    description: The url of the remote repository, or the name of a remote of C(repo)
+    type: str
+    required: true
+  repo:
+    description: Path to a Git repository (worktree or bare), needed to use a remote name as C(url)
+    type: path
+    required: false
+  refs:
+    description: Only return refs whose full name (C(refs/heads/main)) or short name (C(main)) matches one of these globs
+    type: list
+    elements: str
+    required: false
+  peeled:
+    description: Include the peeled commit ids of annotated tags (C(refs/tags/v1.0^{}))
+    type: bool
+    required: false
+    default: true
+  cache_ttl:
+    description: Seconds to reuse an earlier answer for the same url on this host, 0 always asks the remote
+    type: int
+    required: false
+    default: 0
+  username:
+    description: the username for the remote repo (if required)
+    type: str
+    required: false
+  pubkey:
+    description: the path to a public key file for ssh
+    type: path
+    required: false
+  privkey:
+    description: the path to the private key for ssh
+    type: path
+    required: false
+  passphrase:
+    description: the passphrase to access the keypair (if required)
+    type: str
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Has the release branch moved?
+  git_ls_remote:
+    url: origin
+    repo: /srv/app
+    refs:
+      - release/*
+    cache_ttl: 300
+  register: remote
+
+- name: Fetch only if it has
+  ansible.builtin.command:
+    cmd: git fetch origin
+    chdir: /srv/app
+  when: not remote.up_to_date
+
+- name: Look up a tag on a remote without a local clone
+  git_ls_remote:
+    url: https://git.example.com/app.git
+    refs:
+      - v1.2.0
+  register: tag
+'''
+
+RETURN = r'''
+refs:
+  description: The matching refs, as full name to id
+  type: dict
+symrefs:
+  description: The symbolic refs the remote advertises, usually just C(HEAD), as name to target
+  type: dict
+head:
+  description: The branch the remote's HEAD points to, if it says
+  type: str
+moved:
+  description:
+    - The matching branches and tags whose remote id differs from the local remote-tracking ref or tag (remote names only).
+    - Each is C({local, remote}), C(local) is null for refs not fetched yet.
+  type: dict
+up_to_date:
+  description: Whether nothing has moved (remote names only)
+  type: bool
+cached:
+  description: Whether the answer came from the cache
+  type: bool
+changed:
+  description: Always false
+  type: bool
+'''
+
+import fnmatch
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    get_credentials,
+    ls_remote,
+    normalize_path,
+    open_repository,
+)
+
+module_args = {
+    "url": {"type": 'str', "required": True},
+    "repo": {"type": 'path', "required": False},
+    "refs": {"type": 'list', "elements": 'str', "required": False},
+    "peeled": {"type": 'bool', "required": False, "default": True},
+    "cache_ttl": {"type": 'int', "required": False, "default": 0},
+    "username": {"type": 'str', "required": False},
+    "pubkey": {"type": 'path', "required": False},
+    "privkey": {"type": 'path', "required": False},
+    "passphrase": {"type": 'str', "required": False, "no_log": True},
+}
+
+
+def short_name(name):
+    for prefix in ("refs/heads/", "refs/tags/", "refs/"):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def wanted(name, patterns, peeled):
+    if name.endswith("^{}"):
+        if not peeled:
+            return False
+        name = name[:-len("^{}")]
+    if not patterns:
+        return True
+    return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(short_name(name), pattern)
+               for pattern in patterns)
+
+
+def local_name(name, remote):
+    """
+    where a fetch from remote keeps name, or None for refs that aren't fetched
+    """
+    if name.startswith("refs/heads/"):
+        return f"refs/remotes/{remote}/{name[len('refs/heads/'):]}"
+    if name.startswith("refs/tags/") and not name.endswith("^{}"):
+        return name
+    return None
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "refs": {},
+        "symrefs": {},
+        "head": None,
+        "cached": False,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    url = module.params.get('url')
+    repo = module.params.get('repo')
+    patterns = module.params.get('refs')
+    peeled = module.params.get('peeled')
+    username = module.params.get('username')
+    credentials = get_credentials(username, module.params.get('pubkey'),
+                                  module.params.get('privkey'), module.params.get('passphrase'))
+
+    repo_ref = None
+    if repo is not None:
+        try:
+            repo_ref = open_repository(normalize_path(repo))
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    try:
+        refs, symrefs, cached = ls_remote(url, credentials, module.params.get('cache_ttl'), repo_ref, username)
+    except (pygit2.GitError, ValueError) as e:
+        module.fail_json(msg=f"failed to list the refs of {url}", exception=str(e))
+
+    result['refs'] = dict((name, oid) for name, oid in refs.items() if wanted(name, patterns, peeled))
+    result['symrefs'] = symrefs
+    result['head'] = symrefs.get("HEAD")
+    result['cached'] = cached
+
+    if repo_ref is not None and url in repo_ref.remotes.names():
+        moved = {}
+        for name, oid in result['refs'].items():
+            local = local_name(name, url)
+            if local is None:
+                continue
+            ref = repo_ref.references.get(local)
+            local_id = str(ref.target) if ref is not None else None
+            if local_id != oid:
+                moved[name] = {"local": local_id, "remote": oid}
+        result['moved'] = moved
+        result['up_to_date'] = not moved
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_maintenance
+short_description: Report on and optimise a Git object database
+description:
+  - Reports loose object and pack counts, and optionally prunes unreachable loose objects,
+    repacks objects, packs refs and writes a commit-graph.
+  - Every step is optional and idempotent, and works on bare repositories.
+  - libgit2 can not write commit-graphs or pack bitmaps, so those steps use the git binary and fail if it is not installed.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  repack:
+    description:
+      - C(loose) packs only the loose objects into a new pack, C(full) rewrites every reachable object into a single pack.
+      - Objects are reachable from any ref, reflog, or the HEAD or index of the repository or any of its linked worktrees.
+      - Packed loose objects and superseded packs are removed once the new pack has been written. Unreachable loose
+        objects are left for C(prune). With C(full), unreachable objects in the superseded packs are written out as
+        loose objects with their pack's modification time, so C(prune) removes them once they are older than
+        C(prune_age_days).
+    type: str
+    required: false
+    choices: [none, loose, full]
+    default: none
+  bitmaps:
+    description: Write a reachability bitmap when doing a full repack (requires the git binary)
+    type: bool
+    required: false
+    default: false
+  prune:
+    description: Delete unreachable loose objects older than prune_age_days
+    type: bool
+    required: false
+    default: false
+  prune_age_days:
+    description: Only prune unreachable objects whose files are older than this many days
+    type: int
+    required: false
+    default: 14
+  pack_refs:
+    description: Pack loose references into packed-refs
+    type: bool
+    required: false
+    default: false
+  commit_graph:
+    description: Write or refresh the commit-graph for all reachable commits (requires the git binary)
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Report object counts
+  git_maintenance:
+    repo: /home/example/projects/test_repo
+
+- name: Prune, repack and refresh the commit-graph on a mirror
+  git_maintenance:
+    repo: /srv/git/test_repo.git
+    prune: true
+    repack: loose
+    pack_refs: true
+    commit_graph: true
+'''
+
+RETURN = r'''
+objects_before:
+  description: Loose and packed object counts and sizes (in bytes) before any step ran
+  type: dict
+objects_after:
+  description: Loose and packed object counts and sizes (in bytes) after all steps ran
+  type: dict
+actions:
+  description: The maintenance steps that changed the repository
+  type: list
+pruned_objects:
+  description: Number of unreachable loose objects removed (or that would be removed in check mode)
+  type: int
+changed:
+  description: Whether any change was made
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import hashlib
+import os
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    CommitGraph,
+    count_objects,
+    loose_objects,
+    normalize_path,
+    open_repository,
+    pack_files,
+    pack_objects,
+    reachable_objects,
+    write_loose,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "repack": {"type": 'str', "required": False, "choices": ['none', 'loose', 'full'], "default": 'none'},
+    "bitmaps": {"type": 'bool', "required": False, "default": False},
+    "prune": {"type": 'bool', "required": False, "default": False},
+    "prune_age_days": {"type": 'int', "required": False, "default": 14},
+    "pack_refs": {"type": 'bool', "required": False, "default": False},
+    "commit_graph": {"type": 'bool', "required": False, "default": False},
+}
+
+
+def _remove_loose(repo_ref, oids):
+    removed = 0
+    for oid, path in loose_objects(repo_ref):
+        if oid in oids:
+            os.remove(path)
+            removed += 1
+
+    # tidy up fanout directories emptied by the removal
+    objects_dir = os.path.join(repo_ref.path, "objects")
+    for fanout in os.listdir(objects_dir):
+        fanout_dir = os.path.join(objects_dir, fanout)
+        if len(fanout) == 2 and os.path.isdir(fanout_dir) and not os.listdir(fanout_dir):
+            os.rmdir(fanout_dir)
+    return removed
+
+
+def prune_unreachable(repo_ref, age_days, check_mode):
+    cutoff = time.time() - age_days * 86400
+    reachable = reachable_objects(repo_ref)
+    expired = set()
+    for oid, path in loose_objects(repo_ref):
+        if oid in reachable:
+            continue
+        if os.stat(path).st_mtime <= cutoff:
+            expired.add(oid)
+
+    if check_mode or not expired:
+        return len(expired)
+    return _remove_loose(repo_ref, expired)
+
+
+def repack_loose(repo_ref, check_mode):
+    loose = set(oid for oid, _path in loose_objects(repo_ref))
+    if check_mode or not loose:
+        return len(loose)
+
+    def add_loose(pack_builder):
+        for oid in loose:
+            pack_builder.add(pygit2.Oid(hex=oid))
+
+    repo_ref.pack(pack_delegate=add_loose, n_threads=0)
+    _remove_loose(repo_ref, loose)
+    return len(loose)
+
+
+def repack_full(repo_ref, check_mode):
+    old_packs = pack_files(repo_ref)
+    reachable = reachable_objects(repo_ref)
+    loose = set(oid for oid, _path in loose_objects(repo_ref))
+    # unreachable loose objects are left for prune, which honours prune_age_days
+    packed_loose = loose & reachable
+    if len(old_packs) <= 1 and not packed_loose:
+        return False
+    if check_mode:
+        return True
+
+    # unreachable objects in the old packs are written out loose, dated like
+    # their pack, so that prune ages them out rather than the repack deleting them
+    unreachable = {}
+    for pack_path in old_packs:
+        mtime = os.stat(pack_path).st_mtime
+        for oid in pack_objects(pack_path):
+            if oid not in reachable and oid not in loose:
+                unreachable[oid] = max(mtime, unreachable.get(oid, 0))
+
+    def add_reachable(pack_builder):
+        for oid in reachable:
+            pack_builder.add(pygit2.Oid(hex=oid))
+
+    repo_ref.pack(pack_delegate=add_reachable, n_threads=0)
+    new_packs = set(pack_files(repo_ref)) - set(old_packs)
+
+    for oid, mtime in unreachable.items():
+        object_type, data = repo_ref.odb.read(pygit2.Oid(hex=oid))
+        write_loose(repo_ref, object_type, data, mtime)
+
+    for pack_path in old_packs:
+        if pack_path in new_packs:
+            continue
+        base = pack_path[:-len(".pack")]
+        for ext in (".pack", ".idx", ".rev", ".bitmap"):
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
+    _remove_loose(repo_ref, packed_loose)
+    return True
+
+
+def commit_graph_stale(repo_ref):
+    """
+    whether the commit-graph is missing, or doesn't hold exactly the commits
+    reachable from the refs, which is what commit-graph write --reachable writes
+    """
+    graph = CommitGraph.open(repo_ref)
+    if graph is None:
+        return True
+    walker = None
+    for name in repo_ref.listall_references():
+        try:
+            commit = repo_ref.lookup_reference(name).peel(pygit2.Commit)
+        except (KeyError, pygit2.GitError):
+            # a symbolic ref to nothing, or a tag of a tree or blob
+            continue
+        if graph.position(commit.id.raw) is None:
+            return True
+        if walker is None:
+            walker = repo_ref.walk(commit.id)
+        else:
+            walker.push(commit.id)
+    reachable = 0 if walker is None else sum(1 for _ in walker)
+    return reachable != graph.count
+
+
+def _loose_refs(repo_ref):
+    # symbolic refs are never packed, so only count direct ones
+    found = []
+    refs_dir = os.path.join(repo_ref.path, "refs")
+    for dirpath, _dirnames, filenames in os.walk(refs_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                if not f.read(5).startswith(b"ref: "):
+                    found.append(path)
+    return found
+
+
+def _file_digest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def run_git(module, repo_ref, args):
+    git_bin = module.get_bin_path('git', required=True)
+    rc, out, err = module.run_command([git_bin, f"--git-dir={repo_ref.path}"] + args)
+    if rc != 0:
+        module.fail_json(msg=f"git {' '.join(args)} failed", exception=err)
+    return out
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "objects_before": {},
+        "objects_after": {},
+        "actions": [],
+        "pruned_objects": 0,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    repack = module.params.get('repack')
+    bitmaps = module.params.get('bitmaps')
+    prune = module.params.get('prune')
+    prune_age_days = module.params.get('prune_age_days')
+    pack_refs = module.params.get('pack_refs')
+    commit_graph = module.params.get('commit_graph')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    result['objects_before'] = count_objects(repo_ref)
+    actions = []
+    check_mode = module.check_mode
+
+    # prune before packing so unreachable objects are not copied into the new pack
+    if prune:
+        pruned = prune_unreachable(repo_ref, prune_age_days, check_mode)
+        result['pruned_objects'] = pruned
+        if pruned:
+            actions.append("prune")
+
+    if repack == 'loose':
+        if repack_loose(repo_ref, check_mode):
+            actions.append("repack")
+    elif repack == 'full' and bitmaps:
+        packs = pack_files(repo_ref)
+        bitmapped = len(packs) == 1 and os.path.exists(packs[0][:-len(".pack")] + ".bitmap")
+        if not bitmapped or result['objects_before']['loose_objects']:
+            if not check_mode:
+                run_git(module, repo_ref, ["repack", "-a", "-d", "--write-bitmap-index"])
+            actions.append("repack")
+    elif repack == 'full':
+        if repack_full(repo_ref, check_mode):
+            actions.append("repack")
+
+    if pack_refs and _loose_refs(repo_ref):
+        if not check_mode:
+            repo_ref.compress_references()
+        actions.append("pack_refs")
+
+    if commit_graph:
+        graph_path = os.path.join(repo_ref.path, "objects", "info", "commit-graph")
+        before = _file_digest(graph_path)
+        if check_mode:
+            if commit_graph_stale(repo_ref):
+                actions.append("commit_graph")
+        else:
+            run_git(module, repo_ref, ["commit-graph", "write", "--reachable"])
+            if _file_digest(graph_path) != before:
+                actions.append("commit_graph")
+
+    result['objects_after'] = count_objects(repo_ref)
+    result['actions'] = actions
+
+    if not actions:
+        result['message'] = "no maintenance required"
+    elif check_mode:
+        result['message'] = f"would run {','.join(actions)}"
+    else:
+        result['message'] = f"ran {','.join(actions)}"
+        result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_merge
+short_description: Fast-forward or merge one branch into another
+description:
+  - Fast-forwards C(target) to C(source) when possible, otherwise merges the two commits in memory and
+    creates a merge commit on C(target) directly from the resulting tree.
+  - No checkout is needed so it works on bare repositories. If C(target) is the branch checked out in the
+    worktree, the worktree is updated too, but never over local changes.
+  - Conflicting merges change nothing and fail with the list of conflicting paths.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  source:
+    description: The branch, tag or commit to merge
+    type: str
+    required: true
+  target:
+    description: The branch to merge into, defaults to the current branch
+    type: str
+    required: false
+  fast_forward:
+    description:
+      - C(allow) fast-forwards when possible and otherwise creates a merge commit.
+      - C(only) fails rather than create a merge commit.
+      - C(never) always creates a merge commit.
+    type: str
+    required: false
+    choices: [allow, only, never]
+    default: allow
+  favor:
+    description: How to resolve conflicting hunks, C(normal) reports them as conflicts
+    type: str
+    required: false
+    choices: [normal, ours, theirs, union]
+    default: normal
+  msg:
+    description: The merge commit message, defaults to C(Merge <source> into <target>)
+    type: str
+    required: false
+  author:
+    description: Author name
+    type: str
+    required: false
+    default: ansible_pygit
+  email:
+    description: Author email
+    type: str
+    required: false
+    default: ansible_pygit@ansible.com
+'''
+
+EXAMPLES = r'''
+- name: Promote the release branch to production on the mirror
+  git_merge:
+    repo: /srv/git/app.git
+    source: release/1.2
+    target: production
+    fast_forward: only
+'''
+
+RETURN = r'''
+merge_type:
+  description: One of C(up_to_date), C(fast_forward), C(clean) or C(conflicting)
+  type: str
+commit:
+  description: The commit C(target) points to after the merge (or would in check mode for a fast-forward)
+  type: str
+conflicts:
+  description: The paths that conflict, when C(merge_type) is C(conflicting)
+  type: list
+changed:
+  description: Whether C(target) was moved
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    cannonicalise_name,
+    index_conflicts,
+    move_branch,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "source": {"type": 'str', "required": True},
+    "target": {"type": 'str', "required": False},
+    "fast_forward": {"type": 'str', "required": False, "choices": ['allow', 'only', 'never'], "default": 'allow'},
+    "favor": {"type": 'str', "required": False, "choices": ['normal', 'ours', 'theirs', 'union'], "default": 'normal'},
+    "msg": {"type": 'str', "required": False},
+    "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
+    "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+}
+
+FAVOR = {
+    "normal": pygit2.enums.MergeFavor.NORMAL,
+    "ours": pygit2.enums.MergeFavor.OURS,
+    "theirs": pygit2.enums.MergeFavor.THEIRS,
+    "union": pygit2.enums.MergeFavor.UNION,
+}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "merge_type": '',
+        "commit": '',
+        "conflicts": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    source = module.params.get('source')
+    target = module.params.get('target')
+    fast_forward = module.params.get('fast_forward')
+    favor = module.params.get('favor')
+    author = module.params.get('author')
+    email = module.params.get('email')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if target is None and (repo_ref.head_is_unborn or repo_ref.head_is_detached):
+        module.fail_json(msg=f"{repo} has no current branch, set target")
+    target_name = cannonicalise_name(repo_ref, target)
+    if not target_name.startswith("refs/heads/") or target_name not in repo_ref.references:
+        module.fail_json(msg=f"{target or target_name} is not a branch in {repo}")
+
+    source_commit = resolve_commit(repo_ref, source)
+    if source_commit is None:
+        module.fail_json(msg=f"{source} not found in {repo}")
+    source_commit = source_commit.peel(pygit2.Commit)
+
+    target_id = repo_ref.references[target_name].target
+    target_branch = target_name[len("refs/heads/"):]
+    msg = module.params.get('msg') or f"Merge {source} into {target_branch}"
+
+    merge_base = repo_ref.merge_base(target_id, source_commit.id)
+    if merge_base == source_commit.id:
+        result['merge_type'] = "up_to_date"
+        result['commit'] = str(target_id)
+        result['message'] = f"{target_branch} already contains {source}"
+        module.exit_json(**result)
+
+    if merge_base == target_id and fast_forward != 'never':
+        result['merge_type'] = "fast_forward"
+        new_id = source_commit.id
+    else:
+        if fast_forward == 'only':
+            module.fail_json(msg=f"{target_branch} can't be fast-forwarded to {source}")
+        index = repo_ref.merge_commits(target_id, source_commit.id, favor=FAVOR[favor])
+        result['conflicts'] = index_conflicts(index)
+        if result['conflicts']:
+            result['merge_type'] = "conflicting"
+            result['message'] = f"merging {source} into {target_branch} conflicts in {','.join(result['conflicts'])}"
+            if module.check_mode:
+                module.exit_json(**result)
+            module.fail_json(msg=result['message'], **result)
+        result['merge_type'] = "clean"
+        new_id = None
+
+    if module.check_mode:
+        result['commit'] = str(new_id) if new_id else ''
+        result['message'] = f"would merge {source} into {target_branch} ({result['merge_type']})"
+        module.exit_json(**result)
+
+    try:
+        if new_id is None:
+            sig = pygit2.Signature(author, email)
+            tree = index.write_tree(repo_ref)
+            new_id = repo_ref.create_commit(None, sig, sig, msg, tree, [target_id, source_commit.id])
+        move_branch(repo_ref, target_name, target_id, new_id, f"merge {source}: {result['merge_type']}")
+    except (pygit2.GitError, OSError) as e:
+        module.fail_json(msg=f"failed to merge {source} into {target_branch}", exception=str(e))
+
+    result['commit'] = str(new_id)
+    result['message'] = f"merged {source} into {target_branch} ({result['merge_type']})"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -49,6 +49,16 @@ options:
     description: the passphrase to access the keypair (if required)
     type: string
     required: false
+  detach:
+    description: start the push in the background and return straight away, poll it with git_job_status
+    type: boolean
+    default: false
+    required: false
+  status_file:
+    description: where to write the progress of the push (objects, bytes, rate and ETA) as json,
+                 defaults to a file under ~/.cache/ansible_pygit/jobs when detach is set
+    type: path
+    required: false
 '''
 
 EXAMPLES = r'''
@@ -69,10 +79,24 @@ EXAMPLES = r'''
     username: git
     pubkey: /home/example/.ssh/id_rsa.pub
     privkey: /home/example/.ssh/id_rsa
+
+- git_push:
+    repo: /home/example/test_repo
+    branch: master
+    detach: true
+  register: push
 '''
 
 RETURN = r'''
-None
+pushed:
+  description: the refs pushed, refs the remote already has are left out
+  type: list
+status_file:
+  description: the file the progress of the push is written to (detach or status_file only)
+  type: str
+pid:
+  description: the process running the push in the background (detach only)
+  type: int
 '''
 
 from ansible.module_utils.basic import AnsibleModule
@@ -89,6 +113,7 @@ module_args = dict(
     pubkey = {"type": 'str', "required": False},
     privkey = {"type": 'str', "required": False},
     passphrase = {"type": 'str', "required": False, "no_log": True},
+    **JOB_ARGS,
 )
 
 
@@ -98,6 +123,7 @@ def run_module():
     result = dict(
         changed = False,
         message = '',
+        pushed = [],
     )
 
     module = AnsibleModule(
@@ -105,12 +131,6 @@ def run_module():
         supports_check_mode = True
     )
 
-    # if the user is working with this module in only check mode we do not
-    # want to make any changes to the environment, just return the current
-    # state with no modifications
-    if module.check_mode:
-        module.exit_json(**result)
-
     repo = module.params.get('repo')
     remote = module.params.get('remote')
     branch = module.params.get('branch', [])
@@ -136,7 +156,8 @@ def run_module():
     credentials = get_credentials(username, pubkey, privkey, passphrase)
     #credentials = pygit2.Keypair(username, pubkey, privkey, passphrase)
 
-    callbacks=pygit2.RemoteCallbacks(credentials=credentials)
+    status = job_status(module.params, "push", f"{repo_ref.path}:{remote}")
+    callbacks = ProgressCallbacks(credentials, status)
 
     refs = []
     if branch != None:
@@ -151,12 +172,60 @@ def run_module():
     if refs == []:
         module.fail_json(msg = f"either branch or tags must be defined")
 
+    missing = [r for r in refs if r not in repo_ref.references]
+    if missing:
+        module.fail_json(msg = f"refs {missing} not found in {repo}")
+
+    # compare ids with the remote first so a no-op push transfers nothing
+    try:
+        remote_refs, _, _ = ls_remote(remote, credentials, repo=repo_ref)
+    except pygit2.GitError:
+        # let the push report why the remote can't be reached
+        remote_refs = {}
+    refs = [r for r in refs if remote_refs.get(r) != str(repo_ref.references[r].target)]
+    result['pushed'] = refs
+
+    if refs == []:
+        result['message'] = f"{remote} is already up to date"
+        module.exit_json(**result)
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just report what would
+    # be pushed
+    if module.check_mode:
+        result['changed'] = True
+        result['message'] = f"would push {refs} to {remote}"
+        module.exit_json(**result)
+
+    def push():
+        remote_ref.push(refs, callbacks=callbacks)
+        # the remote turning a ref down (not a fast-forward, a hook) is not an error to libgit2
+        if callbacks.rejected:
+            raise pygit2.GitError(f"{remote} rejected {callbacks.rejected}")
+        return {"pushed": refs}
+
+    if module.params.get('detach'):
+        result['status_file'] = status.path
+        result['pid'], result['changed'] = detach_job(status, push)
+        if result['changed']:
+            result['message'] = f"started pushing {refs} to {remote}"
+        else:
+            result['message'] = f"already pushing to {remote}"
+        module.exit_json(**result)
+
+    if status is not None:
+        result['status_file'] = status.path
+        status.start()
+
     try:
-        _ = remote_ref.push(refs, callbacks=callbacks)
+        run_job(status, push)
+    except JobCancelled as e:
+        module.fail_json(msg = f"push of {refs} to {remote} cancelled",  exception = str(e), **result)
     except pygit2.GitError as e:
         module.fail_json(msg = f"failed to push refs {refs} to {remote}",  exception = str(e))
 
-    result['message'] = f"pushed to {branch} at {remote}"
+    result['changed'] = True
+    result['message'] = f"pushed {refs} to {remote}"
 
     module.exit_json(**result)
 
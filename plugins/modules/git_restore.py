@@ -29,6 +29,43 @@ options:
     type: string
     default: staged 
     required: false
+  result_detail:
+    description: C(full) returns every restored path (lists over result_inline_limit go to result_file),
+                 C(summary) a sample of result_sample paths and C(none) just the counts in summary
+    type: string
+    choices: [full, summary, none]
+    default: full
+    required: false
+  result_sample:
+    description: how many paths of each list to return when they are cut short
+    type: int
+    default: 20
+    required: false
+  result_inline_limit:
+    description: the longest list returned inline with result_detail full, by default there is no limit
+    type: int
+    required: false
+  result_file:
+    description: where to write lists too long to return inline, as JSON
+                 (default ansible_pygit_result.json in the git directory), nothing is written in check mode
+    type: path
+    required: false
+  large_files:
+    description: hydrate files with the filter=lfs attribute, replacing their pointers with
+                 the content from the large-file store (see git_add)
+    type: boolean
+    default: false
+    required: false
+  large_file_store:
+    description: the content-addressed store shared by every repository on the host
+    type: path
+    default: ~/.cache/ansible_pygit/lfs
+    required: false
+  large_file_remote:
+    description: a directory standing in for a remote store, content missing from
+                 large_file_store is fetched from here
+    type: path
+    required: false
 '''
 
 EXAMPLES = r'''
@@ -48,6 +85,18 @@ restored_files:
 unstaged_files:
     description: files successfully restored in the staging area
     type: list
+summary:
+    description: the total number of restored_files and unstaged_files and whether each list was truncated
+    type: dict
+result_file:
+    description: the file the full lists were written to, when they were too long to return inline
+    type: str
+hydrated_large_files:
+    description: pointer files replaced with their content from the large-file store (large_files only)
+    type: list
+missing_large_files:
+    description: files left as pointers because their content is in neither store (large_files only)
+    type: list
 '''
 
 import os
@@ -61,8 +110,12 @@ module_args = {
     "files": {"type": "list", "required": True},
     "branch": {"type": "str", "required": True},
     "option": {"type": "str", "required": False, "default": "staged"},
+    **RESULT_DETAIL_ARGS,
+    **LARGE_FILE_STORE_ARGS,
 }
 
+RESULT_LISTS = ['restored_files', 'unstaged_files']
+
 def run_module():
 
     # seed the result dict in the object
@@ -95,6 +148,8 @@ def run_module():
         module.fail_json(msg = f"failed to get repo at {repo}",
                          exception = str(e))
 
+    register_large_files(module.params, module.check_mode)
+
     restored_files = []
     unstaged_files = []
     index = repo_ref.index
@@ -102,11 +157,11 @@ def run_module():
     branch_oid = repo_ref.revparse_single(branch) # Get object from db
 
     staged_files = staged_changes(repo_ref, branch) 
-    unstaged_files = unstaged_changes(repo_ref)
+    wt_changed_files = unstaged_changes(repo_ref)
 
     for f in files:
         if option not in [ "staged", "cached"] \
-            and (f in staged_files or f in unstaged_files):
+            and (f in staged_files or f in wt_changed_files):
 
             try:
                 os.remove(f"{repo}/{f}")
@@ -129,15 +184,23 @@ def run_module():
     index.write()
 
 
+    if module.params.get('large_files') and option not in [ "staged", "cached"]:
+        # pointers checked out before their content reached the stores look unchanged
+        result['hydrated_large_files'], result['missing_large_files'] = \
+            hydrate_large_files(repo_ref, module.params, files)
+        for f in result['hydrated_large_files']:
+            if f not in restored_files:
+                restored_files.append(f)
+
     if not unstaged_files and not restored_files:
         result['message'] = "no files restored"
     else:
         result['restored_files'] = restored_files
         result['unstaged_files'] = unstaged_files
-        result['message'] = f"restored {','.join(restored_files+unstaged_files)}"
+        result['message'] = f"restored {describe_paths(restored_files+unstaged_files, module.params)}"
         result['changed'] = True
 
-    module.exit_json(**result)
+    module.exit_json(**bound_result(repo_ref, module.params, result, RESULT_LISTS, module.check_mode))
 
 
 def main():
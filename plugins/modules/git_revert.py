@@ -0,0 +1,191 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_revert
+short_description: Revert commits on a branch without a checkout
+description:
+  - Computes the inverse of each commit in memory and commits it directly to C(branch), so it works on bare repositories.
+  - Commits whose changes are already gone from C(branch) are skipped, which makes the task idempotent.
+  - If any revert conflicts nothing is changed and the conflicting paths are returned, in check mode without failing.
+  - No objects are written to the repository in check mode.
+  - If C(branch) is checked out in the worktree, the worktree is updated too, but never over local changes.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  commits:
+    description: The commits to revert, in the order to revert them (usually newest first)
+    type: list
+    elements: str
+    required: true
+  branch:
+    description: The branch to commit the reverts to, defaults to the current branch
+    type: str
+    required: false
+  mainline:
+    description: For merge commits, the parent number (starting from 1) to revert back to
+    type: int
+    required: false
+    default: 0
+  msg:
+    description: The commit message, defaults to git's C(Revert "<subject>") message
+    type: str
+    required: false
+  author:
+    description: Author name
+    type: str
+    required: false
+    default: ansible_pygit
+  email:
+    description: Author email
+    type: str
+    required: false
+    default: ansible_pygit@ansible.com
+'''
+
+EXAMPLES = r'''
+- name: Roll back a bad config commit on every mirror
+  git_revert:
+    repo: /srv/git/config.git
+    branch: production
+    commits:
+      - 3f2a9c1
+'''
+
+RETURN = r'''
+commits:
+  description: The revert commits created (or that would be in check mode), as C(reverted id) to C(new id)
+  type: dict
+already_reverted:
+  description: Commits that were already reverted
+  type: list
+conflicts:
+  description: The paths that conflict
+  type: list
+commit:
+  description: The commit C(branch) points to afterwards
+  type: str
+changed:
+  description: Whether C(branch) was moved
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    StagedObjects,
+    cannonicalise_name,
+    move_branch,
+    normalize_path,
+    open_repository,
+    pick_commits,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "commits": {"type": 'list', "elements": 'str', "required": True},
+    "branch": {"type": 'str', "required": False},
+    "mainline": {"type": 'int', "required": False, "default": 0},
+    "msg": {"type": 'str', "required": False},
+    "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
+    "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+}
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "commit": '',
+        "commits": {},
+        "already_reverted": [],
+        "conflicts": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    commits = module.params.get('commits')
+    branch = module.params.get('branch')
+    mainline = module.params.get('mainline')
+    msg = module.params.get('msg')
+    sig = pygit2.Signature(module.params.get('author'), module.params.get('email'))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if branch is None and (repo_ref.head_is_unborn or repo_ref.head_is_detached):
+        module.fail_json(msg=f"{repo} has no current branch, set branch")
+    branch_name = cannonicalise_name(repo_ref, branch)
+    if not branch_name.startswith("refs/heads/") or branch_name not in repo_ref.references:
+        module.fail_json(msg=f"{branch or branch_name} is not a branch in {repo}")
+
+    to_revert = []
+    for ref in commits:
+        commit = resolve_commit(repo_ref, ref)
+        if commit is None:
+            module.fail_json(msg=f"{ref} not found in {repo}")
+        to_revert.append(commit.peel(pygit2.Commit))
+
+    start_id = repo_ref.references[branch_name].target
+    # each commit is applied on top of the last in a throwaway object store,
+    # which is only packed into the repository once every one applies cleanly
+    with StagedObjects(repo_ref) as staged:
+        try:
+            created, skipped, tip_id, conflict = pick_commits(
+                staged, [commit.id for commit in to_revert], start_id, sig, revert=True, mainline=mainline, message=msg)
+        except (ValueError, pygit2.GitError) as e:
+            module.fail_json(msg=f"failed to revert {','.join(commits)}", exception=str(e))
+        result['commits'] = created
+        result['already_reverted'] = skipped
+        result['commit'] = str(tip_id)
+
+        if conflict is not None:
+            result['conflicts'] = conflict[1]
+            result['message'] = f"reverting {conflict[0]} conflicts in {','.join(result['conflicts'])}"
+            if module.check_mode:
+                module.exit_json(**result)
+            module.fail_json(msg=result['message'], **result)
+
+        if not result['commits']:
+            result['message'] = f"{','.join(commits)} already reverted on {branch_name}"
+            module.exit_json(**result)
+
+        if module.check_mode:
+            result['message'] = f"would revert {','.join(result['commits'])} on {branch_name}"
+            module.exit_json(**result)
+
+        try:
+            staged.commit()
+            move_branch(repo_ref, branch_name, start_id, tip_id, f"revert: {','.join(result['commits'])}")
+        except (pygit2.GitError, OSError) as e:
+            module.fail_json(msg=f"failed to update {branch_name}", exception=str(e))
+
+    result['message'] = f"reverted {','.join(result['commits'])} on {branch_name}"
+    result['changed'] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
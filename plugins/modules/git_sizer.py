@@ -0,0 +1,345 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_sizer
+short_description: Find what makes a Git repository big
+description:
+  - Measures a repository like C(git-sizer), to find the large files, huge directories and deep histories that make
+    it slow to clone and work with.
+  - Reports the largest blobs with the path and the commit that first added them, the object counts and sizes, the
+    widest trees, the longest paths, the depth of history and how many refs there are.
+  - History is walked oldest first and every tree and blob is visited once. Blob sizes come from the object headers,
+    so file contents are never read and memory grows with the number of objects, not their size.
+  - With C(unreachable) the rest of the object database (packs and loose objects) is scanned too, to find large
+    blobs that no ref keeps alive any more.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  refs:
+    description: Only measure the history of refs whose full name (C(refs/heads/main)) or short name (C(main)) matches
+      one of these globs
+    type: list
+    elements: str
+    required: false
+  top:
+    description: How many of the largest blobs to report
+    type: int
+    required: false
+    default: 10
+  unreachable:
+    description: Also scan the objects the selected refs don't reach
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Find the largest files ever committed
+  git_sizer:
+    repo: /srv/git/app.git
+    top: 20
+  register: size
+
+- debug:
+    msg: "{{ item.path }} ({{ item.size | human_readable }}) added in {{ item.commit }}"
+  loop: "{{ size.largest_blobs }}"
+
+- name: Only look at the release branches
+  git_sizer:
+    repo: /srv/git/app.git
+    refs:
+      - release/*
+'''
+
+RETURN = r'''
+refs:
+  description: How many C(branches), C(tags), C(remotes) (remote-tracking branches) and C(other) refs there are, and
+    how many were C(selected)
+  type: dict
+objects:
+  description:
+    - The C(count) and uncompressed C(size) in bytes of the C(commits), C(trees), C(blobs) and C(tags) the selected
+      refs reach.
+    - C(trees) also has C(entries), the total number of tree entries.
+  type: dict
+largest_blobs:
+  description: The C(top) largest blobs, each C({id, size, path, commit}), with the path and commit that first added it
+  type: list
+history:
+  description: C(max_depth), the longest chain of commits, C(max_parents), the most parents of one commit, and
+    C(roots), the commits with no parents
+  type: dict
+trees:
+  description:
+    - C(max_entries), the widest tree as C({entries, path, commit}).
+    - C(max_path_depth) and C(max_path_length), the deepest and longest paths as C({depth, path}) and C({length, path}).
+    - C(submodules), how many submodule entries there are.
+  type: dict
+storage:
+  description: Loose and packed object counts and their sizes on disk in bytes
+  type: dict
+unreachable_objects:
+  description: The C(count) and C(size) of the objects the selected refs don't reach, and their C(largest_blobs)
+    (C(unreachable) only)
+  type: dict
+changed:
+  description: Always false
+  type: bool
+message:
+  description: A human-readable summary
+  type: str
+'''
+
+import fnmatch
+import heapq
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    count_objects,
+    normalize_path,
+    open_repository,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "refs": {"type": 'list', "elements": 'str', "required": False},
+    "top": {"type": 'int', "required": False, "default": 10},
+    "unreachable": {"type": 'bool', "required": False, "default": False},
+}
+
+REF_KINDS = [("refs/heads/", "branches"), ("refs/tags/", "tags"), ("refs/remotes/", "remotes")]
+
+
+def selected(name, patterns):
+    if not patterns:
+        return True
+    short = name
+    for prefix, _kind in REF_KINDS:
+        if name.startswith(prefix):
+            short = name[len(prefix):]
+    return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(short, pattern) for pattern in patterns)
+
+
+class Sizer:
+    """
+    walks history once, oldest commit first, so the first time a blob or
+    tree is seen is where it was added. only ids are kept for objects
+    already seen, and blob sizes are read from the object headers
+    """
+
+    def __init__(self, repo, top):
+        self.repo = repo
+        self.odb = repo.odb
+        self.top = top
+        self.largest = []
+        self.seen = set()
+        self.depth = {}
+        self.objects = {
+            "commits": {"count": 0, "size": 0},
+            "trees": {"count": 0, "size": 0, "entries": 0},
+            "blobs": {"count": 0, "size": 0},
+            "tags": {"count": 0, "size": 0},
+        }
+        self.history = {"max_depth": 0, "max_parents": 0, "roots": 0}
+        self.trees = {
+            "max_entries": {"entries": 0, "path": None, "commit": None},
+            "max_path_depth": {"depth": 0, "path": None},
+            "max_path_length": {"length": 0, "path": None},
+            "submodules": 0,
+        }
+
+    def _count(self, kind, oid):
+        size = self.odb.read_header(oid)[1]
+        self.objects[kind]["count"] += 1
+        self.objects[kind]["size"] += size
+        return size
+
+    def blob(self, oid, path, commit):
+        if oid.raw in self.seen:
+            return
+        self.seen.add(oid.raw)
+        size = self._count("blobs", oid)
+        entry = (size, str(oid), path, commit)
+        if len(self.largest) < self.top:
+            heapq.heappush(self.largest, entry)
+        elif self.top and entry > self.largest[0]:
+            heapq.heapreplace(self.largest, entry)
+
+        depth = path.count("/") + 1
+        if depth > self.trees["max_path_depth"]["depth"]:
+            self.trees["max_path_depth"] = {"depth": depth, "path": path}
+        if len(path) > self.trees["max_path_length"]["length"]:
+            self.trees["max_path_length"] = {"length": len(path), "path": path}
+
+    def tree(self, tree_id, commit, prefix=""):
+        pending = [(tree_id, prefix)]
+        while pending:
+            tree_id, prefix = pending.pop()
+            if tree_id.raw in self.seen:
+                continue
+            self.seen.add(tree_id.raw)
+            self._count("trees", tree_id)
+            tree = self.repo[tree_id]
+            entries = len(tree)
+            self.objects["trees"]["entries"] += entries
+            if entries > self.trees["max_entries"]["entries"]:
+                self.trees["max_entries"] = {"entries": entries, "path": prefix.rstrip("/") or "/",
+                                             "commit": commit}
+            for entry in tree:
+                if entry.filemode == pygit2.enums.FileMode.TREE:
+                    pending.append((entry.id, f"{prefix}{entry.name}/"))
+                elif entry.filemode == pygit2.enums.FileMode.COMMIT:
+                    self.trees["submodules"] += 1
+                else:
+                    self.blob(entry.id, f"{prefix}{entry.name}", commit)
+
+    def commits(self, tips):
+        walker = self.repo.walk(None, pygit2.enums.SortMode.TOPOLOGICAL | pygit2.enums.SortMode.REVERSE)
+        for oid in tips:
+            walker.push(oid)
+        for commit in walker:
+            self.seen.add(commit.id.raw)
+            self._count("commits", commit.id)
+            parents = commit.parent_ids
+            # parents always come first, except past a shallow boundary
+            depth = 1 + max((self.depth.get(p.raw, 0) for p in parents), default=0)
+            self.depth[commit.id.raw] = depth
+            self.history["max_depth"] = max(self.history["max_depth"], depth)
+            self.history["max_parents"] = max(self.history["max_parents"], len(parents))
+            if not parents:
+                self.history["roots"] += 1
+            self.tree(commit.tree_id, str(commit.id))
+
+    def measure(self, targets):
+        """
+        measure everything reachable from targets, peeling annotated tags
+        """
+        commits = []
+        for oid in targets:
+            obj = self.repo.get(oid)
+            while obj is not None and obj.type == pygit2.enums.ObjectType.TAG:
+                if obj.id.raw not in self.seen:
+                    self.seen.add(obj.id.raw)
+                    self._count("tags", obj.id)
+                obj = self.repo.get(obj.target)
+            if obj is None:
+                continue
+            if obj.type == pygit2.enums.ObjectType.COMMIT:
+                commits.append(obj.id)
+            elif obj.type == pygit2.enums.ObjectType.TREE:
+                self.tree(obj.id, None)
+            elif obj.type == pygit2.enums.ObjectType.BLOB and obj.id.raw not in self.seen:
+                self.seen.add(obj.id.raw)
+                self._count("blobs", obj.id)
+        if commits:
+            self.commits(commits)
+
+    def unreachable(self):
+        """
+        stream every object header in the packs and loose objects, keeping
+        the ones measure() didn't reach
+        """
+        found = {"count": 0, "size": 0, "largest_blobs": []}
+        largest = []
+        for oid in self.odb:
+            if oid.raw in self.seen:
+                continue
+            # an object can be both packed and loose, count it once
+            self.seen.add(oid.raw)
+            object_type, size = self.odb.read_header(oid)
+            found["count"] += 1
+            found["size"] += size
+            if object_type == pygit2.enums.ObjectType.BLOB and self.top:
+                entry = (size, str(oid))
+                if len(largest) < self.top:
+                    heapq.heappush(largest, entry)
+                elif entry > largest[0]:
+                    heapq.heapreplace(largest, entry)
+        found["largest_blobs"] = [{"id": oid, "size": size} for size, oid in sorted(largest, reverse=True)]
+        return found
+
+    def largest_blobs(self):
+        return [{"id": oid, "size": size, "path": path, "commit": commit}
+                for size, oid, path, commit in sorted(self.largest, reverse=True)]
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "refs": {},
+        "objects": {},
+        "largest_blobs": [],
+        "history": {},
+        "trees": {},
+        "storage": {},
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    patterns = module.params.get('refs')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    refs = {"total": 0, "branches": 0, "tags": 0, "remotes": 0, "other": 0, "selected": 0}
+    targets = []
+    for name in repo_ref.references:
+        target = repo_ref.references[name].target
+        if not isinstance(target, pygit2.Oid):
+            # symbolic refs like refs/remotes/origin/HEAD
+            continue
+        refs["total"] += 1
+        refs[next((kind for prefix, kind in REF_KINDS if name.startswith(prefix)), "other")] += 1
+        if selected(name, patterns):
+            refs["selected"] += 1
+            targets.append(target)
+    if not patterns and not repo_ref.head_is_unborn and repo_ref.head_is_detached:
+        targets.append(repo_ref.head.target)
+
+    sizer = Sizer(repo_ref, max(module.params.get('top'), 0))
+    try:
+        sizer.measure(targets)
+        if module.params.get('unreachable'):
+            result['unreachable_objects'] = sizer.unreachable()
+    except (KeyError, pygit2.GitError) as e:
+        module.fail_json(msg=f"failed to read the objects of {repo}", exception=str(e))
+
+    result['refs'] = refs
+    result['objects'] = sizer.objects
+    result['largest_blobs'] = sizer.largest_blobs()
+    result['history'] = sizer.history
+    result['trees'] = sizer.trees
+    result['storage'] = count_objects(repo_ref)
+
+    blobs = sizer.objects["blobs"]
+    result['message'] = f"{blobs['count']} blobs ({blobs['size']} bytes) in {sizer.objects['commits']['count']} " \
+                        f"commits from {refs['selected']} refs"
+    if result['largest_blobs']:
+        largest = result['largest_blobs'][0]
+        result['message'] += f", the largest is {largest['path']} ({largest['size']} bytes)"
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
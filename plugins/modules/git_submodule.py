@@ -0,0 +1,295 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_submodule
+short_description: Initialise and update the submodules of a repository in parallel
+description:
+  - Initialises the submodules of a worktree and clones or fetches them concurrently, checking each one out at
+    the commit recorded in the superproject (the gitlink).
+  - Submodules already checked out at their gitlink commit are skipped without touching the network.
+  - Reports how long each submodule took.
+options:
+  repo:
+    description: Path to the superproject worktree
+    type: path
+    required: true
+  paths:
+    description: Only update the submodules at these paths (default all)
+    type: list
+    elements: str
+    required: false
+  init:
+    description: Initialise submodules that have not been initialised yet, otherwise they are left alone
+    type: bool
+    required: false
+    default: true
+  depth:
+    description:
+      - Shallow fetch each submodule to this many commits, 0 fetches the full history.
+      - Like C(git clone --depth) this is ignored for submodules with local urls, which libgit2 can't fetch shallowly.
+        Relative urls are resolved against the superproject's remote first, like git does.
+    type: int
+    required: false
+    default: 0
+  workers:
+    description: Number of submodules to update concurrently
+    type: int
+    required: false
+    default: 4
+  username:
+    description: the username for the remote repos (if required)
+    type: str
+    required: false
+  pubkey:
+    description: the path to a public key file for fetching via ssh
+    type: path
+    required: false
+  privkey:
+    description: the path to the private key for fetching via ssh
+    type: path
+    required: false
+  passphrase:
+    description: the passphrase to access the keypair (if required)
+    type: str
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Clone a product repo
+  git_clone:
+    upstream: https://git.example.com/product.git
+    repo: /srv/product
+
+- name: Check out its submodules, 8 at a time with no history
+  git_submodule:
+    repo: /srv/product
+    depth: 1
+    workers: 8
+'''
+
+RETURN = r'''
+submodules:
+  description: One entry per submodule
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: The submodule name
+      type: str
+    path:
+      description: The path of the submodule in the superproject
+      type: str
+    url:
+      description: The submodule url
+      type: str
+    commit:
+      description: The gitlink commit the submodule should be checked out at
+      type: str
+    status:
+      description: C(updated), C(up_to_date), C(uninitialised) (with C(init=false)) or C(failed)
+      type: str
+    seconds:
+      description: How long the submodule took to update
+      type: float
+    error:
+      description: Why the update failed
+      type: str
+updated:
+  description: The paths of the submodules updated (or that would be in check mode)
+  type: list
+changed:
+  description: Whether any submodule was updated
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    LockWaiter,
+    get_credentials,
+    normalize_path,
+    open_repository,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "paths": {"type": 'list', "elements": 'str', "required": False},
+    "init": {"type": 'bool', "required": False, "default": True},
+    "depth": {"type": 'int', "required": False, "default": 0},
+    "workers": {"type": 'int', "required": False, "default": 4},
+    "username": {"type": 'str', "required": False},
+    "pubkey": {"type": 'path', "required": False},
+    "privkey": {"type": 'path', "required": False},
+    "passphrase": {"type": 'str', "required": False, "no_log": True},
+}
+
+
+def gitlink(repo_ref, submodule):
+    """
+    the commit the superproject records for a submodule, staged changes first
+    """
+    try:
+        return repo_ref.index[submodule.path].id
+    except KeyError:
+        return submodule.head_id
+
+
+def checked_out_commit(repo_ref, submodule):
+    try:
+        sub_repo = pygit2.Repository(os.path.join(repo_ref.workdir, submodule.path))
+    except pygit2.GitError:
+        return None
+    if sub_repo.head_is_unborn:
+        return None
+    return sub_repo.head.target
+
+
+def fetch_url(repo_ref, submodule_name):
+    """
+    the url an initialised submodule is fetched from, initialising resolves
+    relative urls against the superproject's remote
+    """
+    try:
+        return repo_ref.config[f"submodule.{submodule_name}.url"]
+    except KeyError:
+        return None
+
+
+def is_local_url(url):
+    return url.startswith(("/", "file://")) or os.path.isdir(url)
+
+
+def update_submodule(repo_path, path, depth, credentials):
+    """
+    clone or fetch one submodule, each worker opens the superproject itself as
+    libgit2 repositories can't be shared between threads
+    """
+    start = time.monotonic()
+    repo_ref = pygit2.Repository(repo_path)
+    callbacks = pygit2.RemoteCallbacks(credentials=credentials)
+    # updates write the superproject config, so wait out each other's locks
+    LockWaiter(repo_ref).run(repo_ref.submodules.update, [path], callbacks=callbacks, depth=depth)
+    return time.monotonic() - start
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "submodules": [],
+        "updated": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    paths = module.params.get('paths')
+    init = module.params.get('init')
+    depth = module.params.get('depth')
+    workers = module.params.get('workers')
+    credentials = get_credentials(module.params.get('username'), module.params.get('pubkey'),
+                                  module.params.get('privkey'), module.params.get('passphrase'))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    if repo_ref.is_bare:
+        module.fail_json(msg=f"{repo} is a bare repository, submodules need a worktree")
+
+    submodules = list(repo_ref.submodules)
+    if paths:
+        wanted = set(path.strip("/") for path in paths)
+        missing = wanted - set(sub.path for sub in submodules)
+        if missing:
+            module.fail_json(msg=f"{','.join(sorted(missing))} are not submodules of {repo}")
+        submodules = [sub for sub in submodules if sub.path in wanted]
+
+    to_update = []
+    for submodule in submodules:
+        commit = gitlink(repo_ref, submodule)
+        info = {
+            "name": submodule.name,
+            "path": submodule.path,
+            "url": submodule.url,
+            "commit": str(commit) if commit else None,
+            "status": "up_to_date",
+            "seconds": 0.0,
+        }
+        result['submodules'].append(info)
+
+        initialised = f"submodule.{submodule.name}.url" in repo_ref.config
+        if not initialised and not init:
+            info['status'] = "uninitialised"
+        elif not initialised and submodule.url is None:
+            info['status'] = "failed"
+            info['error'] = f"no url configured for submodule {submodule.name}"
+        elif not initialised or checked_out_commit(repo_ref, submodule) != commit:
+            info['status'] = "updated"
+            to_update.append(info)
+
+    unconfigured = [info['path'] for info in result['submodules'] if info['status'] == "failed"]
+    result['updated'] = [info['path'] for info in to_update]
+    if not to_update and not unconfigured:
+        result['message'] = "submodules are up to date"
+        module.exit_json(**result)
+
+    if module.check_mode:
+        if unconfigured:
+            module.fail_json(msg=f"failed to update {','.join(unconfigured)}", **result)
+        result['message'] = f"would update {','.join(result['updated'])}"
+        module.exit_json(**result)
+
+    # initialising writes the superproject config, so do it up front in one go
+    if to_update:
+        try:
+            repo_ref.submodules.init([info['path'] for info in to_update])
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to initialise submodules in {repo}", exception=str(e))
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = [(info, executor.submit(update_submodule, repo_ref.workdir, info['path'],
+                                          0 if is_local_url(fetch_url(repo_ref, info['name']) or info['url'])
+                                          else depth, credentials))
+                   for info in to_update]
+        for info, future in futures:
+            try:
+                info['seconds'] = round(future.result(), 3)
+            except (pygit2.GitError, OSError) as e:
+                info['status'] = "failed"
+                info['error'] = str(e)
+
+    failed = [info['path'] for info in result['submodules'] if info['status'] == "failed"]
+    result['updated'] = [info['path'] for info in to_update if info['status'] == "updated"]
+    result['changed'] = bool(result['updated'])
+    if failed:
+        module.fail_json(msg=f"failed to update {','.join(failed)}", **result)
+
+    result['message'] = f"updated {','.join(result['updated'])}"
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
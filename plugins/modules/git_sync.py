@@ -0,0 +1,343 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_sync
+short_description: Fetch, integrate and push a branch in one task
+description:
+  - Fetches C(upstream_branch) from C(remote), brings C(branch) up to date with it by fast-forwarding, rebasing or
+    merging in memory, and pushes the result back, all with one set of credentials and remote callbacks.
+  - No checkout is needed so it works on bare repositories. If C(branch) is checked out in the worktree, the
+    worktree is updated too, but never over local changes.
+  - Conflicting rebases and merges change nothing and fail with the list of conflicting paths.
+  - In check mode the remote's refs are listed but nothing is fetched. When the remote's commit is already in the
+    repository the sync is worked out as it would run, otherwise only that a sync is needed is reported.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare)
+    type: path
+    required: true
+  remote:
+    description: The remote to sync with
+    type: str
+    required: false
+    default: origin
+  branch:
+    description: The local branch to sync, defaults to the current branch
+    type: str
+    required: false
+  upstream_branch:
+    description: The branch on the remote, defaults to the same name as C(branch)
+    type: str
+    required: false
+  strategy:
+    description:
+      - How to integrate upstream changes when both sides have new commits.
+      - C(fast_forward) fails, C(rebase) replays the local commits on top of upstream, C(merge) creates a merge commit.
+    type: str
+    required: false
+    choices: [fast_forward, rebase, merge]
+    default: fast_forward
+  push:
+    description: Push the branch back to the remote when it has commits upstream doesn't
+    type: bool
+    required: false
+    default: true
+  author:
+    description: The committer name for rebased and merge commits (rebased commits keep their author)
+    type: str
+    required: false
+    default: ansible_pygit
+  email:
+    description: The committer email for rebased and merge commits
+    type: str
+    required: false
+    default: ansible_pygit@ansible.com
+  username:
+    description: the username for the remote repo (if required)
+    type: str
+    required: false
+  pubkey:
+    description: the path to a public key file for ssh
+    type: path
+    required: false
+  privkey:
+    description: the path to the private key for ssh
+    type: path
+    required: false
+  passphrase:
+    description: the passphrase to access the keypair (if required)
+    type: str
+    required: false
+  ssh_agent:
+    description: Authenticate over ssh with the keys held by the ssh-agent at C($SSH_AUTH_SOCK) instead of key files
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Keep the config branch in sync, keeping local commits on top
+  git_sync:
+    repo: /etc/app-config
+    branch: main
+    strategy: rebase
+    username: git
+    ssh_agent: true
+'''
+
+RETURN = r'''
+sync_type:
+  description: One of C(up_to_date), C(fast_forward), C(rebase), C(merge) or C(push) (local commits only)
+  type: str
+ahead:
+  description: How many commits the branch had that upstream didn't, before syncing
+  type: int
+behind:
+  description: How many commits upstream had that the branch didn't, before syncing
+  type: int
+rebased:
+  description: The local commits replayed by C(rebase), as old id to new id
+  type: dict
+conflicts:
+  description: The paths that conflict
+  type: list
+commit:
+  description: The commit the branch points to afterwards
+  type: str
+pushed:
+  description: Whether the branch was pushed (or would be in check mode)
+  type: bool
+changed:
+  description: Whether the branch was moved or pushed
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    ReportingCallbacks,
+    cannonicalise_name,
+    get_credentials,
+    index_conflicts,
+    move_branch,
+    normalize_path,
+    open_repository,
+    pick_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "remote": {"type": 'str', "required": False, "default": 'origin'},
+    "branch": {"type": 'str', "required": False},
+    "upstream_branch": {"type": 'str', "required": False},
+    "strategy": {"type": 'str', "required": False, "choices": ['fast_forward', 'rebase', 'merge'],
+                 "default": 'fast_forward'},
+    "push": {"type": 'bool', "required": False, "default": True},
+    "author": {"type": 'str', "required": False, "default": "ansible_pygit"},
+    "email": {"type": 'str', "required": False, "default": "ansible_pygit@ansible.com"},
+    "username": {"type": 'str', "required": False},
+    "pubkey": {"type": 'path', "required": False},
+    "privkey": {"type": 'path', "required": False},
+    "passphrase": {"type": 'str', "required": False, "no_log": True},
+    "ssh_agent": {"type": 'bool', "required": False, "default": False},
+}
+
+
+def compare(repo_ref, local_id, upstream_id):
+    """
+    (ahead, behind, sync_type) of local_id against upstream_id, None when the
+    remote doesn't have the branch. sync_type is None when both sides have new
+    commits, then strategy decides
+    """
+    if upstream_id is None:
+        # the branch is new to the remote
+        return sum(1 for _ in repo_ref.walk(local_id)), 0, "push"
+    ahead, behind = repo_ref.ahead_behind(local_id, upstream_id)
+    if behind == 0:
+        return ahead, behind, "push" if ahead else "up_to_date"
+    if ahead == 0:
+        return ahead, behind, "fast_forward"
+    return ahead, behind, None
+
+
+def diverged(module, short_branch, remote, upstream_branch, result):
+    module.fail_json(msg=f"{short_branch} and {remote}/{upstream_branch} have diverged "
+                         f"({result['ahead']} and {result['behind']} commits), set strategy", **result)
+
+
+def rebase(module, repo_ref, local_id, upstream_id, sig, result):
+    """
+    replay the commits on local_id that upstream_id doesn't have on top of it,
+    returns the new tip
+    """
+    walker = repo_ref.walk(local_id, pygit2.enums.SortMode.TOPOLOGICAL | pygit2.enums.SortMode.REVERSE)
+    walker.hide(upstream_id)
+    tip = repo_ref[upstream_id]
+    for commit in walker:
+        if len(commit.parents) > 1:
+            module.fail_json(msg=f"can't rebase merge commit {commit.id}, use strategy merge", **result)
+        index = pick_commit(repo_ref, commit, tip)
+        result['conflicts'] = index_conflicts(index)
+        if result['conflicts']:
+            module.fail_json(msg=f"rebasing {commit.id} conflicts in {','.join(result['conflicts'])}", **result)
+        tree = index.write_tree(repo_ref)
+        if tree == tip.tree_id:
+            # upstream already has this change
+            continue
+        new_id = repo_ref.create_commit(None, commit.author, sig, commit.message, tree, [tip.id])
+        result['rebased'][str(commit.id)] = str(new_id)
+        tip = repo_ref[new_id]
+    return tip.id
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "sync_type": '',
+        "ahead": 0,
+        "behind": 0,
+        "rebased": {},
+        "conflicts": [],
+        "commit": '',
+        "pushed": False,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    remote = module.params.get('remote')
+    branch = module.params.get('branch')
+    strategy = module.params.get('strategy')
+    sig = pygit2.Signature(module.params.get('author'), module.params.get('email'))
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    try:
+        remote_ref = repo_ref.remotes[remote]
+    except KeyError as e:
+        module.fail_json(msg=f"failed to get remote {remote}", exception=str(e))
+
+    if branch is None and (repo_ref.head_is_unborn or repo_ref.head_is_detached):
+        module.fail_json(msg=f"{repo} has no current branch, set branch")
+    branch_name = cannonicalise_name(repo_ref, branch)
+    if not branch_name.startswith("refs/heads/") or branch_name not in repo_ref.references:
+        module.fail_json(msg=f"{branch or branch_name} is not a branch in {repo}")
+    short_branch = branch_name[len("refs/heads/"):]
+    upstream_branch = module.params.get('upstream_branch') or short_branch
+    upstream_name = f"refs/heads/{upstream_branch}"
+    tracking_name = f"refs/remotes/{remote}/{upstream_branch}"
+
+    # one set of credentials and callbacks for the whole sync
+    credentials = get_credentials(module.params.get('username'), module.params.get('pubkey'),
+                                  module.params.get('privkey'), module.params.get('passphrase'),
+                                  module.params.get('ssh_agent'))
+    callbacks = ReportingCallbacks(credentials)
+    local_id = repo_ref.references[branch_name].target
+
+    if module.check_mode:
+        try:
+            heads = remote_ref.list_heads(callbacks=callbacks)
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to list the refs of {remote}", exception=str(e))
+        remote_id = next((head.oid for head in heads if head.name == upstream_name), None)
+        result['commit'] = str(local_id)
+        if remote_id is not None and remote_id not in repo_ref:
+            # upstream has commits we haven't fetched, so how it would sync can't be known
+            result['changed'] = True
+            result['message'] = f"would sync {short_branch} with {remote}/{upstream_branch}"
+            module.exit_json(**result)
+
+        result['ahead'], result['behind'], sync_type = compare(repo_ref, local_id, remote_id)
+        if sync_type is None and strategy == 'fast_forward':
+            diverged(module, short_branch, remote, upstream_branch, result)
+        result['sync_type'] = sync_type or strategy
+        if result['sync_type'] == "fast_forward":
+            result['commit'] = str(remote_id)
+        result['pushed'] = module.params.get('push') and result['sync_type'] not in ["up_to_date", "fast_forward"]
+        result['changed'] = result['pushed'] or result['sync_type'] not in ["up_to_date", "push"]
+        if not result['changed']:
+            result['message'] = f"{short_branch} is in sync with {remote}/{upstream_branch}"
+        else:
+            result['message'] = f"would sync {short_branch} with {remote}/{upstream_branch} ({result['sync_type']}" \
+                                f"{', pushed' if result['pushed'] else ''})"
+        module.exit_json(**result)
+
+    try:
+        remote_ref.fetch([f"+{upstream_name}:{tracking_name}"], callbacks=callbacks,
+                         message=f"sync: fetch {upstream_branch}")
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to fetch {upstream_branch} from {remote}", exception=str(e))
+
+    tracking = repo_ref.references.get(tracking_name)
+    upstream_id = tracking.target if tracking is not None else None
+
+    new_id = local_id
+    result['ahead'], result['behind'], sync_type = compare(repo_ref, local_id, upstream_id)
+    if sync_type is None and strategy == 'fast_forward':
+        diverged(module, short_branch, remote, upstream_branch, result)
+    result['sync_type'] = sync_type or strategy
+    if result['sync_type'] == "fast_forward":
+        new_id = upstream_id
+    elif result['sync_type'] == "rebase":
+        new_id = rebase(module, repo_ref, local_id, upstream_id, sig, result)
+    elif result['sync_type'] == "merge":
+        index = repo_ref.merge_commits(local_id, upstream_id)
+        result['conflicts'] = index_conflicts(index)
+        if result['conflicts']:
+            module.fail_json(msg=f"merging {remote}/{upstream_branch} conflicts in "
+                                 f"{','.join(result['conflicts'])}", **result)
+        new_id = repo_ref.create_commit(None, sig, sig, f"Merge {remote}/{upstream_branch} into {short_branch}",
+                                        index.write_tree(repo_ref), [local_id, upstream_id])
+
+    if new_id != local_id:
+        try:
+            move_branch(repo_ref, branch_name, local_id, new_id, f"sync: {result['sync_type']}")
+        except (pygit2.GitError, OSError) as e:
+            module.fail_json(msg=f"failed to update {short_branch}", exception=str(e), **result)
+        result['changed'] = True
+    result['commit'] = str(new_id)
+
+    if module.params.get('push') and new_id != upstream_id:
+        try:
+            remote_ref.push([f"{branch_name}:{upstream_name}"], callbacks=callbacks)
+        except pygit2.GitError as e:
+            module.fail_json(msg=f"failed to push {short_branch} to {remote}", exception=str(e), **result)
+        if callbacks.rejected:
+            module.fail_json(msg=f"{remote} rejected {short_branch}: {callbacks.rejected.get(upstream_name)}",
+                             **result)
+        # what a fetch would have recorded
+        repo_ref.references.create(tracking_name, new_id, force=True)
+        result['pushed'] = True
+        result['changed'] = True
+
+    if not result['changed']:
+        result['message'] = f"{short_branch} is in sync with {remote}/{upstream_branch}"
+    else:
+        result['message'] = f"synced {short_branch} with {remote}/{upstream_branch} ({result['sync_type']}" \
+                            f"{', pushed' if result['pushed'] else ''})"
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_verify_tree
+short_description: Check a deployed directory still matches a commit
+description:
+  - Computes the git blob and tree ids of an arbitrary directory (it needn't be a worktree, e.g. the output of
+    M(git_export)) and compares them with the tree of C(ref), reporting exactly which files were modified, are
+    missing, were added or had their executable bit changed.
+  - Files are hashed in a pool of worker threads. Their ids are remembered on the host with the modification and
+    change times, size and inode they had, so on later runs only files that were touched are read again. Files
+    changed in the last couple of seconds aren't remembered, as a change within the same timestamp wouldn't be
+    noticed.
+  - Directories whose tree id matches the commit's are skipped without looking at what is in them, so an unchanged
+    deployment costs one stat per file.
+  - Empty directories are ignored, as git can't hold them. Submodules are only checked for being present.
+options:
+  repo:
+    description: Path to the Git repository (worktree or bare) holding C(ref)
+    type: path
+    required: true
+  ref:
+    description: The branch, tag or commit the directory should match
+    type: str
+    required: false
+    default: HEAD
+  path:
+    description: The directory to check
+    type: path
+    required: true
+  tree_path:
+    description: Compare with this directory of the commit instead of its root
+    type: str
+    required: false
+  exclude:
+    description: Ignore files and directories whose path (relative to C(path)) or name matches one of these globs
+    type: list
+    elements: str
+    required: false
+    default: [.git]
+  ignore_extra:
+    description: Don't count files that aren't in the commit as drift, they are still listed in C(extra)
+    type: bool
+    required: false
+    default: false
+  modes:
+    description: Count a changed executable bit as drift
+    type: bool
+    required: false
+    default: true
+  workers:
+    description: How many files to hash at once
+    type: int
+    required: false
+    default: 8
+  cache:
+    description: Remember file ids between runs by modification and change time, size and inode
+    type: bool
+    required: false
+    default: true
+  result_detail:
+    description:
+      - How much of the file lists to return. C(full) returns them all, C(summary) returns the first C(result_sample)
+        of each, C(none) only the counts in C(summary).
+    type: str
+    required: false
+    choices: [full, summary, none]
+    default: full
+  result_sample:
+    description: How many entries of each list to return with C(result_detail=summary)
+    type: int
+    required: false
+    default: 20
+  result_inline_limit:
+    description: With C(result_detail=full), lists longer than this are written to C(result_file) instead (except in check mode).
+      By default there is no limit.
+    type: int
+    required: false
+  result_file:
+    description: Where to write lists too long to return, defaults to C(ansible_pygit_result.json) in the git directory
+    type: path
+    required: false
+'''
+
+EXAMPLES = r'''
+- name: Make sure nobody has edited the deployed app
+  git_verify_tree:
+    repo: /srv/git/app.git
+    ref: "{{ release }}"
+    path: /opt/app
+    exclude:
+      - "*.pyc"
+      - __pycache__
+      - logs
+  register: drift
+  failed_when: drift.drifted
+
+- name: Redeploy only if it has drifted
+  git_export:
+    repo: /srv/git/app.git
+    ref: "{{ release }}"
+    dest: /opt/app
+  when: drift.drifted
+'''
+
+RETURN = r'''
+drifted:
+  description: Whether the directory differs from the commit
+  type: bool
+modified:
+  description: Files whose contents differ, or that are a file on one side and a directory or symlink on the other
+  type: list
+missing:
+  description: Files in the commit that aren't in the directory
+  type: list
+extra:
+  description: Files in the directory that aren't in the commit
+  type: list
+mode_changed:
+  description: Files whose executable bit differs (C(modes) only)
+  type: list
+summary:
+  description: The total of each list and whether it was truncated by C(result_detail)
+  type: dict
+tree:
+  description: The tree id the directory would have if committed
+  type: str
+expected_tree:
+  description: The id of the tree it is compared with
+  type: str
+commit:
+  description: The commit C(ref) resolved to
+  type: str
+files:
+  description: How many files were found (C(total)), C(hashed), and taken from the C(cache)
+  type: dict
+trees_skipped:
+  description: How many directories matched the commit by tree id and weren't compared file by file
+  type: int
+result_file:
+  description: Where lists too long to return were written
+  type: str
+changed:
+  description: Always false
+  type: bool
+message:
+  description: A human-readable summary
+  type: str
+'''
+
+import fnmatch
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    BLOB_CHUNK_SIZE,
+    CACHE_DIR,
+    RESULT_DETAIL_ARGS,
+    bound_result,
+    flatten_tree,
+    hash_object,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+    tree_data,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "ref": {"type": 'str', "required": False, "default": 'HEAD'},
+    "path": {"type": 'path', "required": True},
+    "tree_path": {"type": 'str', "required": False},
+    "exclude": {"type": 'list', "elements": 'str', "required": False, "default": ['.git']},
+    "ignore_extra": {"type": 'bool', "required": False, "default": False},
+    "modes": {"type": 'bool', "required": False, "default": True},
+    "workers": {"type": 'int', "required": False, "default": 8},
+    "cache": {"type": 'bool', "required": False, "default": True},
+    **RESULT_DETAIL_ARGS,
+}
+
+VERIFY_CACHE_DIR = os.path.join(CACHE_DIR, "verify_tree")
+# files modified this recently aren't cached, a later write in the same tick wouldn't change the stat
+RACY_SECONDS = 2
+
+BLOB = int(pygit2.enums.FileMode.BLOB)
+EXECUTABLE = int(pygit2.enums.FileMode.BLOB_EXECUTABLE)
+LINK = int(pygit2.enums.FileMode.LINK)
+TREE = int(pygit2.enums.FileMode.TREE)
+SUBMODULE = int(pygit2.enums.FileMode.COMMIT)
+
+RESULT_LISTS = ['modified', 'missing', 'extra', 'mode_changed']
+
+
+def cache_path(path):
+    key = hashlib.sha1(path.encode()).hexdigest()
+    return os.path.join(VERIFY_CACHE_DIR, f"{key}.json")
+
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    # best effort, a lost cache only costs hashing again
+    try:
+        os.makedirs(VERIFY_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=VERIFY_CACHE_DIR, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def hash_file(path, size):
+    """
+    the blob id of a file, streamed so large files aren't read into memory
+    """
+    digest = hashlib.sha1(b"blob %d\0" % size)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalTree:
+    """
+    the blob and tree ids of a directory, as git would compute them if it
+    were committed. files[path] is [mode, blob id] and children[dir] maps the
+    names in each directory to their mode (TREE for directories)
+    """
+
+    def __init__(self, root, exclude, cache):
+        self.root = root
+        self.exclude = exclude
+        self.cache = cache
+        self.files = {}
+        self.children = {}
+        self.trees = {}
+        self.stats = {}
+        self.hashed = 0
+        self.cached = 0
+
+    def excluded(self, path, name):
+        return any(fnmatch.fnmatchcase(path, glob) or fnmatch.fnmatchcase(name, glob) for glob in self.exclude)
+
+    def scan(self):
+        """
+        stat everything under root, returns the directories parents first
+        and the files whose ids aren't known from the cache
+        """
+        order = []
+        unknown = []
+        pending = [""]
+        while pending:
+            rel = pending.pop()
+            order.append(rel)
+            children = self.children[rel] = {}
+            with os.scandir(os.path.join(self.root, rel)) as entries:
+                for entry in entries:
+                    path = f"{rel}/{entry.name}" if rel else entry.name
+                    if self.excluded(path, entry.name):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        children[entry.name] = TREE
+                        pending.append(path)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    if stat.S_ISLNK(st.st_mode):
+                        mode = LINK
+                    elif stat.S_ISREG(st.st_mode):
+                        mode = EXECUTABLE if st.st_mode & stat.S_IXUSR else BLOB
+                    else:
+                        # sockets, fifos and devices can't be committed
+                        continue
+                    # ctime too, a rewrite that puts the mtime back still changes it
+                    key = [st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino]
+                    self.stats[path] = key
+                    children[entry.name] = mode
+                    known = self.cache.get(path)
+                    if known is not None and known[:4] == key:
+                        self.files[path] = [mode, known[4]]
+                        self.cached += 1
+                    else:
+                        self.files[path] = [mode, None]
+                        unknown.append(path)
+        return order, unknown
+
+    def blob_id(self, path):
+        mode = self.files[path][0]
+        full_path = os.path.join(self.root, path)
+        if mode == LINK:
+            return str(hash_object(pygit2.enums.ObjectType.BLOB, os.fsencode(os.readlink(full_path))))
+        return hash_file(full_path, self.stats[path][2])
+
+    def build(self, workers):
+        """
+        hash the files the cache doesn't know and work out every tree id,
+        deepest directories first
+        """
+        order, unknown = self.scan()
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for path, blob_id in zip(unknown, executor.map(self.blob_id, unknown)):
+                self.files[path][1] = blob_id
+                self.hashed += 1
+
+        for rel in reversed(order):
+            entries = []
+            for name, mode in self.children[rel].items():
+                path = f"{rel}/{name}" if rel else name
+                if mode == TREE:
+                    # git has no empty trees, so neither does the directory
+                    if self.trees[path] is not None:
+                        entries.append((os.fsencode(name), TREE, self.trees[path]))
+                else:
+                    entries.append((os.fsencode(name), mode, pygit2.Oid(hex=self.files[path][1])))
+            self.trees[rel] = hash_object(pygit2.enums.ObjectType.TREE, tree_data(entries)) if entries else None
+
+    def files_under(self, rel):
+        prefix = f"{rel}/"
+        return sorted(path for path in self.files if path.startswith(prefix))
+
+    def new_cache(self):
+        """
+        the stat and id of every file old enough to trust its stat
+        """
+        racy = time.time_ns() - RACY_SECONDS * 1000000000
+        return dict((path, key + [self.files[path][1]]) for path, key in self.stats.items() if key[0] < racy)
+
+
+class Comparison:
+    """
+    compares a LocalTree with a git tree top down, skipping the directories
+    whose tree ids are the same on both sides
+    """
+
+    def __init__(self, repo, local, modes):
+        self.repo = repo
+        self.local = local
+        self.modes = modes
+        self.modified = []
+        self.missing = []
+        self.extra = []
+        self.mode_changed = []
+        self.skipped = 0
+
+    def compare(self, rel, tree):
+        if self.local.trees.get(rel) == tree.id:
+            self.skipped += 1
+            return
+        local = self.local.children.get(rel, {})
+        expected = dict((entry.name, entry) for entry in tree)
+        for name in sorted(set(local) | set(expected)):
+            path = f"{rel}/{name}" if rel else name
+            mode = local.get(name)
+            entry = expected.get(name)
+            if entry is None:
+                self.extra.extend(self.local.files_under(path) if mode == TREE else [path])
+            elif mode is None:
+                if entry.filemode == TREE:
+                    self.missing.extend(sorted(flatten_tree(self.repo, self.repo[entry.id], f"{path}/")))
+                else:
+                    self.missing.append(path)
+            elif entry.filemode == SUBMODULE:
+                if mode != TREE:
+                    self.modified.append(path)
+            elif entry.filemode == TREE:
+                if mode == TREE:
+                    self.compare(path, self.repo[entry.id])
+                else:
+                    self.modified.append(path)
+            elif mode == TREE or LINK in (mode, entry.filemode) and mode != entry.filemode:
+                self.modified.append(path)
+            elif self.local.files[path][1] != str(entry.id):
+                self.modified.append(path)
+            elif self.modes and mode != entry.filemode:
+                self.mode_changed.append(path)
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "drifted": False,
+        "modified": [],
+        "missing": [],
+        "extra": [],
+        "mode_changed": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    ref = module.params.get('ref')
+    path = normalize_path(module.params.get('path'))
+    tree_path = (module.params.get('tree_path') or '').strip("/")
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    commit = resolve_commit(repo_ref, ref)
+    if commit is None:
+        module.fail_json(msg=f"{ref} not found in {repo}")
+    tree = commit.tree
+    if tree_path:
+        try:
+            tree = repo_ref[tree[tree_path].id]
+        except KeyError:
+            tree = None
+        if not isinstance(tree, pygit2.Tree):
+            module.fail_json(msg=f"{tree_path} is not a directory in {ref}")
+
+    if not os.path.isdir(path):
+        module.fail_json(msg=f"{path} is not a directory")
+
+    cache_file = cache_path(path)
+    cache = load_cache(cache_file) if module.params.get('cache') else {}
+    local = LocalTree(path, module.params.get('exclude') or [], cache)
+    try:
+        local.build(module.params.get('workers'))
+    except OSError as e:
+        module.fail_json(msg=f"failed to read {path}", exception=str(e))
+
+    comparison = Comparison(repo_ref, local, module.params.get('modes'))
+    comparison.compare("", tree)
+
+    for key in RESULT_LISTS:
+        result[key] = getattr(comparison, key)
+    result['drifted'] = bool(result['modified'] or result['missing'] or result['mode_changed']
+                             or (result['extra'] and not module.params.get('ignore_extra')))
+    result['tree'] = str(local.trees[""]) if local.trees[""] is not None else None
+    result['expected_tree'] = str(tree.id)
+    result['commit'] = str(commit.id)
+    result['files'] = {"total": len(local.files), "hashed": local.hashed, "cached": local.cached}
+    result['trees_skipped'] = comparison.skipped
+
+    if result['drifted']:
+        result['message'] = f"{path} has drifted from {ref}: " + ", ".join(
+            f"{len(result[key])} {key.replace('_', ' ')}" for key in RESULT_LISTS if result[key])
+    else:
+        result['message'] = f"{path} matches {ref}"
+
+    if module.params.get('cache'):
+        new_cache = local.new_cache()
+        if new_cache != cache:
+            save_cache(cache_file, new_cache)
+
+    module.exit_json(**bound_result(repo_ref, module.params, result, RESULT_LISTS, module.check_mode))
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
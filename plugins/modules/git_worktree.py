@@ -0,0 +1,431 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Chris Procter <chris@chrisprocter.co.uk>
+# MIT License (see LICENSE)
+
+DOCUMENTATION = r'''
+---
+module: git_worktree
+short_description: Manage linked worktrees that share one repository's objects
+description:
+  - Creates, removes, locks and prunes linked worktrees of a base repository (worktree or bare), each with its own
+    branch checked out. All the worktrees share the base repository's objects and refs, so a host with one checkout
+    per environment stores and fetches the history once.
+  - Always returns the list of linked worktrees. Without C(path) it only lists them (and prunes with C(prune)).
+options:
+  repo:
+    description: Path to the base Git repository (worktree or bare)
+    type: path
+    required: true
+  path:
+    description: Where the linked worktree is checked out
+    type: path
+    required: false
+  name:
+    description: The name of the worktree in the base repository, defaults to the last component of C(path)
+    type: str
+    required: false
+  branch:
+    description:
+      - The branch to check out in the worktree (C(present) only), defaults to C(name).
+      - It is created from C(start) if it doesn't exist. A branch can only be checked out in one worktree at a time.
+    type: str
+    required: false
+  start:
+    description: Where to create C(branch) from when it doesn't exist, defaults to the base repository's HEAD
+    type: str
+    required: false
+  state:
+    description:
+      - C(present) creates the worktree, or switches it to C(branch) if it already exists.
+      - C(absent) deletes the worktree directory and its metadata in the base repository.
+      - C(locked) and C(unlocked) lock and unlock it, C(git worktree prune) and C(absent) leave locked worktrees alone.
+    type: str
+    required: false
+    choices: [present, absent, locked, unlocked]
+    default: present
+  lock_reason:
+    description: Why the worktree is locked (C(locked) only)
+    type: str
+    required: false
+    default: locked by ansible
+  force:
+    description: Remove the worktree (C(absent)) even if it is locked or has uncommitted changes
+    type: bool
+    required: false
+    default: false
+  prune:
+    description: Prune the metadata of worktrees whose directories no longer exist, unless they are locked
+    type: bool
+    required: false
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Clone the repo once
+  git_clone:
+    upstream: https://git.example.com/app.git
+    repo: /srv/app.git
+    bare: true
+
+- name: Check out each environment from it
+  git_worktree:
+    repo: /srv/app.git
+    path: "/srv/app/{{ item }}"
+    branch: "{{ item }}"
+    start: "origin/{{ item }}"
+  loop:
+    - staging
+    - production
+
+- name: Keep production from being pruned
+  git_worktree:
+    repo: /srv/app.git
+    path: /srv/app/production
+    state: locked
+    lock_reason: live site
+
+- name: Clean up worktrees that were deleted by hand
+  git_worktree:
+    repo: /srv/app.git
+    prune: true
+'''
+
+RETURN = r'''
+worktrees:
+  description: The linked worktrees of the base repository, after any changes
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: The worktree name
+      type: str
+    path:
+      description: Where the worktree is checked out
+      type: str
+    branch:
+      description: The branch checked out, null if HEAD is detached or the worktree is missing
+      type: str
+    head:
+      description: The commit checked out
+      type: str
+    locked:
+      description: Whether the worktree is locked
+      type: bool
+    lock_reason:
+      description: Why the worktree is locked
+      type: str
+    prunable:
+      description: Whether the worktree's directory is gone and its metadata can be pruned
+      type: bool
+pruned:
+  description: The names of the worktrees pruned
+  type: list
+changed:
+  description: Whether any worktree was created, switched, removed, locked, unlocked or pruned
+  type: bool
+message:
+  description: A human-readable message
+  type: str
+'''
+
+import os
+import shutil
+
+from ansible.module_utils.basic import AnsibleModule
+import pygit2
+from ansible.module_utils.pygit_utils import (
+    is_dirty,
+    normalize_path,
+    open_repository,
+    resolve_commit,
+)
+
+module_args = {
+    "repo": {"type": 'path', "required": True},
+    "path": {"type": 'path', "required": False},
+    "name": {"type": 'str', "required": False},
+    "branch": {"type": 'str', "required": False},
+    "start": {"type": 'str', "required": False},
+    "state": {"type": 'str', "required": False, "choices": ['present', 'absent', 'locked', 'unlocked'],
+              "default": 'present'},
+    "lock_reason": {"type": 'str', "required": False, "default": "locked by ansible"},
+    "force": {"type": 'bool', "required": False, "default": False},
+    "prune": {"type": 'bool', "required": False, "default": False},
+}
+
+
+def common_dir(repo_ref):
+    """
+    the base repository's git dir, even when repo_ref is itself a linked worktree
+    """
+    try:
+        with open(os.path.join(repo_ref.path, "commondir")) as f:
+            return normalize_path(os.path.join(repo_ref.path, f.read().strip()))
+    except FileNotFoundError:
+        return normalize_path(repo_ref.path)
+
+
+def lock_file(repo_ref, name):
+    return os.path.join(common_dir(repo_ref), "worktrees", name, "locked")
+
+
+def lock_reason(repo_ref, name):
+    try:
+        with open(lock_file(repo_ref, name)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def open_worktree(worktree):
+    try:
+        return pygit2.Repository(worktree.path)
+    except pygit2.GitError:
+        return None
+
+
+def worktree_facts(repo_ref, name):
+    worktree = repo_ref.lookup_worktree(name)
+    reason = lock_reason(repo_ref, name)
+    facts = {
+        "name": name,
+        "path": normalize_path(worktree.path),
+        "branch": None,
+        "head": None,
+        "locked": reason is not None,
+        "lock_reason": reason,
+        "prunable": worktree.is_prunable,
+    }
+    wt_repo = open_worktree(worktree)
+    if wt_repo is not None and not wt_repo.head_is_unborn:
+        facts['head'] = str(wt_repo.head.target)
+        if not wt_repo.head_is_detached:
+            facts['branch'] = wt_repo.head.shorthand
+    return facts
+
+
+def list_worktrees(repo_ref):
+    return [worktree_facts(repo_ref, name) for name in sorted(repo_ref.list_worktrees())]
+
+
+def checked_out_elsewhere(repo_ref, branch_name, name):
+    """
+    the worktree (or the base repository) other than name that has branch_name checked out
+    """
+    if not repo_ref.is_bare and not repo_ref.head_is_detached and repo_ref.references['HEAD'].target == branch_name:
+        return repo_ref.workdir
+    for other in repo_ref.list_worktrees():
+        if other == name:
+            continue
+        wt_repo = open_worktree(repo_ref.lookup_worktree(other))
+        if wt_repo is not None and not wt_repo.head_is_detached \
+                and wt_repo.references['HEAD'].target == branch_name:
+            return wt_repo.workdir
+    return None
+
+
+def present(module, repo_ref, name, path, result):
+    branch = module.params.get('branch') or name
+    start = module.params.get('start')
+    # a branch, even if a tag or remote branch has the same short name
+    branch_name = branch if branch.startswith("refs/heads/") else f"refs/heads/{branch}"
+
+    exists = name in repo_ref.list_worktrees()
+    if exists:
+        worktree = repo_ref.lookup_worktree(name)
+        if normalize_path(worktree.path) != path:
+            module.fail_json(msg=f"worktree {name} is already checked out at {worktree.path}")
+        wt_repo = open_worktree(worktree)
+        if wt_repo is None:
+            module.fail_json(msg=f"worktree {name} is missing from {path}, prune it first")
+        if not wt_repo.head_is_detached and wt_repo.references['HEAD'].target == branch_name:
+            result['message'] = f"{path} already has {branch} checked out"
+            return
+
+    other = checked_out_elsewhere(repo_ref, branch_name, name)
+    if other is not None:
+        module.fail_json(msg=f"{branch} is already checked out at {other}")
+
+    if branch_name not in repo_ref.references:
+        commit = resolve_commit(repo_ref, start or "HEAD")
+        if commit is None:
+            module.fail_json(msg=f"can't create {branch}, {start or 'HEAD'} not found")
+    else:
+        commit = None
+
+    result['changed'] = True
+    verb = "switch" if exists else "create"
+    if module.check_mode:
+        result['message'] = f"would {verb} {path} to {branch}"
+        return
+
+    try:
+        if commit is not None:
+            repo_ref.branches.local.create(branch_name[len("refs/heads/"):], commit.peel(pygit2.Commit))
+        ref = repo_ref.references[branch_name]
+        if exists:
+            wt_repo.checkout(branch_name, strategy=pygit2.enums.CheckoutStrategy.SAFE)
+        else:
+            # like git worktree add, create any missing parent directories
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            repo_ref.add_worktree(name, path, ref)
+    except (pygit2.GitError, OSError) as e:
+        module.fail_json(msg=f"failed to {verb} worktree {name} at {path}", exception=str(e))
+    result['message'] = f"{verb}d {path} with {branch} checked out"
+
+
+def worktree_at(repo_ref, path):
+    """
+    the name of the worktree checked out at path, or None
+    """
+    for name in repo_ref.list_worktrees():
+        if normalize_path(repo_ref.lookup_worktree(name).path) == path:
+            return name
+    return None
+
+
+def absent(module, repo_ref, name, path, result):
+    if path is not None:
+        # the name defaults to the directory name, which another worktree may have
+        at_path = worktree_at(repo_ref, path)
+        given_name = module.params.get('name')
+        if given_name is not None and given_name != at_path and given_name in repo_ref.list_worktrees():
+            module.fail_json(msg=f"worktree {given_name} is checked out at "
+                                 f"{repo_ref.lookup_worktree(given_name).path}, not {path}")
+        if at_path is None:
+            result['message'] = f"there is no worktree at {path}"
+            return
+        name = at_path
+
+    if name not in repo_ref.list_worktrees():
+        result['message'] = f"worktree {name} does not exist"
+        return
+
+    force = module.params.get('force')
+    worktree = repo_ref.lookup_worktree(name)
+    if lock_reason(repo_ref, name) is not None and not force:
+        module.fail_json(msg=f"worktree {name} is locked ({lock_reason(repo_ref, name)}), unlock it or set force")
+    wt_repo = open_worktree(worktree)
+    if wt_repo is not None and is_dirty(wt_repo) and not force:
+        module.fail_json(msg=f"{worktree.path} has uncommitted changes, set force to remove it anyway")
+
+    result['changed'] = True
+    if module.check_mode:
+        result['message'] = f"would remove worktree {name}"
+        return
+
+    try:
+        shutil.rmtree(worktree.path, ignore_errors=True)
+        worktree.prune(True)
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to remove worktree {name}", exception=str(e))
+    result['message'] = f"removed worktree {name}"
+
+
+def set_lock(module, repo_ref, name, locked, result):
+    if name not in repo_ref.list_worktrees():
+        module.fail_json(msg=f"worktree {name} does not exist")
+
+    reason = module.params.get('lock_reason')
+    current = lock_reason(repo_ref, name)
+    if (locked and current == reason) or (not locked and current is None):
+        result['message'] = f"worktree {name} is already {'locked' if locked else 'unlocked'}"
+        return
+
+    result['changed'] = True
+    if module.check_mode:
+        result['message'] = f"would {'lock' if locked else 'unlock'} worktree {name}"
+        return
+
+    path = lock_file(repo_ref, name)
+    try:
+        if locked:
+            with open(path, "w") as f:
+                f.write(reason + "\n")
+        else:
+            os.unlink(path)
+    except OSError as e:
+        module.fail_json(msg=f"failed to {'lock' if locked else 'unlock'} worktree {name}", exception=str(e))
+    result['message'] = f"{'locked' if locked else 'unlocked'} worktree {name}"
+
+
+def prune(module, repo_ref, result):
+    for name in sorted(repo_ref.list_worktrees()):
+        worktree = repo_ref.lookup_worktree(name)
+        # is_prunable is false for locked worktrees
+        if not worktree.is_prunable:
+            continue
+        result['pruned'].append(name)
+        if not module.check_mode:
+            try:
+                worktree.prune()
+            except pygit2.GitError as e:
+                module.fail_json(msg=f"failed to prune worktree {name}", exception=str(e))
+    if result['pruned']:
+        result['changed'] = True
+
+
+def run_module():
+
+    # seed the result dict in the object
+    result = {
+        "changed": False,
+        "message": '',
+        "worktrees": [],
+        "pruned": [],
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    repo = module.params.get('repo')
+    path = module.params.get('path')
+    name = module.params.get('name')
+    state = module.params.get('state')
+
+    try:
+        repo_ref = open_repository(normalize_path(repo))
+    except pygit2.GitError as e:
+        module.fail_json(msg=f"failed to get repo at {repo}", exception=str(e))
+
+    # always work from the base repository
+    repo_ref = pygit2.Repository(common_dir(repo_ref))
+
+    if module.params.get('prune'):
+        prune(module, repo_ref, result)
+
+    if path is None:
+        if name is None:
+            if state != 'present':
+                module.fail_json(msg=f"path or name is required for state {state}")
+            result['worktrees'] = list_worktrees(repo_ref)
+            if result['pruned']:
+                result['message'] = f"pruned {','.join(result['pruned'])}"
+            module.exit_json(**result)
+        if state == 'present':
+            module.fail_json(msg="path is required to create a worktree")
+    else:
+        path = normalize_path(path)
+        name = name or os.path.basename(path)
+
+    if state == 'present':
+        present(module, repo_ref, name, path, result)
+    elif state == 'absent':
+        absent(module, repo_ref, name, path, result)
+    else:
+        set_lock(module, repo_ref, name, state == 'locked', result)
+
+    result['worktrees'] = list_worktrees(repo_ref)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()